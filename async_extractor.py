@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+非同步提取
+Asynchronous Metadata Extraction
+
+網路磁碟（NFS、SMB、雲端掛載）上每次開檔與讀取都要等一個來回，逐張提取時
+連線大部分時間都在閒置。aextract() 以執行緒池同時處理多個檔案，讓等待互相重疊：
+
+    async for file_path, metadata in aextract(paths, concurrency=32):
+        ...
+
+- 每個執行緒各自持有一個提取器；讀取檔案時會釋放 GIL，多個檔案的等待可以重疊
+- 同時處理（含已完成但還沒交出）的檔案最多 concurrency 個，記憶體用量固定
+- 預設依完成順序產生結果，ordered=True 時依輸入順序
+- 路徑可以是一般的可迭代物件（例如 iter_image_files()，整批在執行緒中讀取，走訪網路磁碟的
+  資料夾不會阻塞事件迴圈）或非同步可迭代物件
+
+解析本身仍受 GIL 限制；本機磁碟上 CPU 是瓶頸時請用 batch_extractor.iter_extract() 的多行程模式。
+"""
+
+import asyncio
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Tuple, Union
+
+from exif_segment_reader import SECTION_KEYS
+from batch_extractor import _error_results
+
+# 同時處理的檔案數；網路磁碟的延遲越高，需要越多同時進行的讀取才能用滿頻寬
+DEFAULT_CONCURRENCY = 32
+
+
+class _PathSource:
+    """路徑來源：一般的可迭代物件整批在執行緒中讀取，非同步可迭代物件逐筆等待"""
+
+    def __init__(self, paths: Union[Iterable[str], AsyncIterable[str]], batch_size: int):
+        self.buffer = deque()
+        self.exhausted = False
+        self.batch_size = batch_size
+        self._aiter = None
+        self._iterator = None
+        if isinstance(paths, (list, tuple)):
+            self.buffer.extend(paths)
+            self.exhausted = True
+        elif hasattr(paths, '__aiter__'):
+            self._aiter = paths.__aiter__()
+        else:
+            self._iterator = iter(paths)
+
+    async def fill(self):
+        """讀取下一批路徑到 buffer；來源用完時設定 exhausted"""
+        if self._aiter is not None:
+            try:
+                self.buffer.append(await self._aiter.__anext__())
+            except StopAsyncIteration:
+                self.exhausted = True
+            return
+        batch = await asyncio.get_running_loop().run_in_executor(
+            None, list, itertools.islice(self._iterator, self.batch_size))
+        if batch:
+            self.buffer.extend(batch)
+        else:
+            self.exhausted = True
+
+
+async def aextract(paths: Union[Iterable[str], AsyncIterable[str]],
+                   concurrency: int = DEFAULT_CONCURRENCY, ordered: bool = False,
+                   sections: Optional[Iterable[str]] = None,
+                   blob_threshold: Optional[int] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """同時提取多個檔案，產生 (檔案路徑, metadata)
+
+    結果與逐張呼叫 PhotoMetadataCLI.extract_metadata() 相同；sections、blob_threshold
+    的意義同 iter_extract()。單一檔案的錯誤只記錄在該檔案的 metadata['error']。
+    """
+    from photo_metadata_cli import PhotoMetadataCLI
+
+    concurrency = max(1, concurrency)
+    if sections is not None:
+        sections = [section for section in SECTION_KEYS if section in set(sections)]
+    local = threading.local()
+
+    def extract(path: str) -> Dict[str, Any]:
+        cli = getattr(local, 'cli', None)
+        if cli is None:
+            cli = local.cli = PhotoMetadataCLI() if blob_threshold is None else PhotoMetadataCLI(blob_threshold)
+        return cli.extract_metadata(path, sections)
+
+    loop = asyncio.get_running_loop()
+    source = _PathSource(paths, concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='aextract')
+    pending = {}    # 執行中的 future → (輸入順序, 檔案路徑)
+    finished = {}   # ordered 時已完成但還輪不到交出的結果：輸入順序 → (檔案路徑, metadata)
+    fetch = None    # 讀取下一批路徑的 task
+    submitted = 0
+    next_index = 0
+    try:
+        while True:
+            # 補滿同時處理的檔案；路徑還沒讀到時不等待，先處理已完成的結果
+            while source.buffer and len(pending) + len(finished) < concurrency:
+                path = source.buffer.popleft()
+                pending[loop.run_in_executor(executor, extract, path)] = (submitted, path)
+                submitted += 1
+            if (fetch is None and not source.buffer and not source.exhausted
+                    and len(pending) + len(finished) < concurrency):
+                fetch = asyncio.ensure_future(source.fill())
+
+            waiting = set(pending)
+            if fetch is not None:
+                waiting.add(fetch)
+            if not waiting:
+                return
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if fetch in done:
+                # 路徑來源的錯誤（例如檔案清單無法讀取）直接拋出
+                fetch.result()
+                fetch = None
+            for future in done:
+                if future not in pending:
+                    continue
+                index, path = pending.pop(future)
+                try:
+                    result = (path, future.result())
+                except Exception as e:
+                    result = _error_results([path], e, sections)[0]
+                if ordered:
+                    finished[index] = result
+                else:
+                    yield result
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        # 呼叫端提前結束時，取消還沒開始的檔案；執行中的檔案在背景完成後丟棄
+        if fetch is not None:
+            fetch.cancel()
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
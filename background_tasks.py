@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GUI 背景工作
+Background Tasks for the Tk GUI
+
+把耗時的提取與預覽解碼交給執行緒池，Tk 主執行緒只負責顯示：
+- Tk 元件不能在其他執行緒操作，完成的結果由主執行緒以 root.after 定期輪詢取回
+- 每個工作帶一個取消權杖（CancelToken），選擇新檔案時取消舊的工作，
+  已取消的工作不會再回呼，執行中的工作在下一個檢查點結束
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, List, Optional, Tuple
+
+# 預設工作執行緒數（提取與預覽可以同時進行）
+DEFAULT_WORKERS = 2
+
+# 主執行緒輪詢完成結果的間隔（毫秒），遠低於 50 ms 的回應時間要求
+POLL_INTERVAL_MS = 20
+
+
+class TaskCancelled(Exception):
+    """工作已被取消"""
+
+
+class CancelToken:
+    """取消權杖：由主執行緒取消，工作執行緒在檢查點檢查"""
+
+    __slots__ = ('_event',)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """在工作中的檢查點呼叫，已取消時拋出 TaskCancelled"""
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+def check_cancelled(token: Optional[CancelToken]):
+    """token 可以是 None（不可取消的呼叫）"""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class BackgroundRunner:
+    """在背景執行緒執行工作，完成後在 Tk 主執行緒呼叫 on_done / on_error"""
+
+    def __init__(self, root, max_workers: int = DEFAULT_WORKERS,
+                 poll_interval_ms: int = POLL_INTERVAL_MS,
+                 on_busy_changed: Optional[Callable[[bool], None]] = None):
+        self.root = root
+        self.poll_interval_ms = poll_interval_ms
+        self.on_busy_changed = on_busy_changed
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='metadata-worker')
+        self._pending: List[Tuple[Future, CancelToken, Callable, Optional[Callable]]] = []
+        self._poll_id = None
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._pending)
+
+    def submit(self, func: Callable[..., Any], *args, token: CancelToken,
+               on_done: Callable[[Any], None],
+               on_error: Optional[Callable[[BaseException], None]] = None) -> Future:
+        """送出工作；func 在工作執行緒執行，on_done / on_error 在主執行緒執行"""
+        was_busy = self.busy
+        future = self.executor.submit(func, *args)
+        self._pending.append((future, token, on_done, on_error))
+        if not was_busy:
+            self._notify_busy(True)
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_interval_ms, self._poll)
+        return future
+
+    def cancel(self, token: CancelToken):
+        """取消權杖並丟棄還沒開始的工作"""
+        token.cancel()
+        for future, item_token, _, _ in self._pending:
+            if item_token is token:
+                future.cancel()
+
+    def _poll(self):
+        """主執行緒：取回已完成的工作並回呼"""
+        self._poll_id = None
+        finished = []
+        pending = []
+        for item in self._pending:
+            (finished if item[0].done() else pending).append(item)
+        self._pending = pending
+        # 先排定下一次輪詢，回呼中送出的新工作不會重複排定
+        if self._pending:
+            self._poll_id = self.root.after(self.poll_interval_ms, self._poll)
+
+        try:
+            for future, token, on_done, on_error in finished:
+                # 已取消的工作（包含在檢查點結束的）不再回呼
+                if token.cancelled or future.cancelled():
+                    continue
+                error = future.exception()
+                if error is None:
+                    on_done(future.result())
+                elif isinstance(error, TaskCancelled):
+                    continue
+                elif on_error is not None:
+                    on_error(error)
+        finally:
+            if not self._pending:
+                self._notify_busy(False)
+
+    def _notify_busy(self, busy: bool):
+        if self.on_busy_changed is not None:
+            self.on_busy_changed(busy)
+
+    def shutdown(self):
+        """關閉視窗時呼叫：取消所有工作，不等待執行中的工作結束"""
+        for future, token, _, _ in self._pending:
+            token.cancel()
+            future.cancel()
+        self._pending.clear()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批次提取器
+Batch Metadata Extractor
+
+- 從檔案、資料夾（遞迴）、萬用字元與檔案清單找出相片
+- 以行程池（process pool）分批平行提取，結果一產生就交給呼叫端
+- 單一檔案的錯誤只記錄在該檔案的 metadata['error']，不影響其他檔案
+"""
+
+import os
+import sys
+import glob
+import itertools
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from exif_segment_reader import SECTION_KEYS, project_sections
+from photo_record import PhotoRecord
+
+# 與 GUI 檔案選擇器的篩選條件一致
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.gif', '.webp')
+
+# 每個工作行程一次處理的檔案數
+DEFAULT_CHUNKSIZE = 64
+
+# 每個工作行程最多同時排隊的批次數（限制記憶體用量）
+MAX_PENDING_PER_WORKER = 2
+
+
+def is_image_file(file_path: str) -> bool:
+    """依副檔名判斷是否為相片檔案"""
+    return file_path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def walk_images(directory: str) -> Iterator[str]:
+    """遞迴列出資料夾中的相片檔案（依名稱排序）"""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file() and is_image_file(entry.name):
+                    yield entry.path
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+
+def read_file_list(list_path: str) -> Iterator[str]:
+    """讀取檔案清單（每行一個路徑，'-' 代表標準輸入）"""
+    f = sys.stdin if list_path == '-' else open(list_path, 'r', encoding='utf-8')
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def iter_image_files(inputs: Iterable[str], files_from: Optional[str] = None) -> Iterator[str]:
+    """展開輸入：資料夾遞迴搜尋、萬用字元展開，直接指定的檔案原樣保留"""
+    sources = itertools.chain(inputs, read_file_list(files_from) if files_from else ())
+    for item in sources:
+        if os.path.isdir(item):
+            yield from walk_images(item)
+        elif glob.has_magic(item):
+            for match in sorted(glob.iglob(item, recursive=True)):
+                if os.path.isdir(match):
+                    yield from walk_images(match)
+                elif is_image_file(match):
+                    yield match
+        else:
+            # 直接指定的檔案不檢查副檔名，不存在時由 extract_metadata 記錄錯誤
+            yield item
+
+
+def is_batch_request(inputs: List[str], files_from: Optional[str] = None) -> bool:
+    """判斷輸入是否需要批次模式（多個路徑、資料夾、萬用字元或檔案清單）"""
+    if files_from or len(inputs) != 1:
+        return True
+    return os.path.isdir(inputs[0]) or glob.has_magic(inputs[0])
+
+
+def _chunked(iterable: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# 每個工作行程各自持有的提取器
+_worker_cli = None
+
+
+def _init_worker(blob_threshold: Optional[int] = None, timings: bool = False):
+    """工作行程初始化：只建立一次提取器，同時完成 PIL/piexif 的匯入"""
+    global _worker_cli
+    from photo_metadata_cli import PhotoMetadataCLI
+    _worker_cli = PhotoMetadataCLI() if blob_threshold is None else PhotoMetadataCLI(blob_threshold)
+    _worker_cli.timings = timings
+
+
+def _extract_chunk(paths: List[str], sections: Optional[List[str]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """在工作行程中提取一批檔案（GPS 座標在整批讀完後一次換算）"""
+    return _worker_cli.extract_many(paths, sections)
+
+
+def _extract_record_chunk(paths: List[str], sections: Optional[List[str]] = None) -> List[Tuple[str, PhotoRecord]]:
+    """在工作行程中提取一批檔案的有型別欄位（見 PhotoMetadataCLI.extract_record），不使用 sections"""
+    return [(path, _worker_cli.extract_record(path)) for path in paths]
+
+
+def iter_extract(paths: Iterable[str], workers: Optional[int] = None,
+                 chunksize: int = DEFAULT_CHUNKSIZE,
+                 cache=None, sections: Optional[Iterable[str]] = None,
+                 blob_threshold: Optional[int] = None,
+                 timings: bool = False,
+                 records: bool = False) -> Iterator[Tuple[str, Any]]:
+    """平行提取相片資訊，依完成順序產生 (檔案路徑, metadata)
+
+    sections 指定只提取部分區段（'basic'、'exif'、'gps'、'raw'），預設全部。
+    blob_threshold 指定大型二進位值以描述表示的門檻，預設沿用提取器的預設值。
+    timings 為 True 時每筆結果加上各階段耗時的 diagnostic_info（快取命中的結果沒有）。
+    指定 cache（MetadataCache）時，命中的檔案只需要 stat() 就直接產生結果，
+    未命中的檔案才送到工作行程；只有完整提取的結果會寫回快取。
+    records 為 True 時改為產生 (檔案路徑, PhotoRecord)：工作行程只回傳索引與欄位式輸出用到的欄位，
+    傳回主行程的資料量小得多（不能與 cache、sections 一起使用）。
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, chunksize)
+    if records and (cache is not None or sections is not None):
+        raise ValueError("records 不能與 cache 或 sections 一起使用")
+    if sections is not None:
+        sections = [section for section in SECTION_KEYS if section in set(sections)]
+    extract_chunk = _extract_record_chunk if records else _extract_chunk
+
+    if workers == 1:
+        # 單一行程：不需要行程池的額外成本
+        _init_worker(blob_threshold, timings)
+
+        def extract(path: str) -> Dict[str, Any]:
+            return _worker_cli.extract_metadata(path, sections)
+
+        if cache is None:
+            for chunk in _chunked(paths, chunksize):
+                yield from extract_chunk(chunk, sections)
+            return
+        for path in paths:
+            yield path, cache.get_or_extract(path, extract, sections)
+        return
+
+    # 行程池會匯入 multiprocessing，單一行程時不需要
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+    chunks = _chunked(paths, chunksize)
+    max_pending = workers * MAX_PENDING_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(blob_threshold, timings)) as executor:
+        pending = {}
+        ready = []  # 已有結果（快取命中或送出失敗）但還沒交出的檔案
+        stats = {}  # 送出中的檔案的 stat 結果，提取完成後寫回快取用
+
+        def lookup(chunk: List[str]) -> List[str]:
+            """查詢快取，命中的放進 ready，回傳未命中的檔案"""
+            misses = []
+            for path in chunk:
+                stat = cache.file_stat(path)
+                metadata = cache.get(path, stat) if stat is not None else None
+                if metadata is not None:
+                    ready.append((path, project_sections(metadata, sections)))
+                    continue
+                if stat is None:
+                    # 沒有呼叫 get()，未命中由這裡計數
+                    cache.misses += 1
+                elif sections is None:
+                    stats[path] = stat
+                misses.append(path)
+            return misses
+
+        def fill():
+            """補滿排隊中的批次，讓工作行程不會閒置，也不會一次送出全部檔案"""
+            while len(pending) < max_pending and len(ready) < chunksize * max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                if cache is not None:
+                    chunk = lookup(chunk)
+                    if not chunk:
+                        continue
+                try:
+                    pending[executor.submit(extract_chunk, chunk, sections)] = chunk
+                except Exception as e:
+                    ready.extend(_error_results(chunk, e, sections, records))
+
+        fill()
+        while pending or ready:
+            results = ready[:]
+            ready.clear()
+
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    try:
+                        chunk_results = future.result()
+                    except Exception as e:
+                        # 工作行程異常（例如被系統終止）時，把錯誤記錄在這批的每個檔案上
+                        chunk_results = _error_results(chunk, e, sections, records)
+                        for path in chunk:
+                            stats.pop(path, None)
+                    else:
+                        if cache is not None:
+                            for path, metadata in chunk_results:
+                                stat = stats.pop(path, None)
+                                if stat is not None:
+                                    cache.put(path, stat, metadata)
+                    results.extend(chunk_results)
+
+            # 先補上新的批次再交出結果，呼叫端處理結果時工作行程仍持續運作
+            fill()
+            yield from results
+
+
+def _error_results(chunk: List[str], error: Exception, sections: Optional[List[str]] = None,
+                   records: bool = False) -> List[Tuple[str, Any]]:
+    """整批失敗時，為每個檔案產生只含錯誤的記錄"""
+    if records:
+        return [(path, PhotoRecord(path, error=str(error))) for path in chunk]
+    keys = [SECTION_KEYS[section] for section in (sections or SECTION_KEYS)]
+    return [(path, {**{key: {} for key in keys}, 'error': str(error)}) for path in chunk]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+高延遲儲存的非同步提取基準測試
+Async Extraction Benchmark on High-latency Storage
+
+在 corpus.py 產生的語料上模擬網路磁碟：每次開檔（MappedFile）先等待 --latency 毫秒
+（time.sleep 與真正的網路 I/O 一樣會釋放 GIL），比較逐張 extract_metadata() 與
+不同同時處理數的 aextract() 的每秒檔案數，並確認兩者的結果相同。
+
+使用方法:
+    python benchmarks/bench_async.py [--corpus DIR] [--per-kind 20] [--latency 20] [--concurrency 1 8 32]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import generate_corpus
+import mmap_scanner
+from photo_metadata_cli import PhotoMetadataCLI
+from async_extractor import aextract
+
+
+def add_latency(seconds: float):
+    """讓每次開檔都多等一個來回"""
+    original = mmap_scanner.MappedFile.__init__
+
+    def delayed_init(self, *args, **kwargs):
+        time.sleep(seconds)
+        original(self, *args, **kwargs)
+
+    mmap_scanner.MappedFile.__init__ = delayed_init
+
+
+def comparable(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    # 存取時間會因為讀取而改變
+    return {**metadata, 'basic_info': {k: v for k, v in metadata.get('basic_info', {}).items() if k != '存取時間'}}
+
+
+async def collect(paths: List[str], concurrency: int) -> Dict[str, Any]:
+    return {path: metadata async for path, metadata in aextract(paths, concurrency)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='高延遲儲存的非同步提取基準測試')
+    parser.add_argument('--corpus', help='語料資料夾（預設使用暫存資料夾）')
+    parser.add_argument('--per-kind', type=int, default=20, help='每種語料類型的檔案數（預設 20）')
+    parser.add_argument('--latency', type=float, default=20.0, help='每次開檔的模擬延遲（毫秒，預設 20）')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                        help='要量測的同時處理數（預設 1 8 32）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = generate_corpus(args.corpus or tmp, args.per_kind)
+        paths = [path for kind_paths in files.values() for path in kind_paths]
+        add_latency(args.latency / 1000)
+
+        cli = PhotoMetadataCLI()
+        start = time.perf_counter()
+        expected = {path: cli.extract_metadata(path) for path in paths}
+        serial = time.perf_counter() - start
+
+        print(f"檔案數: {len(paths)}，每次開檔延遲 {args.latency:g} ms")
+        print(f"{'實作':<18} {'總耗時 (s)':>12} {'檔案/秒':>10} {'加速':>8}")
+        print("-" * 52)
+        print(f"{'逐張':<18} {serial:>12.3f} {len(paths) / serial:>10.1f} {1:>7.2f}x")
+        for concurrency in args.concurrency:
+            start = time.perf_counter()
+            results = asyncio.run(collect(paths, concurrency))
+            elapsed = time.perf_counter() - start
+            if ({path: comparable(m) for path, m in results.items()}
+                    != {path: comparable(m) for path, m in expected.items()}):
+                print(f"錯誤：concurrency={concurrency} 的結果與逐張提取不同")
+                sys.exit(1)
+            label = f"aextract({concurrency})"
+            print(f"{label:<18} {elapsed:>12.3f} {len(paths) / elapsed:>10.1f} {serial / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPS 座標換算基準測試
+GPS Coordinate Benchmark
+
+比較逐張換算（gps_position，每張相片各自做有理數除法、正負號與四捨五入）
+與 GPSColumns 欄位式換算（附加原始數值，整批一次換算）在大量 GPS 字典上的
+每張平均成本。有安裝 NumPy 時欄位式換算以向量運算完成，否則逐列換算。
+
+使用方法:
+    python benchmarks/bench_gps.py [--records 1000000]
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL.TiffImagePlugin import IFDRational
+
+import gps_coordinates
+from gps_coordinates import gps_position, batch_positions
+
+
+def make_records(count: int) -> List[Dict]:
+    """PIL _getexif() 形式的 GPS 字典（IFDRational 的度/分/秒與海拔）"""
+    rng = random.Random(0)
+    samples = []
+    for _ in range(min(count, 1000)):
+        samples.append({
+            0: b'\x02\x02\x00\x00',
+            1: rng.choice('NS'),
+            2: (IFDRational(rng.randint(0, 89), 1), IFDRational(rng.randint(0, 59), 1),
+                IFDRational(rng.randint(0, 599999), 10000)),
+            3: rng.choice('EW'),
+            4: (IFDRational(rng.randint(0, 179), 1), IFDRational(rng.randint(0, 59), 1),
+                IFDRational(rng.randint(0, 599999), 10000)),
+            5: b'\x00',
+            6: IFDRational(rng.randint(0, 900000), 100),
+        })
+    return [samples[i % len(samples)] for i in range(count)]
+
+
+def measure(func: Callable[[List[Dict]], list], records: List[Dict]) -> float:
+    start = time.perf_counter()
+    func(records)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GPS 座標換算基準測試')
+    parser.add_argument('--records', type=int, default=1_000_000, help='GPS 字典數（預設 1000000）')
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+
+    def per_photo(records: List[Dict]) -> list:
+        return [gps_position(gps_data) for gps_data in records]
+
+    # 兩種換算的結果必須完全相同
+    if per_photo(records[:10000]) != batch_positions(records[:10000]):
+        print("錯誤：逐張與欄位式換算的結果不同")
+        sys.exit(1)
+
+    scalar = measure(per_photo, records)
+    columnar = measure(batch_positions, records)
+
+    backend = 'NumPy' if gps_coordinates.load_numpy() is not None else '純 Python'
+    print(f"記錄數: {len(records):,}，欄位式換算使用 {backend}")
+    print(f"{'實作':<12} {'總耗時 (s)':>12} {'每張 (us)':>12}")
+    print("-" * 38)
+    for name, elapsed in (('逐張', scalar), ('欄位式', columnar)):
+        print(f"{name:<12} {elapsed:>12.3f} {elapsed / len(records) * 1e6:>12.2f}")
+    print("-" * 38)
+    print(f"加速: {scalar / columnar:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
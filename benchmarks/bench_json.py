@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 序列化後端基準測試
+JSON Serialization Backend Benchmark
+
+在 corpus.py 產生的語料上提取一次，再以各個後端把結果編碼成精簡（NDJSON 的每一行）與
+美化（--output 的 JSON 檔案）格式，回報每秒記錄數，並確認各後端的輸出逐位元組相同。
+makernote 類型的相片含有以十六進位表示的大型二進位值（--include-blobs），是最慢的情況。
+
+使用方法:
+    python benchmarks/bench_json.py [--corpus DIR] [--per-kind 20] [--repeat 5]
+"""
+
+import io
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import generate_corpus
+from photo_metadata_cli import PhotoMetadataCLI, json_default
+from exif_blobs import expand_blobs
+from json_backend import JSONSerializer, HAS_ORJSON
+
+
+def encode_all(serializer: JSONSerializer, records: List[Dict[str, Any]], repeat: int) -> float:
+    """逐筆編碼（同 NDJSON 輸出），回傳最快一次的秒數"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for record in records:
+            serializer.dumps(record)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def dump_all(serializer: JSONSerializer, results: Dict[str, Any], repeat: int) -> float:
+    """整批寫入一個檔案（同 --output），回傳最快一次的秒數"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serializer.dump(results, io.BytesIO())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 序列化後端基準測試')
+    parser.add_argument('--corpus', help='語料資料夾（預設使用暫存資料夾）')
+    parser.add_argument('--per-kind', type=int, default=20, help='每種語料類型的檔案數（預設 20）')
+    parser.add_argument('--repeat', type=int, default=5, help='重複次數，取最快的一次（預設 5）')
+    args = parser.parse_args()
+
+    backends = ['json'] + (['orjson'] if HAS_ORJSON else [])
+    if not HAS_ORJSON:
+        print("沒有安裝 orjson，只量測標準函式庫 json（pip install orjson）")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = generate_corpus(args.corpus or tmp, args.per_kind)
+        cli = PhotoMetadataCLI()
+        results = {}
+        for kind_paths in files.values():
+            for path in kind_paths:
+                results[path] = expand_blobs(cli.extract_metadata(path), path)
+        records = [{'file_path': path, **metadata} for path, metadata in results.items()]
+
+    print(f"記錄數: {len(records)}")
+    print(f"{'後端':<8} {'格式':<6} {'逐筆 (記錄/秒)':>16} {'整批 dump (ms)':>16}")
+    print("-" * 52)
+    for pretty in (False, True):
+        outputs = {}
+        for backend in backends:
+            serializer = JSONSerializer(pretty, json_default, backend)
+            outputs[backend] = [serializer.dumps(record) for record in records]
+            elapsed = encode_all(serializer, records, args.repeat)
+            dumped = dump_all(serializer, results, args.repeat)
+            label = '美化' if pretty else '精簡'
+            print(f"{backend:<8} {label:<6} {len(records) / elapsed:>16.0f} {dumped * 1000:>16.2f}")
+        if any(output != outputs['json'] for output in outputs.values()):
+            print("錯誤：各後端的輸出不同")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相片記錄記憶體基準測試
+Photo Record Memory Benchmark
+
+比較在記憶體中保存大量提取結果時，三種表示法每筆記錄佔用的記憶體與提取耗時：
+
+    dict (全部)     extract_metadata()：以中文顯示文字為鍵、值已格式化的巢狀字典
+    dict (索引)     extract_metadata(path, ['basic', 'exif', 'gps'])：索引用到的區段
+    PhotoRecord     extract_record()：__slots__ 的有型別欄位，不產生顯示文字
+
+記憶體以 tracemalloc 量測保存 --copies 輪提取結果後增加的配置量，並換算成 100 萬筆的用量。
+
+使用方法:
+    python benchmarks/bench_records.py [--corpus DIR] [--per-kind 20] [--copies 10]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import generate_corpus
+from photo_metadata_cli import PhotoMetadataCLI
+
+INDEX_SECTIONS = ['basic', 'exif', 'gps']
+
+
+def extract_all(extract: Callable[[str], Any], files: List[str], copies: int) -> List[Any]:
+    return [extract(path) for _ in range(copies) for path in files]
+
+
+def bytes_per_record(extract: Callable[[str], Any], files: List[str], copies: int) -> float:
+    """保存 copies 輪提取結果後增加的配置量，除以記錄數"""
+    # 先提取一輪，讓延遲匯入與各種快取不計入
+    extract_all(extract, files, 1)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = extract_all(extract, files, copies)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(records)
+
+
+def ms_per_record(extract: Callable[[str], Any], files: List[str], copies: int) -> float:
+    start = time.perf_counter()
+    records = extract_all(extract, files, copies)
+    return (time.perf_counter() - start) * 1000 / len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='相片記錄記憶體基準測試')
+    parser.add_argument('--corpus', help='語料資料夾（預設使用暫存資料夾）')
+    parser.add_argument('--per-kind', type=int, default=20, help='每種語料類型的檔案數（預設 20）')
+    parser.add_argument('--copies', type=int, default=10, help='保存幾輪提取結果（預設 10）')
+    args = parser.parse_args()
+
+    cli = PhotoMetadataCLI()
+    representations = (
+        ('dict (全部)', cli.extract_metadata),
+        ('dict (索引)', lambda path: cli.extract_metadata(path, INDEX_SECTIONS)),
+        ('PhotoRecord', cli.extract_record),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [path for paths in generate_corpus(args.corpus or tmp, args.per_kind).values() for path in paths]
+        print(f"檔案數: {len(files)}，每種表示法保存 {len(files) * args.copies} 筆記錄")
+        print(f"{'表示法':<14} {'bytes/筆':>12} {'100 萬筆 (MB)':>14} {'提取 (ms/筆)':>14}")
+        print("-" * 58)
+        baseline = None
+        for name, extract in representations:
+            size = bytes_per_record(extract, files, args.copies)
+            elapsed = ms_per_record(extract, files, args.copies)
+            baseline = baseline or size
+            print(f"{name:<14} {size:>12,.0f} {size * 1_000_000 / 1024 ** 2:>14,.0f} {elapsed:>14.3f}"
+                  f"  ({size / baseline:.1%})")
+
+
+if __name__ == "__main__":
+    main()
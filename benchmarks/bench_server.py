@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機 HTTP 服務負載測試
+Local HTTP Service Load Test
+
+在 localhost 啟動 `photo_metadata_cli.py serve`，以多個 keep-alive 連線同時送出 /extract 請求，
+回報每秒請求數與 p50/p99 延遲，並與下列兩者比較：
+- 每次執行 photo_metadata_cli.py（直譯器啟動 + 匯入 Pillow/piexif + 解析）
+- 同一個行程中直接呼叫 extract_metadata()（純解析時間）
+
+使用方法:
+    python benchmarks/bench_server.py [--corpus DIR] [--per-kind 20] [--clients 4] [--requests 200] [--workers N]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import generate_corpus
+from photo_metadata_cli import PhotoMetadataCLI
+
+CLI_SCRIPT = str(ROOT / 'photo_metadata_cli.py')
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, CLI_SCRIPT, 'serve', '--port', str(port), '--workers', str(workers)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('服務沒有在 30 秒內啟動')
+
+
+def load_test(port: int, paths: List[str], clients: int, requests: int) -> Dict[str, float]:
+    """每個用戶端一條 keep-alive 連線，依序送出 requests 個請求"""
+    latencies: List[float] = []
+    rejected = [0]
+    lock = threading.Lock()
+
+    def client(offset: int):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        local = []
+        for i in range(requests):
+            body = json.dumps({'path': paths[(offset + i) % len(paths)]})
+            start = time.perf_counter()
+            connection.request('POST', '/extract', body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            local.append(time.perf_counter() - start)
+            if response.status == 503:
+                with lock:
+                    rejected[0] += 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i * 7,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'requests_per_s': len(latencies) / elapsed, 'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000, 'rejected': rejected[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本機 HTTP 服務負載測試')
+    parser.add_argument('--corpus', help='語料資料夾（預設使用暫存資料夾）')
+    parser.add_argument('--per-kind', type=int, default=20, help='每種語料類型的檔案數（預設 20）')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4], help='同時連線數（預設 1 4）')
+    parser.add_argument('--requests', type=int, default=200, help='每條連線的請求數（預設 200）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='服務的工作行程數')
+    parser.add_argument('--cli-runs', type=int, default=10, help='量測 CLI 執行的次數（預設 10）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = generate_corpus(args.corpus or tmp, args.per_kind)
+        paths = [path for kind_paths in files.values() for path in kind_paths]
+
+        cli = PhotoMetadataCLI()
+        start = time.perf_counter()
+        for path in paths:
+            cli.extract_metadata(path)
+        parse_ms = (time.perf_counter() - start) / len(paths) * 1000
+
+        start = time.perf_counter()
+        for i in range(args.cli_runs):
+            subprocess.run([sys.executable, CLI_SCRIPT, paths[i % len(paths)]], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=False)
+        cli_ms = (time.perf_counter() - start) / args.cli_runs * 1000
+
+        port = free_port()
+        server = start_server(port, args.workers)
+        try:
+            print(f"檔案數: {len(paths)}，服務工作行程: {args.workers}")
+            print(f"{'方式':<22} {'每秒請求':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'503':>6}")
+            print("-" * 62)
+            print(f"{'extract_metadata()':<22} {1000 / parse_ms:>10.1f} {parse_ms:>10.2f} {'':>10} {'':>6}")
+            print(f"{'執行 CLI':<22} {1000 / cli_ms:>10.1f} {cli_ms:>10.2f} {'':>10} {'':>6}")
+            for clients in args.clients:
+                result = load_test(port, paths, clients, args.requests)
+                label = f"HTTP（{clients} 條連線）"
+                print(f"{label:<22} {result['requests_per_s']:>10.1f} {result['p50_ms']:>10.2f} "
+                      f"{result['p99_ms']:>10.2f} {result['rejected']:>6}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
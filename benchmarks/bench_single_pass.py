@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+單次讀取基準測試
+Single-pass Reader Benchmark
+
+比較舊的讀取方式（Path.stat + Image.open/_getexif + piexif.load + 20 bytes 頭部檢查）
+與 exif_segment_reader 單次掃描在每個檔案上的讀取量與耗時。
+單次掃描透過 mmap 讀取，讀取量以實際觸及的分頁計算。
+
+使用方法:
+    python benchmarks/bench_single_pass.py <相片檔案或資料夾> [...] [--repeat 20]
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+import piexif
+
+from exif_segment_reader import scan_jpeg
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+
+
+def read_io_counters() -> Optional[Dict[str, int]]:
+    """讀取本行程的 I/O 計數（僅 Linux 提供 /proc/self/io）"""
+    try:
+        with open('/proc/self/io') as f:
+            return {k: int(v) for k, v in (line.split(': ') for line in f)}
+    except OSError:
+        return None
+
+
+def legacy_read(file_path: str) -> None:
+    """舊的讀取方式：同一個檔案開啟三到四次"""
+    Path(file_path).stat()
+    with Image.open(file_path) as img:
+        img.width, img.height
+        if hasattr(img, '_getexif'):
+            img._getexif()
+    try:
+        piexif.load(file_path)
+    except Exception:
+        pass
+    with open(file_path, 'rb') as f:
+        f.read(20)
+
+
+def single_pass_read(file_path: str) -> int:
+    """單次掃描：在記憶體映射上只觸及標記、EXIF 區段與 SOF 所在的分頁
+
+    回傳透過 mmap 觸及的位元組數（分頁缺頁讀取不會出現在 /proc/self/io）。
+    """
+    scan = scan_jpeg(file_path)
+    if not scan.usable:
+        legacy_read(file_path)
+        return scan.bytes_read
+    try:
+        scan.piexif_dict()
+    except Exception:
+        pass
+    scan.exif_dict()
+    return scan.bytes_read
+
+
+def measure(func, file_path: str, repeat: int) -> Dict[str, float]:
+    """量測單一檔案的讀取量與平均耗時"""
+    def run() -> int:
+        try:
+            return func(file_path) or 0
+        except Exception:
+            # 無法解析的檔案也計入讀取成本
+            return 0
+
+    # 先執行一次，避免把 PIL 外掛的延遲匯入算進讀取量
+    run()
+    before = read_io_counters()
+    mapped_bytes = run()
+    after = read_io_counters()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    result = {'ms': elapsed * 1000}
+    if before and after:
+        result['bytes_read'] = after['rchar'] - before['rchar'] + mapped_bytes
+        result['read_calls'] = after['syscr'] - before['syscr']
+    return result
+
+
+def collect_files(inputs: List[str]) -> List[str]:
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(str(p) for p in sorted(path.rglob('*')) if p.suffix.lower() in IMAGE_EXTENSIONS)
+        elif path.is_file():
+            files.append(str(path))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='單次讀取基準測試')
+    parser.add_argument('inputs', nargs='+', help='相片檔案或資料夾')
+    parser.add_argument('--repeat', type=int, default=20, help='每個檔案重複次數')
+    args = parser.parse_args()
+
+    files = collect_files(args.inputs)
+    if not files:
+        print("沒有找到相片檔案")
+        sys.exit(1)
+
+    print(f"{'檔案':<32} {'大小':>10} {'舊 bytes':>10} {'新 bytes':>10} {'舊 reads':>9} {'新 reads':>9} {'舊 ms':>8} {'新 ms':>8}")
+    print("-" * 104)
+    totals = {'legacy': 0.0, 'single': 0.0}
+    for file_path in files:
+        legacy = measure(legacy_read, file_path, args.repeat)
+        single = measure(single_pass_read, file_path, args.repeat)
+        totals['legacy'] += legacy['ms']
+        totals['single'] += single['ms']
+        print(f"{os.path.basename(file_path)[:32]:<32} {os.path.getsize(file_path):>10,} "
+              f"{legacy.get('bytes_read', '-'):>10} {single.get('bytes_read', '-'):>10} "
+              f"{legacy.get('read_calls', '-'):>9} {single.get('read_calls', '-'):>9} "
+              f"{legacy['ms']:>8.3f} {single['ms']:>8.3f}")
+
+    print("-" * 104)
+    print(f"平均耗時：舊 {totals['legacy'] / len(files):.3f} ms，新 {totals['single'] / len(files):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
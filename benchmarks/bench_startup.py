@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+啟動時間基準測試
+Startup Time Benchmark
+
+每張相片執行一次命令列（例如在 find -exec 或 shell 迴圈中）時，直譯器啟動與匯入模組的時間
+往往比提取本身還長。這裡以子行程量測下列命令從啟動到結束的時間，並以 `python -X importtime`
+列出匯入成本最高的模組、確認是否載入了 Pillow 與 piexif：
+
+    basic-only  photo_metadata_cli.py --basic-only <JPEG>（只需要檔案資訊，不應匯入 Pillow/piexif）
+    cli         photo_metadata_cli.py <JPEG>
+    simple      simple_exif_viewer.py <JPEG>
+    gui-import  import photo_metadata_extractor（當作函式庫使用，不應匯入 tkinter）
+    python      python -c pass（直譯器本身的啟動時間，作為下限）
+
+使用方法:
+    python benchmarks/bench_startup.py [--image photo.jpg] [--runs 20] [--top 10]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import generate_corpus
+
+# 檢查是否被匯入的重量級模組
+HEAVY_MODULES = ('PIL', 'piexif', 'numpy', 'pyarrow', 'tkinter', 'sqlite3', 'http.server', 'concurrent.futures')
+
+# 子行程要能寫入 .pyc，否則每次執行都重新編譯所有模組，量到的是編譯時間
+CHILD_ENV = {k: v for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE'}
+
+
+def commands(image: str) -> Dict[str, List[str]]:
+    return {
+        'basic-only': [str(ROOT / 'photo_metadata_cli.py'), '--basic-only', image],
+        'cli': [str(ROOT / 'photo_metadata_cli.py'), image],
+        'simple': [str(ROOT / 'simple_exif_viewer.py'), image],
+        'gui-import': ['-c', 'import photo_metadata_extractor'],
+        'python': ['-c', 'pass'],
+    }
+
+
+def wall_times(args: List[str], runs: int) -> List[float]:
+    """執行 runs 次，回傳每次的耗時（秒，已排序）"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, env=CHILD_ENV, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def import_times(args: List[str]) -> List[Tuple[str, int, int]]:
+    """以 -X importtime 執行一次，回傳 [(模組, 自身微秒, 累計微秒)]；巢狀匯入的模組名稱前有縮排"""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT, env=CHILD_ENV,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name[1:], int(self_us), int(cumulative_us)))
+    return modules
+
+
+def heavy_modules(modules: List[Tuple[str, int, int]]) -> List[str]:
+    names = {name.strip() for name, _, _ in modules}
+    return [heavy for heavy in HEAVY_MODULES if heavy in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='啟動時間基準測試')
+    parser.add_argument('--image', help='量測用的 JPEG（預設由 corpus.py 產生一張含 GPS 的相片）')
+    parser.add_argument('--runs', type=int, default=20, help='每個命令的執行次數（預設 20）')
+    parser.add_argument('--top', type=int, default=10, help='列出匯入成本最高的模組數（預設 10）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = args.image or generate_corpus(tmp, 1, kinds=('gps',))['gps'][0]
+
+        results = {}
+        for name, command in commands(image).items():
+            # 先執行一次，讓 .pyc 與檔案系統快取就緒
+            wall_times(command, 1)
+            results[name] = (wall_times(command, args.runs), import_times(command))
+
+    baseline = results['python'][0][len(results['python'][0]) // 2]
+    print(f"執行次數: {args.runs}，Python {sys.version.split()[0]}")
+    print(f"{'命令':<12} {'最小 (ms)':>10} {'p50 (ms)':>10} {'扣除直譯器 (ms)':>16} {'匯入 (ms)':>10}  載入的重量級模組")
+    print("-" * 96)
+    for name, (times, modules) in results.items():
+        p50 = times[len(times) // 2]
+        # 只計最外層的匯入（縮排最少），避免重複計算
+        imported = sum(cumulative for module, _, cumulative in modules if not module.startswith(' '))
+        print(f"{name:<12} {times[0] * 1000:>10.1f} {p50 * 1000:>10.1f} {(p50 - baseline) * 1000:>16.1f} "
+              f"{imported / 1000:>10.1f}  {', '.join(heavy_modules(modules)) or '-'}")
+
+    for name in ('basic-only', 'cli'):
+        modules = sorted(results[name][1], key=lambda m: m[1], reverse=True)[:args.top]
+        print(f"\n{name}：自身匯入時間最長的 {args.top} 個模組")
+        for module, self_us, cumulative_us in modules:
+            print(f"  {module.strip():<32} {self_us / 1000:>8.2f} ms（累計 {cumulative_us / 1000:.2f} ms）")
+
+
+if __name__ == "__main__":
+    main()
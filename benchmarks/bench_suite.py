@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提取效能基準測試
+Extraction Benchmark Suite
+
+在 corpus.py 產生的合成語料上量測三個提取入口：
+- gui：PhotoMetadataExtractor.get_all_metadata
+- cli：PhotoMetadataCLI.extract_metadata
+- simple：simple_exif_viewer.get_important_exif
+
+每個入口回報每秒檔案數、p50/p99 延遲與每個檔案的讀取量（read 系統呼叫加上
+mmap 觸及的分頁），整體與依語料類型分開統計，結果輸出為 JSON，方便比較不同版本。
+
+使用方法:
+    python benchmarks/bench_suite.py [--corpus DIR] [--per-kind 20] [--repeat 5] [--output result.json]
+    python benchmarks/bench_suite.py --compare old.json new.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import contextlib
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import generate_corpus, CORPUS_KINDS
+from mmap_scanner import MappedFile
+
+TARGETS = ('gui', 'cli', 'simple')
+
+# 結果格式改變時遞增
+RESULT_VERSION = 1
+
+
+def load_target(name: str) -> Callable[[str], Any]:
+    """載入提取入口；缺少相依套件（例如沒有 tkinter）時拋出 ImportError"""
+    if name == 'gui':
+        from photo_metadata_extractor import PhotoMetadataExtractor
+        # 只量測提取，不建立視窗
+        extractor = PhotoMetadataExtractor.__new__(PhotoMetadataExtractor)
+        return extractor.get_all_metadata
+    if name == 'cli':
+        from photo_metadata_cli import PhotoMetadataCLI
+        return PhotoMetadataCLI().extract_metadata
+    if name == 'simple':
+        from simple_exif_viewer import get_important_exif
+        return get_important_exif
+    raise ValueError(f"未知的提取入口: {name}")
+
+
+def read_io_counters() -> Optional[Dict[str, int]]:
+    """讀取本行程的 I/O 計數（僅 Linux 提供 /proc/self/io）"""
+    try:
+        with open('/proc/self/io') as f:
+            return {k: int(v) for k, v in (line.split(': ') for line in f)}
+    except OSError:
+        return None
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近排名法的百分位數"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], bytes_read: List[int]) -> Dict[str, Any]:
+    """整理一組量測結果（延遲單位為秒）"""
+    values = sorted(latencies)
+    total = sum(values)
+    return {
+        'calls': len(values),
+        'files_per_sec': len(values) / total if total else 0.0,
+        'mean_ms': total / len(values) * 1000 if values else 0.0,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': values[-1] * 1000 if values else 0.0,
+        'bytes_read_per_file': sum(bytes_read) / len(bytes_read) if bytes_read else None
+    }
+
+
+def run_target(func: Callable[[str], Any], files: Dict[str, List[str]], repeat: int) -> Dict[str, Any]:
+    """量測單一入口：每個檔案先執行一次暖機，再重複 repeat 次"""
+    by_kind = {}
+    all_latencies: List[float] = []
+    all_bytes: List[int] = []
+
+    for kind, paths in files.items():
+        latencies = []
+        bytes_read = []
+        for path in paths:
+            # 暖機：PIL 外掛的延遲匯入與第一次開檔不計入
+            func(path)
+            for _ in range(repeat):
+                before = read_io_counters()
+                mapped_before = MappedFile.total_bytes_touched
+                start = time.perf_counter()
+                func(path)
+                latencies.append(time.perf_counter() - start)
+                after = read_io_counters()
+                if before and after:
+                    bytes_read.append(after['rchar'] - before['rchar']
+                                      + MappedFile.total_bytes_touched - mapped_before)
+        by_kind[kind] = summarize(latencies, bytes_read)
+        all_latencies.extend(latencies)
+        all_bytes.extend(bytes_read)
+
+    return {'overall': summarize(all_latencies, all_bytes), 'by_kind': by_kind}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """記錄執行環境，比較不同版本的結果時用來確認條件相同"""
+    import PIL
+    import piexif
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pillow': PIL.__version__,
+        'piexif': piexif.VERSION,
+        'git_revision': git_revision()
+    }
+
+
+def run_suite(corpus_dir: str, per_kind: int, seed: int, repeat: int,
+              targets=TARGETS, kinds=CORPUS_KINDS) -> Dict[str, Any]:
+    files = generate_corpus(corpus_dir, per_kind, seed, kinds)
+    result = {
+        'version': RESULT_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': environment(),
+        'corpus': {'per_kind': per_kind, 'seed': seed, 'kinds': list(files),
+                   'bytes': {kind: sum(os.path.getsize(p) for p in paths) for kind, paths in files.items()}},
+        'repeat': repeat,
+        'targets': {}
+    }
+    for name in targets:
+        try:
+            func = load_target(name)
+        except ImportError as e:
+            result['targets'][name] = {'skipped': str(e)}
+            continue
+        # 提取過程中的診斷輸出不混入 JSON 結果
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result['targets'][name] = run_target(func, files, repeat)
+    return result
+
+
+def print_report(result: Dict[str, Any], stream=sys.stderr):
+    """以表格印出結果"""
+    print(f"{'入口':<8} {'類型':<12} {'檔案/秒':>10} {'p50 ms':>9} {'p99 ms':>9} {'bytes/檔':>12}", file=stream)
+    print("-" * 66, file=stream)
+    for name, target in result['targets'].items():
+        if 'skipped' in target:
+            print(f"{name:<8} 略過：{target['skipped']}", file=stream)
+            continue
+        rows = list(target['by_kind'].items()) + [('(全部)', target['overall'])]
+        for kind, stats in rows:
+            bytes_read = stats['bytes_read_per_file']
+            bytes_text = f"{bytes_read:,.0f}" if bytes_read is not None else '-'
+            print(f"{name:<8} {kind:<12} {stats['files_per_sec']:>10.1f} {stats['p50_ms']:>9.3f} "
+                  f"{stats['p99_ms']:>9.3f} {bytes_text:>12}", file=stream)
+
+
+def compare(old_path: str, new_path: str):
+    """比較兩次執行的結果（檔案/秒的比值，大於 1 表示變快）"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"舊: {old['environment'].get('git_revision')}  新: {new['environment'].get('git_revision')}")
+    print(f"{'入口':<8} {'類型':<12} {'舊 檔案/秒':>12} {'新 檔案/秒':>12} {'比值':>8} {'舊 p99':>9} {'新 p99':>9}")
+    print("-" * 78)
+    for name, new_target in new['targets'].items():
+        old_target = old['targets'].get(name)
+        if not old_target or 'skipped' in old_target or 'skipped' in new_target:
+            continue
+        rows = [(kind, old_target['by_kind'].get(kind), stats) for kind, stats in new_target['by_kind'].items()]
+        rows.append(('(全部)', old_target['overall'], new_target['overall']))
+        for kind, old_stats, new_stats in rows:
+            if not old_stats:
+                continue
+            ratio = new_stats['files_per_sec'] / old_stats['files_per_sec'] if old_stats['files_per_sec'] else 0.0
+            print(f"{name:<8} {kind:<12} {old_stats['files_per_sec']:>12.1f} {new_stats['files_per_sec']:>12.1f} "
+                  f"{ratio:>7.2f}x {old_stats['p99_ms']:>9.3f} {new_stats['p99_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='提取效能基準測試')
+    parser.add_argument('--corpus', default=os.path.join(tempfile.gettempdir(), 'photo_metadata_corpus'),
+                        help='語料資料夾（不存在時自動產生）')
+    parser.add_argument('--per-kind', type=int, default=20, help='每種類型的檔案數（預設 20）')
+    parser.add_argument('--seed', type=int, default=0, help='語料亂數種子（預設 0）')
+    parser.add_argument('--repeat', type=int, default=5, help='每個檔案重複次數（預設 5）')
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=list(TARGETS), help='要量測的入口')
+    parser.add_argument('--kinds', nargs='+', choices=CORPUS_KINDS, default=list(CORPUS_KINDS), help='語料類型')
+    parser.add_argument('-o', '--output', help='JSON 結果輸出檔案（預設輸出到標準輸出）')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='比較兩個 JSON 結果')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = run_suite(args.corpus, args.per_kind, args.seed, args.repeat, args.targets, args.kinds)
+    print_report(result)
+
+    data = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+        print(f"\n結果已儲存至: {args.output}", file=sys.stderr)
+    else:
+        print(data)
+
+
+if __name__ == "__main__":
+    main()
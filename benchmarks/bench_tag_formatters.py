@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+標籤格式化基準測試
+Tag Formatter Benchmark
+
+比較舊的 parse_exif_data（每次呼叫重建約 90 個標籤的對應表與各種值對應表，
+再逐一走 if/elif 判斷）與 exif_tags 預先建好的註冊表（每個標籤一次字典查詢），
+在同一批 EXIF 記錄上每個標籤的平均格式化成本。
+
+使用方法:
+    python benchmarks/bench_tag_formatters.py [--records 100000] [相片檔案 ...]
+
+指定相片時以相片的 EXIF 作為記錄樣本，否則使用內建的典型手機相片標籤。
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+from exif_tags import format_tags, IMPORTANT_TAG_REGISTRY
+
+# 典型手機相片的 EXIF（PIL _getexif() 的型別）
+SAMPLE_EXIF = {
+    271: 'Apple', 272: 'iPhone 13', 274: 1, 282: IFDRational(72, 1), 283: IFDRational(72, 1),
+    296: 2, 305: '16.1', 306: '2023:05:01 10:20:30', 531: 1, 34665: 210, 34853: 1000,
+    33434: IFDRational(1, 120), 33437: IFDRational(16, 10), 34850: 2, 34855: 50,
+    36864: b'0232', 36867: '2023:05:01 10:20:30', 36868: '2023:05:01 10:20:30',
+    36880: '+08:00', 36881: '+08:00', 37121: b'\x01\x02\x03\x00',
+    37377: IFDRational(6906, 1000), 37378: IFDRational(1356, 1000), 37379: IFDRational(24, 10),
+    37380: 0, 37383: 5, 37385: 16, 37386: IFDRational(51, 10), 37395: 24, 37396: IFDRational(51, 10),
+    37500: b'Apple iOS\x00\x00\x01MM' + bytes(64), 37521: '123', 37522: '123',
+    40960: b'0100', 40961: 65535, 40962: 4032, 40963: 3024, 41495: 2, 41729: b'\x01',
+    41986: 0, 41987: 0, 41989: 26, 41990: 0,
+    42034: (IFDRational(1, 1), IFDRational(6, 1), IFDRational(16, 10), IFDRational(24, 10)),
+    42035: 'Apple', 42036: 'iPhone 13 back dual wide camera 5.1mm f/1.6'
+}
+
+
+def legacy_parse_exif_data(exif_data: Dict) -> Dict[str, Any]:
+    """舊版 PhotoMetadataExtractor.parse_exif_data（保留原樣作為對照）"""
+    parsed_data = {}
+
+    important_tags = {
+        271: '相機品牌', 272: '相機型號', 306: '拍攝時間', 36867: '原始拍攝時間',
+        37377: '光圈值', 37387: '快門速度', 37380: 'ISO 感光度', 37396: '焦距',
+        37395: '閃光燈', 41987: '白平衡', 41990: '場景模式', 41992: '對比度',
+        41993: '飽和度', 41994: '銳利度', 42035: '鏡頭品牌', 42036: '鏡頭型號',
+        256: '圖片寬度', 257: '圖片高度', 274: '方向', 296: '解析度單位',
+        282: 'X 解析度', 283: 'Y 解析度', 531: 'YCbCr 定位', 34665: 'EXIF 偏移',
+        36864: 'EXIF 版本', 40960: 'FlashPix 版本', 40961: '色彩空間', 40962: '像素 X 維度',
+        40963: '像素 Y 維度', 40965: '互通性 IFD 指標', 36880: '時區偏移', 36881: '原始時區偏移',
+        36868: '數位化時間', 37378: '曝光程式', 37379: '光譜敏感度', 37381: '光電轉換函數',
+        37382: 'EXIF 版本', 37383: '原始日期時間', 37384: '數位化日期時間', 37385: '元件配置',
+        37386: '壓縮位元數', 37388: '光圈值', 37389: '亮度值', 37390: '曝光偏差值',
+        37391: '最大光圈值', 37392: '主體距離', 37393: '測光模式', 37394: '光源',
+        37398: '製造商註記', 37399: '使用者註記', 37400: '子秒時間', 37401: '原始子秒時間',
+        37402: '數位化子秒時間', 37500: 'FlashPix 版本', 37510: '色彩空間', 37520: '像素 X 維度',
+        37521: '像素 Y 維度', 37522: '相關音訊檔案', 41483: '閃光燈', 41484: '閃光燈返回光',
+        41485: '閃光燈模式', 41486: '閃光燈功能', 41487: '閃光燈紅眼模式', 41488: '閃光燈曝光補償',
+        41492: '閃光燈來源', 41493: '閃光燈狀態', 41494: '閃光燈模式', 41985: '自訂渲染',
+        41986: '曝光模式', 41988: '數位變焦比例', 41989: '35mm 膠片焦距', 41991: '增益控制',
+        41995: '裝置設定描述', 41996: '主體距離範圍', 42016: '影像唯一 ID', 42032: '相機擁有者名稱',
+        42033: '機身序號', 42034: '鏡頭規格', 42037: '鏡頭序號'
+    }
+
+    for tag_id, value in exif_data.items():
+        if tag_id in important_tags:
+            tag_name = important_tags[tag_id]
+
+            if tag_id == 37377:
+                if isinstance(value, tuple) and len(value) == 2:
+                    value = f"f/{value[0]/value[1]:.1f}"
+                else:
+                    value = f"f/{value/100}" if value > 0 else str(value)
+            elif tag_id == 37387:
+                if isinstance(value, tuple) and len(value) == 2:
+                    value = f"1/{int(value[0]/value[1])}s"
+                else:
+                    value = f"1/{int(2**value)}s" if value > 0 else str(value)
+            elif tag_id == 37396:
+                value = f"{value}mm"
+            elif tag_id == 37380:
+                if isinstance(value, tuple) and len(value) == 2:
+                    value = f"ISO {value[0]}"
+                else:
+                    value = f"ISO {value}"
+            elif tag_id == 37395:
+                flash_values = {
+                    0: "未使用", 1: "使用", 9: "強制使用", 16: "關閉",
+                    24: "未使用，自動模式", 25: "使用，自動模式",
+                    32: "未使用，無閃光燈功能", 65: "使用，紅眼減少",
+                    73: "強制使用，紅眼減少", 89: "使用，自動模式，紅眼減少"
+                }
+                value = flash_values.get(value, str(value))
+            elif tag_id == 41987:
+                wb_values = {0: "自動", 1: "手動"}
+                value = wb_values.get(value, str(value))
+            elif tag_id == 41990:
+                scene_values = {0: "標準", 1: "風景", 2: "人像", 3: "夜景"}
+                value = scene_values.get(value, str(value))
+            elif tag_id == 41992:
+                contrast_values = {0: "正常", 1: "柔和", 2: "強烈"}
+                value = contrast_values.get(value, str(value))
+            elif tag_id == 41993:
+                saturation_values = {0: "正常", 1: "低飽和度", 2: "高飽和度"}
+                value = saturation_values.get(value, str(value))
+            elif tag_id == 41994:
+                sharpness_values = {0: "正常", 1: "柔和", 2: "強烈"}
+                value = sharpness_values.get(value, str(value))
+            elif tag_id == 274:
+                orientation_values = {
+                    1: "正常", 2: "水平翻轉", 3: "旋轉180度",
+                    4: "垂直翻轉", 5: "水平翻轉+順時針90度",
+                    6: "順時針90度", 7: "水平翻轉+逆時針90度",
+                    8: "逆時針90度"
+                }
+                value = orientation_values.get(value, str(value))
+            elif tag_id == 296:
+                unit_values = {1: "無", 2: "英寸", 3: "公分"}
+                value = unit_values.get(value, str(value))
+            elif isinstance(value, bytes):
+                try:
+                    for encoding in ['utf-8', 'latin-1', 'cp1252', 'gbk']:
+                        try:
+                            decoded_value = value.decode(encoding)
+                            if decoded_value and decoded_value.isprintable():
+                                value = decoded_value
+                                break
+                        except:
+                            continue
+                    else:
+                        continue
+                except:
+                    continue
+            elif isinstance(value, tuple):
+                if len(value) == 3 and all(isinstance(x, (int, float)) for x in value):
+                    value = f"({value[0]}, {value[1]}, {value[2]})"
+                elif len(value) == 2 and all(isinstance(x, (int, float)) for x in value):
+                    value = f"({value[0]}, {value[1]})"
+                else:
+                    value = str(value)
+
+            parsed_data[tag_name] = value
+
+    return parsed_data
+
+
+def registry_parse_exif_data(exif_data: Dict) -> Dict[str, Any]:
+    """新版：預先建好的註冊表"""
+    return format_tags(exif_data, IMPORTANT_TAG_REGISTRY)
+
+
+def load_samples(paths: List[str]) -> List[Dict]:
+    samples = []
+    for path in paths:
+        try:
+            with Image.open(path) as img:
+                exif_data = img._getexif() if hasattr(img, '_getexif') else None
+        except Exception as e:
+            print(f"略過 {path}: {e}")
+            continue
+        if exif_data:
+            samples.append(exif_data)
+    return samples or [SAMPLE_EXIF]
+
+
+def measure(func, records: List[Dict]) -> float:
+    """回傳處理整批記錄的秒數（取三次中最快的一次）"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for exif_data in records:
+            func(exif_data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='標籤格式化基準測試')
+    parser.add_argument('photos', nargs='*', help='作為記錄樣本的相片（預設使用內建樣本）')
+    parser.add_argument('--records', type=int, default=100_000, help='記錄數（預設 100000）')
+    args = parser.parse_args()
+
+    samples = load_samples(args.photos)
+    records = [samples[i % len(samples)] for i in range(args.records)]
+    tag_count = sum(len(exif_data) for exif_data in records)
+
+    # 兩種實作的輸出必須相同（位元組值改由 exif_text 依標籤解碼，不列入比較）
+    for exif_data in samples:
+        exif_data = {tag_id: value for tag_id, value in exif_data.items() if not isinstance(value, bytes)}
+        if repr(legacy_parse_exif_data(exif_data)) != repr(registry_parse_exif_data(exif_data)):
+            print("錯誤：新舊實作的輸出不同")
+            sys.exit(1)
+
+    legacy = measure(legacy_parse_exif_data, records)
+    registry = measure(registry_parse_exif_data, records)
+
+    print(f"記錄數: {len(records):,}，標籤數: {tag_count:,}")
+    print(f"{'實作':<12} {'總耗時 (s)':>12} {'每筆 (us)':>12} {'每個標籤 (ns)':>14}")
+    print("-" * 54)
+    for name, elapsed in (('if/elif', legacy), ('註冊表', registry)):
+        print(f"{name:<12} {elapsed:>12.3f} {elapsed / len(records) * 1e6:>12.2f} "
+              f"{elapsed / tag_count * 1e9:>14.1f}")
+    print("-" * 54)
+    print(f"加速: {legacy / registry:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
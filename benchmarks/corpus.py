@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成相片語料產生器
+Synthetic Photo Corpus Generator
+
+以 Pillow + piexif 離線產生可重現的測試相片（相同的 seed 產生相同的檔案內容）：
+- noexif：沒有 EXIF 的 JPEG
+- exif：一般相機 EXIF 的 JPEG
+- gps：含 GPS IFD 的 JPEG
+- makernote：含大型 MakerNote 的 JPEG
+- progressive：漸進式 JPEG
+- png：含 eXIf 區塊的 PNG
+- tiff：含 EXIF 與 GPS 的 TIFF
+
+使用方法:
+    python benchmarks/corpus.py <輸出資料夾> [--per-kind 20] [--seed 0]
+"""
+
+import os
+import json
+import random
+import argparse
+from typing import Dict, List
+
+from PIL import Image
+import piexif
+
+CORPUS_KINDS = ('noexif', 'exif', 'gps', 'makernote', 'progressive', 'png', 'tiff')
+
+# 語料格式改變時遞增，舊的語料資料夾會重新產生
+CORPUS_VERSION = 1
+
+MANIFEST_NAME = 'manifest.json'
+
+DEFAULT_SIZE = (1024, 768)
+MAKERNOTE_SIZE = 48 * 1024
+
+CAMERAS = [
+    (b'Apple', b'iPhone 13', b'iPhone 13 back dual wide camera 5.1mm f/1.6'),
+    (b'samsung', b'SM-G991B', b'Samsung 5.4mm f/1.8'),
+    (b'Canon', b'Canon EOS R6', b'RF24-105mm F4 L IS USM'),
+    (b'SONY', b'ILCE-7M3', b'FE 35mm F1.8'),
+]
+
+
+def make_pixels(rng: random.Random, size=DEFAULT_SIZE) -> Image.Image:
+    """由小尺寸的隨機色塊放大成平滑的圖片，壓縮後的大小接近一般相片"""
+    small = Image.frombytes('RGB', (16, 12), rng.randbytes(16 * 12 * 3))
+    return small.resize(size, Image.BILINEAR)
+
+
+def to_rational(value: float, precision: int = 10000):
+    return (int(round(value * precision)), precision)
+
+
+def to_dms(value: float):
+    """十進位度數轉成度分秒的有理數"""
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = (value - degrees - minutes / 60) * 3600
+    return ((degrees, 1), (minutes, 1), to_rational(seconds, 100))
+
+
+def make_exif(rng: random.Random, index: int, gps: bool = False, makernote: bool = False) -> Dict:
+    """產生 piexif 格式的 EXIF 字典"""
+    make, model, lens = CAMERAS[index % len(CAMERAS)]
+    timestamp = f"2023:{index % 12 + 1:02d}:{index % 28 + 1:02d} {index % 24:02d}:{index % 60:02d}:00".encode()
+    exif_dict = {
+        '0th': {
+            piexif.ImageIFD.Make: make,
+            piexif.ImageIFD.Model: model,
+            piexif.ImageIFD.Orientation: rng.choice([1, 1, 1, 6, 8, 3]),
+            piexif.ImageIFD.XResolution: (72, 1),
+            piexif.ImageIFD.YResolution: (72, 1),
+            piexif.ImageIFD.ResolutionUnit: 2,
+            piexif.ImageIFD.Software: b'16.1',
+            piexif.ImageIFD.DateTime: timestamp,
+            piexif.ImageIFD.YCbCrPositioning: 1,
+        },
+        'Exif': {
+            piexif.ExifIFD.ExposureTime: (1, rng.choice([30, 60, 120, 250, 1000])),
+            piexif.ExifIFD.FNumber: to_rational(rng.choice([1.6, 1.8, 2.8, 4.0, 5.6]), 10),
+            piexif.ExifIFD.ExposureProgram: 2,
+            piexif.ExifIFD.ISOSpeedRatings: rng.choice([50, 100, 200, 400, 800, 3200]),
+            piexif.ExifIFD.ExifVersion: b'0232',
+            piexif.ExifIFD.DateTimeOriginal: timestamp,
+            piexif.ExifIFD.DateTimeDigitized: timestamp,
+            piexif.ExifIFD.OffsetTime: b'+08:00',
+            piexif.ExifIFD.ComponentsConfiguration: b'\x01\x02\x03\x00',
+            piexif.ExifIFD.ShutterSpeedValue: to_rational(rng.uniform(4, 10), 1000),
+            piexif.ExifIFD.ApertureValue: to_rational(rng.uniform(1.3, 5.0), 1000),
+            piexif.ExifIFD.BrightnessValue: (rng.randint(-5000, 10000), 1000),
+            piexif.ExifIFD.ExposureBiasValue: (0, 1),
+            piexif.ExifIFD.MeteringMode: 5,
+            piexif.ExifIFD.Flash: rng.choice([0, 16, 24, 25]),
+            piexif.ExifIFD.FocalLength: to_rational(rng.choice([5.1, 6.0, 24.0, 35.0, 50.0]), 10),
+            piexif.ExifIFD.SubSecTimeOriginal: b'123',
+            piexif.ExifIFD.FlashpixVersion: b'0100',
+            piexif.ExifIFD.ColorSpace: 1,
+            piexif.ExifIFD.PixelXDimension: DEFAULT_SIZE[0],
+            piexif.ExifIFD.PixelYDimension: DEFAULT_SIZE[1],
+            piexif.ExifIFD.SensingMethod: 2,
+            piexif.ExifIFD.SceneType: b'\x01',
+            piexif.ExifIFD.ExposureMode: 0,
+            piexif.ExifIFD.WhiteBalance: rng.choice([0, 1]),
+            piexif.ExifIFD.FocalLengthIn35mmFilm: rng.choice([26, 28, 35, 50]),
+            piexif.ExifIFD.SceneCaptureType: 0,
+            piexif.ExifIFD.LensMake: make,
+            piexif.ExifIFD.LensModel: lens,
+        },
+        'GPS': {},
+        '1st': {},
+        'thumbnail': None,
+    }
+
+    if makernote:
+        # 廠商私有格式：內容隨機，只在意大小
+        exif_dict['Exif'][piexif.ExifIFD.MakerNote] = b'Apple iOS\x00\x00\x01MM' + rng.randbytes(MAKERNOTE_SIZE)
+
+    if gps:
+        lat = rng.uniform(-60, 60)
+        lon = rng.uniform(-180, 180)
+        exif_dict['GPS'] = {
+            piexif.GPSIFD.GPSVersionID: (2, 2, 0, 0),
+            piexif.GPSIFD.GPSLatitudeRef: b'N' if lat >= 0 else b'S',
+            piexif.GPSIFD.GPSLatitude: to_dms(lat),
+            piexif.GPSIFD.GPSLongitudeRef: b'E' if lon >= 0 else b'W',
+            piexif.GPSIFD.GPSLongitude: to_dms(lon),
+            piexif.GPSIFD.GPSAltitudeRef: 0,
+            piexif.GPSIFD.GPSAltitude: to_rational(rng.uniform(0, 3000), 100),
+            piexif.GPSIFD.GPSTimeStamp: ((index % 24, 1), (index % 60, 1), (0, 1)),
+            piexif.GPSIFD.GPSDateStamp: b'2023:05:01',
+        }
+    return exif_dict
+
+
+def write_photo(path: str, kind: str, rng: random.Random, index: int):
+    """產生單一相片"""
+    img = make_pixels(rng)
+    if kind == 'noexif':
+        img.save(path, 'JPEG', quality=85)
+        return
+
+    exif_bytes = piexif.dump(make_exif(rng, index, gps=kind in ('gps', 'tiff', 'png'),
+                                       makernote=kind == 'makernote'))
+    if kind in ('exif', 'gps', 'makernote'):
+        img.save(path, 'JPEG', quality=85, exif=exif_bytes)
+    elif kind == 'progressive':
+        img.save(path, 'JPEG', quality=85, exif=exif_bytes, progressive=True)
+    elif kind == 'png':
+        img.save(path, 'PNG', exif=exif_bytes)
+    elif kind == 'tiff':
+        # piexif 的位移是相對於它自己的區段配置，交給 PIL 重新編排成 TIFF 的 IFD
+        exif = Image.Exif()
+        exif.load(exif_bytes)
+        img.save(path, 'TIFF', exif=exif)
+    else:
+        raise ValueError(f"未知的語料類型: {kind}")
+
+
+def corpus_extension(kind: str) -> str:
+    return {'png': '.png', 'tiff': '.tif'}.get(kind, '.jpg')
+
+
+def generate_corpus(output_dir: str, per_kind: int = 20, seed: int = 0,
+                    kinds=CORPUS_KINDS) -> Dict[str, List[str]]:
+    """產生語料，回傳 {類型: [檔案路徑]}
+
+    資料夾中已有相同參數產生的語料時直接沿用。
+    """
+    params = {'version': CORPUS_VERSION, 'per_kind': per_kind, 'seed': seed, 'kinds': list(kinds)}
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['params'] == params and all(
+                os.path.exists(path) for paths in manifest['files'].values() for path in paths):
+            return manifest['files']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = {}
+    for kind in kinds:
+        # 每個類型各自的亂數序列，增減類型不會影響其他類型的內容
+        rng = random.Random(f"{seed}:{kind}")
+        files[kind] = []
+        for i in range(per_kind):
+            path = os.path.join(output_dir, f"{kind}_{i:04d}{corpus_extension(kind)}")
+            write_photo(path, kind, rng, i)
+            files[kind].append(path)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'params': params, 'files': files}, f, indent=2)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='產生合成相片語料')
+    parser.add_argument('output_dir', help='輸出資料夾')
+    parser.add_argument('--per-kind', type=int, default=20, help='每種類型的檔案數（預設 20）')
+    parser.add_argument('--seed', type=int, default=0, help='亂數種子（預設 0）')
+    args = parser.parse_args()
+
+    files = generate_corpus(args.output_dir, args.per_kind, args.seed)
+    for kind, paths in files.items():
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"{kind:<12} {len(paths):>5} 個檔案 {size / 1024:>10.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
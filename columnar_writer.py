@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+欄位式輸出（Parquet / Arrow）
+Columnar Export for Batch Results
+
+把批次結果寫成有型別的欄位式檔案，方便直接載入 dataframe 分析：
+- 欄位名稱固定且不含中文（見 EXPORT_COLUMNS），不隨顯示文字改變；值直接取自 PhotoRecord 的有型別欄位
+- ISO、光圈、曝光時間、焦距是數值欄位，拍攝時間與修改時間是 timestamp，GPS 是 float64
+- 每累積 batch_rows 筆就寫出一個 record batch（Parquet 的一個 row group），記憶體用量固定
+
+需要安裝 pyarrow（選用依賴）；Parquet 適合長期保存與跨工具使用，
+Arrow IPC（Feather v2）讀取時不需要解碼，適合同一台機器上的後續處理。
+"""
+
+import os
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from photo_record import PhotoRecord, ratio
+
+# pyarrow 匯入需要數百毫秒，只有實際輸出 Parquet/Arrow 時才匯入（見 _require_pyarrow）
+pa = None
+
+EXPORT_FORMATS = ('parquet', 'arrow')
+
+# 依副檔名推斷輸出格式
+FORMAT_EXTENSIONS = {'.parquet': 'parquet', '.pq': 'parquet',
+                     '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
+
+# 每個 record batch 的列數
+DEFAULT_BATCH_ROWS = 65536
+
+# 欄位定義改變時遞增，寫在檔案的 schema metadata
+EXPORT_SCHEMA_VERSION = 1
+
+
+def _ratio(name: str) -> Callable[[PhotoRecord], Optional[float]]:
+    # 記錄中保留 EXIF 的有理數，輸出時才換算
+    return lambda record: ratio(getattr(record, name))
+
+
+# (欄位名稱, 型別, 從 PhotoRecord 取值的函式)；型別名稱對應 _arrow_type()
+EXPORT_COLUMNS: Tuple[Tuple[str, str, Callable[[PhotoRecord], Any]], ...] = (
+    ('file_path', 'string', attrgetter('file_path')),
+    ('file_name', 'string', attrgetter('file_name')),
+    ('file_size', 'int64', attrgetter('file_size')),
+    ('modified_time', 'timestamp', attrgetter('modified_time')),
+    ('image_format', 'string', attrgetter('image_format')),
+    ('width', 'int32', attrgetter('width')),
+    ('height', 'int32', attrgetter('height')),
+    ('make', 'string', attrgetter('make')),
+    ('model', 'string', attrgetter('model')),
+    ('lens_model', 'string', attrgetter('lens_model')),
+    ('datetime_original', 'timestamp', attrgetter('datetime_original')),
+    ('iso', 'int32', attrgetter('iso')),
+    ('f_number', 'float64', _ratio('f_number')),
+    ('exposure_time', 'float64', _ratio('exposure_time')),
+    ('focal_length', 'float64', _ratio('focal_length')),
+    ('focal_length_35mm', 'int32', attrgetter('focal_length_35mm')),
+    ('flash', 'int32', attrgetter('flash')),
+    ('orientation', 'int32', attrgetter('orientation')),
+    ('gps_latitude', 'float64', attrgetter('gps_latitude')),
+    ('gps_longitude', 'float64', attrgetter('gps_longitude')),
+    ('gps_altitude', 'float64', attrgetter('gps_altitude')),
+    ('error', 'string', attrgetter('error')),
+)
+
+
+def format_for_path(output_path: str) -> Optional[str]:
+    """依副檔名推斷輸出格式；無法判斷時回傳 None"""
+    return FORMAT_EXTENSIONS.get(os.path.splitext(output_path)[1].lower())
+
+
+def _require_pyarrow():
+    global pa
+    if pa is None:
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError("輸出 Parquet/Arrow 需要安裝 pyarrow：pip install pyarrow")
+        pa = pyarrow
+
+
+def _arrow_type(name: str):
+    return {
+        'string': pa.string(),
+        'int64': pa.int64(),
+        'int32': pa.int32(),
+        'float64': pa.float64(),
+        # EXIF 的拍攝時間沒有時區，保留為當地時間（Parquet 沒有秒為單位的 timestamp，統一用毫秒）
+        'timestamp': pa.timestamp('ms'),
+    }[name]
+
+
+def export_schema():
+    """輸出檔案的 Arrow schema"""
+    _require_pyarrow()
+    return pa.schema([pa.field(name, _arrow_type(type_name)) for name, type_name, _ in EXPORT_COLUMNS],
+                     metadata={'photo_metadata_schema_version': str(EXPORT_SCHEMA_VERSION)})
+
+
+class ColumnarWriter:
+    """逐筆寫入、分批寫出 Parquet 或 Arrow IPC 檔案（用法與 NDJSONWriter 相同）"""
+
+    def __init__(self, output_path: str, export_format: Optional[str] = None,
+                 batch_rows: int = DEFAULT_BATCH_ROWS):
+        _require_pyarrow()
+        export_format = export_format or format_for_path(output_path) or 'parquet'
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"不支援的輸出格式: {export_format}")
+        if output_path == '-':
+            raise ValueError("Parquet/Arrow 輸出必須指定檔案路徑")
+
+        self.output_path = output_path
+        self.export_format = export_format
+        self.batch_rows = max(1, batch_rows)
+        self.records_written = 0
+        self.schema = export_schema()
+        self._columns: List[List[Any]] = [[] for _ in EXPORT_COLUMNS]
+
+        if export_format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(output_path, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(output_path, self.schema)
+
+    def write(self, record: Union[PhotoRecord, Dict[str, Any]]):
+        """寫入一筆記錄（PhotoRecord，或含 'file_path' 的批次結果）"""
+        if not isinstance(record, PhotoRecord):
+            record = PhotoRecord.from_metadata(record)
+        for column, (_, _, get) in zip(self._columns, EXPORT_COLUMNS):
+            column.append(get(record))
+        self.records_written += 1
+        if len(self._columns[0]) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """把累積的列寫成一個 record batch"""
+        if not self._columns[0]:
+            return
+        arrays = [pa.array(values, type=field.type) for values, field in zip(self._columns, self.schema)]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        for column in self._columns:
+            column.clear()
+
+    def close(self):
+        """寫出剩餘資料並關閉檔案"""
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料夾監看
+Directory Watcher
+
+監看資料夾（含子資料夾）中新增或修改的相片，持續收到新相片的匯入資料夾
+只需要處理變更的檔案，不必重新掃描整個相片庫：
+- Linux 使用 inotify（以 ctypes 呼叫 libc，不需要額外套件），由核心直接通知變更
+- 其他平台、inotify 無法使用，或是網路磁碟（NFS/SMB 看不到其他電腦的寫入）時改為定期輪詢：
+  只有修改時間改變的資料夾才重新列出內容，已知的相片每次只需要一次 stat()
+- 同一個檔案在 debounce 秒內持續有寫入時視為還在複製，安靜下來之後才交出
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from batch_extractor import is_image_file
+
+# 檔案最後一次變更後要安靜多久（秒）才交出
+DEFAULT_DEBOUNCE = 2.0
+
+# 輪詢間隔（秒）
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify 常數（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# 寫入中（IN_MODIFY）也要記錄，才能在持續寫入時延後交出
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+# struct inotify_event 的固定部分：wd、mask、cookie、len，後面接 len 個位元組的檔名
+_EVENT = struct.Struct('iIII')
+
+# 一次讀取的事件緩衝區大小
+_READ_SIZE = 64 * 1024
+
+
+class DirectoryWatcher:
+    """監看器的共同邏輯：記錄待處理的相片，安靜 debounce 秒後才交出"""
+
+    # 'inotify' 或 'polling'
+    method = ''
+
+    def __init__(self, directories: Iterable[str], debounce: float = DEFAULT_DEBOUNCE,
+                 interval: float = DEFAULT_POLL_INTERVAL):
+        self.directories = list(directories)
+        self.debounce = max(0.0, debounce)
+        # 沒有待處理的檔案時最長等待多久
+        self.interval = interval
+        self.closed = False
+        # 相片路徑 → 最後一次變更的時間（time.monotonic()）
+        self._pending: Dict[str, float] = {}
+
+    def _touch(self, path: str):
+        self._pending[path] = time.monotonic()
+
+    def _timeout(self) -> float:
+        """等到下一個檔案安靜下來的秒數（最多 interval）"""
+        if not self._pending:
+            return self.interval
+        wait = min(self._pending.values()) + self.debounce - time.monotonic()
+        return max(0.0, min(self.interval, wait))
+
+    def _take_ready(self) -> List[str]:
+        now = time.monotonic()
+        ready = [path for path, changed in self._pending.items() if now - changed >= self.debounce]
+        for path in ready:
+            del self._pending[path]
+        # 等待期間已被刪除或改名的檔案不交出
+        return sorted(path for path in ready if os.path.isfile(path))
+
+    def _wait(self, timeout: float):
+        """等待並記錄變更（由子類別實作）"""
+        raise NotImplementedError
+
+    def changes(self) -> Iterator[List[str]]:
+        """持續產生一批批寫入完成的相片路徑（依名稱排序），直到 close()"""
+        while not self.closed:
+            self._wait(self._timeout())
+            ready = self._take_ready()
+            if ready:
+                yield ready
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """以 Linux inotify 監看；子資料夾各自需要一個 watch，新建立的子資料夾自動加入"""
+
+    method = 'inotify'
+
+    def __init__(self, directories: Iterable[str], debounce: float = DEFAULT_DEBOUNCE):
+        # 沒有事件時也定期醒來檢查是否已 close()
+        super().__init__(directories, debounce, interval=1.0)
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify 只支援 Linux')
+        # ctypes 只有 inotify 需要，不在模組載入時匯入
+        import ctypes
+        import ctypes.util
+        self._get_errno = ctypes.get_errno
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            self._init1 = libc.inotify_init1
+            self._add = libc.inotify_add_watch
+        except (OSError, AttributeError) as e:
+            raise OSError(errno.ENOSYS, f'無法使用 inotify: {e}')
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = self._init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f'inotify_init1: {os.strerror(code)}')
+        # watch descriptor → 資料夾路徑
+        self._watches: Dict[int, str] = {}
+        # 上一次讀取事件的時間，事件佇列溢位時用來找出可能遺漏的檔案
+        self._last_read = time.time_ns()
+        try:
+            for directory in self.directories:
+                self._add_tree(directory)
+        except BaseException:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: str) -> bool:
+        wd = self._add(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            code = self._get_errno()
+            if code in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                # 資料夾已被刪除或沒有讀取權限
+                return False
+            hint = '（請提高 fs.inotify.max_user_watches）' if code == errno.ENOSPC else ''
+            raise OSError(code, f'無法監看資料夾{hint}: {directory}')
+        # 移動過的資料夾會拿到同一個 wd，路徑以最新的為準
+        self._watches[wd] = directory
+        return True
+
+    def _add_tree(self, directory: str, since: Optional[int] = None):
+        """監看資料夾與所有子資料夾
+
+        since 不是 None 時，把其中修改或變更時間（ns）不早於 since 的相片視為變更：
+        新建立的資料夾在加入監看前可能已經寫入了檔案。先建立監看再列出內容，兩者之間的檔案
+        可能被記錄兩次，但不會遺漏。
+        """
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            if not self._add_watch(current):
+                continue
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif since is not None and entry.is_file() and is_image_file(entry.name):
+                        stat = entry.stat()
+                        # 以 cp -p、rsync -t 搬入的檔案保留舊的修改時間，但 ctime 會更新
+                        if max(stat.st_mtime_ns, stat.st_ctime_ns) >= since:
+                            self._touch(entry.path)
+                except OSError:
+                    continue
+
+    def _wait(self, timeout: float):
+        try:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if not readable:
+                return
+            read_at = time.time_ns()
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return
+        except (OSError, ValueError):
+            # 其他執行緒在等待期間 close()
+            if self.closed:
+                return
+            raise
+        self._handle(data)
+        self._last_read = read_at
+
+    def _handle(self, data: bytes):
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # 短時間內變更太多，事件已遺失：重新掃描上次讀取之後變更過的檔案（留一秒餘裕給
+                # 時間解析度較粗的檔案系統）
+                for directory in self.directories:
+                    self._add_tree(directory, since=self._last_read - 1_000_000_000)
+                continue
+            if mask & IN_IGNORED:
+                # 資料夾已被刪除
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path, since=0)
+            elif is_image_file(path):
+                self._touch(path)
+
+    def close(self):
+        if not self.closed and getattr(self, 'fd', -1) >= 0:
+            os.close(self.fd)
+        super().close()
+
+
+class PollingWatcher(DirectoryWatcher):
+    """定期輪詢：資料夾的修改時間改變才重新列出內容，已知的相片比對大小與修改時間"""
+
+    method = 'polling'
+
+    def __init__(self, directories: Iterable[str], debounce: float = DEFAULT_DEBOUNCE,
+                 interval: float = DEFAULT_POLL_INTERVAL):
+        super().__init__(directories, debounce, max(0.01, interval))
+        # 資料夾 → 修改時間；相片 → (大小, 修改時間)
+        self._dirs: Dict[str, int] = {}
+        self._files: Dict[str, Tuple[int, int]] = {}
+        for directory in self.directories:
+            self._scan_tree(directory, report=False)
+
+    def _scan_dir(self, directory: str, report: bool) -> List[str]:
+        """列出資料夾內容，記錄還不認識的相片；回傳子資料夾"""
+        try:
+            # 先取修改時間再列出內容：列出期間的變更會在下一次輪詢時再列一次
+            self._dirs[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            self._dirs.pop(directory, None)
+            return []
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.path not in self._files and entry.is_file() and is_image_file(entry.name):
+                    stat = entry.stat()
+                    self._files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                    if report:
+                        self._touch(entry.path)
+            except OSError:
+                continue
+        return subdirs
+
+    def _scan_tree(self, directory: str, report: bool):
+        stack = [directory]
+        while stack:
+            stack.extend(subdir for subdir in self._scan_dir(stack.pop(), report)
+                         if subdir not in self._dirs)
+
+    def _wait(self, timeout: float):
+        time.sleep(timeout)
+        self._poll()
+
+    def _poll(self):
+        for directory, mtime in list(self._dirs.items()):
+            try:
+                changed = os.stat(directory).st_mtime_ns != mtime
+            except OSError:
+                # 資料夾已被刪除；重新建立時上層資料夾會改變，屆時再加入
+                del self._dirs[directory]
+                continue
+            if changed:
+                for subdir in self._scan_dir(directory, report=True):
+                    if subdir not in self._dirs:
+                        self._scan_tree(subdir, report=True)
+
+        # 原地覆寫的檔案不會改變資料夾的修改時間，需要逐一比對
+        for path, signature in list(self._files.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._files[path]
+                self._pending.pop(path, None)
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self._files[path] = current
+                self._touch(path)
+
+
+def create_watcher(directories: Iterable[str], debounce: float = DEFAULT_DEBOUNCE,
+                   poll_interval: float = DEFAULT_POLL_INTERVAL, polling: bool = False) -> DirectoryWatcher:
+    """建立監看器：優先使用 inotify，無法使用（或指定 polling）時改為輪詢"""
+    directories = list(directories)
+    if not polling:
+        try:
+            return InotifyWatcher(directories, debounce)
+        except OSError:
+            pass
+    return PollingWatcher(directories, debounce, poll_interval)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大型二進位標籤值
+Large Binary Tag Values
+
+MakerNote 等 UNDEFINED 標籤常有數十 KB，轉成十六進位字串後大小加倍，還會留在
+每筆記錄、JSON 輸出與 GUI 的原始資料分頁中。超過門檻的二進位值改以描述表示：
+
+    {'offset': 檔案中的絕對位置, 'length': 位元組數, 'sha256': 內容雜湊}
+
+位置由 mmap_scanner 走訪 IFD 項目取得（只有真的遇到大型值時才掃描），
+位元組只有在明確要求時（命令列 --include-blobs、GUI 的「展開二進位資料」）
+才從檔案讀回，並以雜湊確認檔案沒有變更。
+"""
+
+import struct
+from typing import Dict, Any, Optional, Tuple
+
+from mmap_scanner import MappedFile, scan_mapped, read_ifd_entries, TYPE_SIZES
+from exif_text import decode_text, format_binary
+
+# 超過這個大小（bytes）的二進位值以描述表示
+DEFAULT_BLOB_THRESHOLD = 1024
+
+BLOB_KEYS = frozenset(('offset', 'length', 'sha256'))
+
+# piexif 的區段名稱 -> mmap_scanner 的 IFD 名稱
+SECTION_IFD_NAMES = {'0th': 'IFD0', '1st': 'IFD1', 'Exif': 'Exif', 'GPS': 'GPS', 'Interop': 'Interop'}
+
+# PIL 的 _getexif() 把 ExifIFD 併入 IFD0，依序在這兩個 IFD 中尋找
+FLAT_IFD_NAMES = ('Exif', 'IFD0')
+
+# 記錄中可能含有描述的區段
+BLOB_SECTIONS = ('exif_data', 'raw_data')
+
+
+def is_blob(value: Any) -> bool:
+    """是否為二進位值的描述"""
+    return isinstance(value, dict) and value.keys() == BLOB_KEYS
+
+
+def describe_blob(value: bytes, offset: int) -> Dict[str, Any]:
+    # hashlib 會載入 OpenSSL，沒有大型二進位值（例如只要基本資訊）時不必匯入
+    import hashlib
+    return {'offset': offset, 'length': len(value), 'sha256': hashlib.sha256(value).hexdigest()}
+
+
+class BlobLocator:
+    """單一檔案中大型標籤值的位置，第一次需要時才映射檔案並走訪 IFD"""
+
+    def __init__(self, file_path: str, threshold: int = DEFAULT_BLOB_THRESHOLD):
+        self.file_path = file_path
+        self.threshold = threshold
+        self._locations: Optional[Dict[str, Dict[int, Tuple[int, int]]]] = None
+        self._thumbnail: Optional[Tuple[int, int]] = None
+
+    def _scan(self):
+        self._locations = {}
+        try:
+            with MappedFile(self.file_path) as mf:
+                result = scan_mapped(mf)
+                for name, ifd_offset in result.ifd_offsets.items():
+                    entries = self._locations[name] = {}
+                    for tag, value_type, value_count, value_offset in read_ifd_entries(
+                            mf, result.tiff_offset, ifd_offset - result.tiff_offset, result.byte_order):
+                        size = TYPE_SIZES.get(value_type, 1) * value_count
+                        if size > self.threshold:
+                            entries[tag] = (value_offset, size)
+                self._thumbnail = result.thumbnail
+        except (OSError, ValueError, struct.error):
+            # 找不到位置的值維持原本的表示方式
+            pass
+
+    def locate(self, tag_id: int, section: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """標籤值的 (絕對位置, 長度)；section 是 piexif 的區段名稱，None 表示 PIL 的扁平字典"""
+        if self._locations is None:
+            self._scan()
+        names = (SECTION_IFD_NAMES.get(section),) if section else FLAT_IFD_NAMES
+        for name in names:
+            location = self._locations.get(name, {}).get(tag_id)
+            if location is not None:
+                return location
+        return None
+
+    def replace_blobs(self, data: Dict[int, Any], section: Optional[str] = None) -> Dict[int, Any]:
+        """把超過門檻的二進位值換成描述；沒有需要替換的值時回傳原字典"""
+        replaced = None
+        for tag_id, value in data.items():
+            if not isinstance(value, bytes) or len(value) <= self.threshold:
+                continue
+            if decode_text(value, tag_id, section) is not None:
+                continue
+            location = self.locate(tag_id, section)
+            # 長度不符表示讀到的不是同一個值（例如 PNG 的 eXIf 區塊），保留原值
+            if location is None or location[1] != len(value):
+                continue
+            if replaced is None:
+                replaced = dict(data)
+            replaced[tag_id] = describe_blob(value, location[0])
+        return data if replaced is None else replaced
+
+    def describe_thumbnail(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """piexif 'thumbnail' 區段（IFD1 內嵌 JPEG）的描述；找不到位置時回傳 None"""
+        if self._locations is None:
+            self._scan()
+        if self._thumbnail is None or self._thumbnail[1] != len(data):
+            return None
+        return describe_blob(data, self._thumbnail[0])
+
+
+def read_blob(mf: MappedFile, descriptor: Dict[str, Any]) -> bytes:
+    """依描述讀回位元組；檔案已變更（雜湊不符）時拋出 ValueError"""
+    offset, length = descriptor['offset'], descriptor['length']
+    if offset + length > mf.size:
+        raise ValueError("二進位值超出檔案範圍，檔案可能已變更")
+    data = bytes(mf.slice(offset, offset + length))
+    import hashlib
+    if hashlib.sha256(data).hexdigest() != descriptor['sha256']:
+        raise ValueError("二進位值的雜湊不符，檔案可能已變更")
+    return data
+
+
+def expand_blobs(metadata: Dict[str, Any], file_path: str) -> Dict[str, Any]:
+    """把記錄中的描述換回十六進位表示的位元組（不修改傳入的記錄，可能來自快取）
+
+    無法讀回的值保留描述並加上 'error'。
+    """
+    mf = None
+    expanded = dict(metadata)
+
+    def expand(value):
+        nonlocal mf
+        try:
+            if mf is None:
+                mf = MappedFile(file_path)
+            return format_binary(read_blob(mf, value))
+        except (OSError, ValueError) as e:
+            return {**value, 'error': str(e)}
+
+    try:
+        for key in BLOB_SECTIONS:
+            section = metadata.get(key)
+            if not isinstance(section, dict):
+                continue
+            copy = None
+            for name, value in section.items():
+                if is_blob(value):
+                    new_value = expand(value)
+                elif isinstance(value, dict) and any(is_blob(v) for v in value.values()):
+                    # raw_data 的 IFD 區段
+                    new_value = {tag: expand(v) if is_blob(v) else v for tag, v in value.items()}
+                else:
+                    continue
+                if copy is None:
+                    copy = dict(section)
+                copy[name] = new_value
+            if copy is not None:
+                expanded[key] = copy
+    finally:
+        if mf is not None:
+            mf.close()
+    return expanded
+
+
+def count_blobs(metadata: Dict[str, Any]) -> int:
+    """記錄中尚未展開的描述數"""
+    count = 0
+    for key in BLOB_SECTIONS:
+        for value in (metadata.get(key) or {}).values():
+            if is_blob(value):
+                count += 1
+            elif isinstance(value, dict):
+                count += sum(1 for v in value.values() if is_blob(v))
+    return count
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EXIF 區段單次讀取器
+Single-pass JPEG APP1/EXIF Segment Reader
+
+開啟檔案一次，透過 mmap_scanner 在記憶體映射上沿著 JPEG 標記鏈掃描：
+- 檔案頭部（診斷用）
+- APP1 EXIF 區段（供 PIL 與 piexif 共用同一份位元組）
+- SOF 標記（圖片尺寸、色彩元件數）
+- 各區段與 IFD 的位置（診斷用）
+
+只有 EXIF 區段會被複製出來解碼，其餘區段只讀取標記與長度欄位。
+"""
+
+import os
+import struct
+from typing import Dict, Any, Iterable, List, Optional, Callable
+
+from mmap_scanner import MappedFile, Segment, scan_mapped, describe_scan, TIFF_HEADERS, GPS_IFD_POINTER
+
+MPF_HEADER = b'MPF\x00'
+
+# 檔案頭部診斷的長度（與舊版的 20 bytes 檢查一致）
+HEADER_SIZE = 20
+
+# SOF 色彩元件數對應 PIL 的圖片模式
+COMPONENT_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# 可選擇提取的區段與其在 metadata 中的鍵
+SECTION_KEYS = {
+    'basic': 'basic_info',
+    'exif': 'exif_data',
+    'gps': 'gps_data',
+    'raw': 'raw_data'
+}
+
+
+def project_sections(metadata: Dict[str, Any], sections: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """只保留指定區段（與錯誤資訊）；sections 為 None 時原樣回傳"""
+    if sections is None:
+        return metadata
+    keys = {SECTION_KEYS[section] for section in sections} | {'error'}
+    return {key: value for key, value in metadata.items() if key in keys}
+
+
+class SegmentScan:
+    """單次掃描 JPEG 標記鏈的結果"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.stat: Optional[os.stat_result] = None
+        self.header = b''
+        self.is_jpeg = False
+        self.segments: List[Segment] = []
+        self.ifd_offsets: Dict[str, int] = {}
+        self.diagnostics: Dict[str, Any] = {}
+        self.exif_segment: Optional[bytes] = None
+        self.has_mpf = False
+        self.sof_marker: Optional[int] = None
+        self.width = 0
+        self.height = 0
+        self.components = 0
+        self.bytes_read = 0  # 掃描實際觸及的位元組（以分頁計）
+        self.scan_error: Optional[str] = None  # 標記鏈或 IFD 損壞時的錯誤訊息
+
+    @property
+    def usable(self) -> bool:
+        """是否能完全以掃描結果取代 PIL 開檔
+
+        MPF（多圖 JPEG）會被 PIL 判定為 MPO 格式，交回 PIL 處理以維持相同結果；
+        掃描時發現結構損壞的檔案也交給 PIL，盡量取得其餘的資訊。
+        """
+        return (self.is_jpeg and self.scan_error is None and self.sof_marker is not None
+                and self.components in COMPONENT_MODES and not self.has_mpf)
+
+    @property
+    def progressive(self) -> bool:
+        return self.sof_marker in (0xC2, 0xC6, 0xCA, 0xCE)
+
+    @property
+    def mode(self) -> str:
+        """由 SOF 的色彩元件數推得的圖片模式（與 PIL 一致）"""
+        return COMPONENT_MODES[self.components]
+
+    def exif_dict(self) -> Optional[Dict[int, Any]]:
+        """以 PIL 解析 EXIF 區段，結果與 Image._getexif() 相同"""
+        if not self.exif_segment:
+            return None
+        from PIL import Image
+        exif = Image.Exif()
+        exif.load(self.exif_segment)
+        return exif._get_merged_dict()
+
+    def gps_dict(self) -> Optional[Dict[int, Any]]:
+        """只解析 GPS IFD：由 IFD0 的 GPS 指標（34853）直接跳到 GPS IFD，不解碼 ExifIFD
+
+        結果與 Image._getexif()[34853] 相同；沒有 GPS 指標時回傳 None。
+        """
+        if not self.exif_segment or 'GPS' not in self.ifd_offsets:
+            return None
+        from PIL import Image
+        exif = Image.Exif()
+        exif.load(self.exif_segment)
+        return exif.get_ifd(GPS_IFD_POINTER)
+
+    def piexif_dict(self) -> Dict[str, Any]:
+        """以 piexif 解析同一份 EXIF 區段，結果與 piexif.load(file_path) 相同"""
+        import piexif
+        if not self.exif_segment:
+            return {"0th": {}, "Exif": {}, "GPS": {}, "Interop": {}, "1st": {}, "thumbnail": None}
+        return piexif.load(self.exif_segment)
+
+
+def scan_jpeg(file_path: str, stat: Optional[os.stat_result] = None) -> SegmentScan:
+    """開啟檔案一次，掃描 JPEG 標記鏈並取出 EXIF 區段與 SOF 資訊
+
+    stat 為呼叫端已取得的 os.stat() 結果（分開計時 stat 與開檔時），沒有時在開檔後 fstat。
+    """
+    scan = SegmentScan(file_path)
+
+    with MappedFile(file_path, stat) as mf:
+        scan.stat = mf.stat
+        scan.header = bytes(mf.slice(0, HEADER_SIZE))
+        try:
+            result = scan_mapped(mf)
+            scan.is_jpeg = result.kind == 'jpeg'
+            scan.segments = result.segments
+            scan.ifd_offsets = result.ifd_offsets
+            scan.diagnostics = describe_scan(result)
+
+            if result.exif is not None:
+                # 唯一需要複製的資料：交給 PIL 與 piexif 解碼的 EXIF 區段
+                scan.exif_segment = bytes(mf.slice(result.exif.offset, result.exif.end))
+
+            for segment in result.find('APP2'):
+                if mf.slice(segment.offset, segment.offset + len(MPF_HEADER)) == MPF_HEADER:
+                    scan.has_mpf = True
+
+            if result.sof is not None and result.sof.length >= 6:
+                _, height, width, components = mf.unpack('>BHHB', result.sof.offset)
+                scan.sof_marker = result.sof.marker
+                scan.height = height
+                scan.width = width
+                scan.components = components
+        except (struct.error, ValueError) as e:
+            # 結構損壞：檔案資訊仍然有效，其餘交給 PIL（usable 為 False）
+            scan.scan_error = str(e)
+            scan.diagnostics['scan_error'] = scan.scan_error
+
+        scan.bytes_read = mf.bytes_touched
+
+    return scan
+
+
+def load_piexif(file_path: str, on_read: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+    """以 piexif 解析非 JPEG 檔案
+
+    TIFF 直接在記憶體映射上解析，不會像 piexif.load(file_path) 一樣把整個檔案讀進記憶體。
+    指定 on_read 時以讀取的位元組數呼叫（計算讀取量用；TIFF 以映射的檔案大小計）。
+    """
+    import piexif
+    with MappedFile(file_path) as mf:
+        size = mf.size
+        if on_read is not None:
+            # TIFF 時 piexif 直接讀取映射，觸及的分頁無法得知，以檔案大小計
+            on_read(size)
+        if mf.mm is not None and mf.mm[:4] in TIFF_HEADERS:
+            return piexif.load(mf.mm)
+    return piexif.load(file_path)
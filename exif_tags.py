@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EXIF 標籤格式化註冊表
+EXIF Tag Formatter Registry
+
+GUI、命令列與簡化查看器共用的標籤表：模組載入時就把每個標籤 ID 對應到
+(顯示名稱, 格式化函式)，解析時每個標籤只需要一次字典查詢。
+"""
+
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from exif_text import tag_kind, decode_kind, format_kind, KIND_GUESS
+
+try:
+    from PIL.ExifTags import TAGS, GPSTAGS
+except ImportError:
+    # 如果無法匯入 ExifTags，使用基本字典
+    TAGS = {}
+    GPSTAGS = {}
+
+# 格式化函式回傳 SKIP 時略過這個標籤（例如二進位資料）
+SKIP = object()
+
+Formatter = Callable[[Any], Any]
+TagRegistry = Dict[int, Tuple[str, Formatter]]
+
+FLASH_VALUES = {
+    0: "未使用", 1: "使用", 9: "強制使用", 16: "關閉",
+    24: "未使用，自動模式", 25: "使用，自動模式",
+    32: "未使用，無閃光燈功能", 65: "使用，紅眼減少",
+    73: "強制使用，紅眼減少", 89: "使用，自動模式，紅眼減少"
+}
+WHITE_BALANCE_VALUES = {0: "自動", 1: "手動"}
+SCENE_VALUES = {0: "標準", 1: "風景", 2: "人像", 3: "夜景"}
+CONTRAST_VALUES = {0: "正常", 1: "柔和", 2: "強烈"}
+SATURATION_VALUES = {0: "正常", 1: "低飽和度", 2: "高飽和度"}
+SHARPNESS_VALUES = {0: "正常", 1: "柔和", 2: "強烈"}
+ORIENTATION_VALUES = {
+    1: "正常", 2: "水平翻轉", 3: "旋轉180度",
+    4: "垂直翻轉", 5: "水平翻轉+順時針90度",
+    6: "順時針90度", 7: "水平翻轉+逆時針90度",
+    8: "逆時針90度"
+}
+RESOLUTION_UNIT_VALUES = {1: "無", 2: "英寸", 3: "公分"}
+
+# 重要且易讀的標籤對應（GUI 顯示用）
+IMPORTANT_TAGS = {
+    271: '相機品牌',
+    272: '相機型號',
+    306: '拍攝時間',
+    36867: '原始拍攝時間',
+    37377: '光圈值',
+    37387: '快門速度',
+    37380: 'ISO 感光度',
+    37396: '焦距',
+    37395: '閃光燈',
+    41987: '白平衡',
+    41990: '場景模式',
+    41992: '對比度',
+    41993: '飽和度',
+    41994: '銳利度',
+    42035: '鏡頭品牌',
+    42036: '鏡頭型號',
+    256: '圖片寬度',
+    257: '圖片高度',
+    274: '方向',
+    296: '解析度單位',
+    282: 'X 解析度',
+    283: 'Y 解析度',
+    531: 'YCbCr 定位',
+    34665: 'EXIF 偏移',
+    36864: 'EXIF 版本',
+    40960: 'FlashPix 版本',
+    40961: '色彩空間',
+    40962: '像素 X 維度',
+    40963: '像素 Y 維度',
+    40965: '互通性 IFD 指標',
+    36880: '時區偏移',
+    36881: '原始時區偏移',
+    36868: '數位化時間',
+    37378: '曝光程式',
+    37379: '光譜敏感度',
+    37381: '光電轉換函數',
+    37382: 'EXIF 版本',
+    37383: '原始日期時間',
+    37384: '數位化日期時間',
+    37385: '元件配置',
+    37386: '壓縮位元數',
+    37388: '光圈值',
+    37389: '亮度值',
+    37390: '曝光偏差值',
+    37391: '最大光圈值',
+    37392: '主體距離',
+    37393: '測光模式',
+    37394: '光源',
+    37398: '製造商註記',
+    37399: '使用者註記',
+    37400: '子秒時間',
+    37401: '原始子秒時間',
+    37402: '數位化子秒時間',
+    37500: 'FlashPix 版本',
+    37510: '使用者註解',
+    37520: '像素 X 維度',
+    37521: '像素 Y 維度',
+    37522: '相關音訊檔案',
+    41483: '閃光燈',
+    41484: '閃光燈返回光',
+    41485: '閃光燈模式',
+    41486: '閃光燈功能',
+    41487: '閃光燈紅眼模式',
+    41488: '閃光燈曝光補償',
+    41492: '閃光燈來源',
+    41493: '閃光燈狀態',
+    41494: '閃光燈模式',
+    41985: '自訂渲染',
+    41986: '曝光模式',
+    41988: '數位變焦比例',
+    41989: '35mm 膠片焦距',
+    41991: '增益控制',
+    41995: '裝置設定描述',
+    41996: '主體距離範圍',
+    42016: '影像唯一 ID',
+    42032: '相機擁有者名稱',
+    42033: '機身序號',
+    42034: '鏡頭規格',
+    42037: '鏡頭序號'
+}
+
+# 簡化查看器只顯示的相機資訊
+SUMMARY_TAG_IDS = (271, 272, 306, 36867, 37377, 37387, 37380, 37396,
+                   37395, 41987, 41990, 41992, 41993, 41994, 42035, 42036)
+
+
+def format_aperture(value):
+    """光圈值"""
+    if isinstance(value, tuple) and len(value) == 2:
+        return f"f/{value[0]/value[1]:.1f}"
+    return f"f/{value/100}" if value > 0 else str(value)
+
+
+def format_shutter_speed(value):
+    """快門速度"""
+    if isinstance(value, tuple) and len(value) == 2:
+        return f"1/{int(value[0]/value[1])}s"
+    return f"1/{int(2**value)}s" if value > 0 else str(value)
+
+
+def format_focal_length(value):
+    """焦距"""
+    return f"{value}mm"
+
+
+def format_iso(value):
+    """ISO 感光度"""
+    if isinstance(value, tuple) and len(value) == 2:
+        return f"ISO {value[0]}"
+    return f"ISO {value}"
+
+
+def value_mapper(values: Dict[int, str]) -> Formatter:
+    """列舉值對應成文字，沒有對應時轉成字串"""
+    def format_enum(value):
+        return values.get(value, str(value))
+    return format_enum
+
+
+def format_tuple(value: tuple) -> str:
+    """座標等多值標籤"""
+    if len(value) == 3 and all(isinstance(x, (int, float)) for x in value):
+        return f"({value[0]}, {value[1]}, {value[2]})"
+    elif len(value) == 2 and all(isinstance(x, (int, float)) for x in value):
+        return f"({value[0]}, {value[1]})"
+    return str(value)
+
+
+def value_formatter(tag_id: int) -> Formatter:
+    """沒有專用格式化函式的標籤：位元組依標籤的型別解碼，不是文字或是空字串時略過"""
+    kind = tag_kind(tag_id)
+
+    def format_value(value):
+        if isinstance(value, bytes):
+            return decode_kind(value, kind) or SKIP
+        elif isinstance(value, tuple):
+            return format_tuple(value)
+        return value
+    return format_value
+
+
+def plain_formatter(tag_id: Optional[int] = None) -> Formatter:
+    """命令列版本的原始值：位元組依標籤的型別解碼（二進位資料以十六進位表示），tuple 轉成字串
+
+    tag_id 為 None 時（註冊表以外的標籤）依內容判斷是否為文字。
+    """
+    kind = tag_kind(tag_id) if tag_id is not None else KIND_GUESS
+
+    def format_plain(value):
+        if isinstance(value, bytes):
+            return format_kind(value, kind)
+        elif isinstance(value, tuple):
+            return str(value)
+        return value
+    return format_plain
+
+
+format_plain = plain_formatter()
+
+
+TAG_FORMATTERS: Dict[int, Formatter] = {
+    37377: format_aperture,
+    37387: format_shutter_speed,
+    37396: format_focal_length,
+    37380: format_iso,
+    37395: value_mapper(FLASH_VALUES),
+    41987: value_mapper(WHITE_BALANCE_VALUES),
+    41990: value_mapper(SCENE_VALUES),
+    41992: value_mapper(CONTRAST_VALUES),
+    41993: value_mapper(SATURATION_VALUES),
+    41994: value_mapper(SHARPNESS_VALUES),
+    274: value_mapper(ORIENTATION_VALUES),
+    296: value_mapper(RESOLUTION_UNIT_VALUES)
+}
+
+# 預先組好的註冊表：標籤 ID -> (顯示名稱, 格式化函式)
+IMPORTANT_TAG_REGISTRY: TagRegistry = {
+    tag_id: (label, TAG_FORMATTERS.get(tag_id) or value_formatter(tag_id))
+    for tag_id, label in IMPORTANT_TAGS.items()
+}
+SUMMARY_TAG_REGISTRY: TagRegistry = {tag_id: IMPORTANT_TAG_REGISTRY[tag_id] for tag_id in SUMMARY_TAG_IDS}
+ALL_TAG_REGISTRY: TagRegistry = {tag_id: (name, plain_formatter(tag_id)) for tag_id, name in TAGS.items()}
+
+
+def format_tags(exif_data: Dict[int, Any], registry: TagRegistry,
+                unknown: Optional[Formatter] = None) -> Dict[str, Any]:
+    """依註冊表格式化 EXIF 標籤
+
+    不在註冊表中的標籤：指定 unknown 時以 "Unknown Tag <ID>" 為名稱並用 unknown 格式化，
+    否則略過。
+    """
+    parsed_data = {}
+    for tag_id, value in exif_data.items():
+        entry = registry.get(tag_id)
+        if entry is None:
+            if unknown is None:
+                continue
+            parsed_data[f"Unknown Tag {tag_id}"] = unknown(value)
+            continue
+        label, formatter = entry
+        value = formatter(value)
+        if value is not SKIP:
+            parsed_data[label] = value
+    return parsed_data
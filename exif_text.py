@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EXIF 文字解碼
+EXIF Text Decoding
+
+依標籤的型別與語意解碼位元組值，不再對每個值逐一嘗試多種編碼：
+- ASCII 型別的標籤以 ASCII 解碼（相機常寫入的 UTF-8 也接受，其他位元組以 \\x 跳脫）
+- UserComment、GPSProcessingMethod、GPSAreaInformation 依前 8 bytes 的字元集代碼解碼
+- XPTitle 等 Windows 標籤以 UTF-16LE 解碼
+- BYTE 型別的值（GPSVersionID、GPSAltitudeRef 等）轉成整數，與 piexif 的表示一致
+- 其他 UNDEFINED 型別的值（MakerNote、ComponentsConfiguration 等）視為二進位資料
+- 短字串（Make、Model 等在批次中重複出現的值）的解碼結果會被快取
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+# 解碼方式
+KIND_ASCII = 'ascii'
+KIND_CHARSET = 'charset'
+KIND_UTF16LE = 'utf16le'
+KIND_BYTE = 'byte'
+KIND_BINARY = 'binary'
+KIND_GUESS = 'guess'
+
+# piexif 的區段名稱 -> 型別表的 IFD 名稱；None 是 PIL 合併 IFD0 與 ExifIFD 的扁平字典
+SECTION_IFDS = {'0th': 'Image', '1st': 'Image', 'Exif': 'Exif', 'GPS': 'GPS', 'Interop': 'Interop', None: None}
+
+# 內容是 ASCII 文字的 UNDEFINED 標籤（ExifVersion、FlashpixVersion、InteroperabilityVersion）
+TEXT_UNDEFINED_TAGS = {('Exif', 36864), ('Exif', 40960), ('Interop', 2)}
+
+# 前 8 bytes 是字元集代碼的標籤（UserComment、GPSProcessingMethod、GPSAreaInformation）
+CHARSET_PREFIX_TAGS = {('Exif', 37510), ('GPS', 27), ('GPS', 28)}
+
+# Windows 的 XPTitle、XPComment、XPAuthor、XPKeywords、XPSubject
+UTF16LE_TAGS = {('Image', tag_id) for tag_id in range(0x9C9B, 0x9CA0)}
+
+CHARSET_ASCII = b'ASCII\x00\x00\x00'
+CHARSET_JIS = b'JIS\x00\x00\x00\x00\x00'
+CHARSET_UNICODE = b'UNICODE\x00'
+CHARSET_UNDEFINED = b'\x00' * 8
+
+# 只快取這個長度以下的值（長的值很少重複，雜湊成本也高）
+MEMO_MAX_BYTES = 64
+MEMO_ENTRIES = 4096
+
+BINARY_PREFIX = '[HEX] '
+
+
+def _build_kinds() -> Dict[Optional[str], Dict[int, str]]:
+    """由 piexif 的型別表預先算出每個 (IFD, 標籤) 的解碼方式"""
+    try:
+        from piexif import TAGS as PIEXIF_TAGS, TYPES
+        BYTE_TYPE, ASCII_TYPE = TYPES.Byte, TYPES.Ascii
+    except ImportError:
+        # 沒有 piexif 時沒有型別表，所有標籤依內容判斷
+        PIEXIF_TAGS = {}
+        BYTE_TYPE, ASCII_TYPE = 1, 2
+    kinds: Dict[Optional[str], Dict[int, str]] = {}
+    for ifd in ('Image', 'Exif', 'GPS', 'Interop'):
+        table = {}
+        for tag_id, info in PIEXIF_TAGS.get(ifd, {}).items():
+            key = (ifd, tag_id)
+            if key in CHARSET_PREFIX_TAGS:
+                table[tag_id] = KIND_CHARSET
+            elif key in UTF16LE_TAGS:
+                table[tag_id] = KIND_UTF16LE
+            elif info['type'] == ASCII_TYPE or key in TEXT_UNDEFINED_TAGS:
+                table[tag_id] = KIND_ASCII
+            elif info['type'] == BYTE_TYPE:
+                table[tag_id] = KIND_BYTE
+            else:
+                table[tag_id] = KIND_BINARY
+        kinds[ifd] = table
+    # PIL 的 _getexif() 把 ExifIFD 的標籤併入 IFD0
+    kinds[None] = {**kinds['Image'], **kinds['Exif']}
+    # 以 piexif 的區段名稱也能直接查詢
+    for section, ifd in SECTION_IFDS.items():
+        kinds[section] = kinds[ifd]
+    return kinds
+
+
+# 第一次查詢時才由 piexif 的型別表建立（見 _load_kinds），只用到檔案資訊時不必匯入 piexif
+TAG_KINDS: Dict[Optional[str], Dict[int, str]] = {}
+
+NO_KINDS: Dict[int, str] = {}
+
+
+def _load_kinds() -> Dict[Optional[str], Dict[int, str]]:
+    TAG_KINDS.update(_build_kinds())
+    return TAG_KINDS
+
+
+def tag_kind(tag_id: int, section: Optional[str] = None) -> str:
+    """標籤的解碼方式；section 是 piexif 的區段名稱（或 IFD 名稱），None 表示 PIL 的扁平字典"""
+    return (TAG_KINDS or _load_kinds()).get(section, NO_KINDS).get(tag_id, KIND_GUESS)
+
+
+def _decode_ascii(value: bytes) -> str:
+    # ASCII 值以 NUL 結尾，之後的內容是填充
+    value = value.split(b'\x00', 1)[0]
+    if value.isascii():
+        return value.decode('ascii')
+    return value.decode('utf-8', errors='backslashreplace')
+
+
+def _decode_utf16(value: bytes) -> str:
+    """UCS-2 沒有記錄位元組順序：有 BOM 時依 BOM，否則看 ASCII 字元的零位元組在哪一側"""
+    value = value[:len(value) & ~1]
+    if value[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return value.decode('utf-16', errors='replace')
+    encoding = 'utf-16-be' if value[0::2].count(0) > value[1::2].count(0) else 'utf-16-le'
+    return value.decode(encoding, errors='replace')
+
+
+def _decode_charset(value: bytes) -> str:
+    """依前 8 bytes 的字元集代碼解碼，並去掉結尾的 NUL 與空白填充"""
+    prefix, body = value[:8], value[8:]
+    if prefix == CHARSET_ASCII:
+        text = body.decode('ascii') if body.isascii() else body.decode('utf-8', errors='backslashreplace')
+    elif prefix == CHARSET_UNICODE:
+        text = _decode_utf16(body)
+    elif prefix == CHARSET_JIS:
+        text = body.decode('shift_jis', errors='backslashreplace')
+    elif prefix == CHARSET_UNDEFINED:
+        text = body.decode('utf-8', errors='backslashreplace')
+    else:
+        # 沒有字元集代碼的非標準寫法
+        return _decode_ascii(value)
+    return text.rstrip('\x00 ')
+
+
+def _decode_guess(value: bytes) -> Optional[str]:
+    """型別不明的標籤：可列印的 ASCII 視為文字，其他視為二進位"""
+    text = value.split(b'\x00', 1)[0]
+    if text.isascii() and not value[len(text) + 1:].strip(b'\x00'):
+        text = text.decode('ascii')
+        if text.isprintable():
+            return text
+    return None
+
+
+DECODERS: Dict[str, Callable[[bytes], Optional[str]]] = {
+    KIND_ASCII: _decode_ascii,
+    KIND_CHARSET: _decode_charset,
+    KIND_UTF16LE: lambda value: value[:len(value) & ~1].decode('utf-16-le', errors='replace').rstrip('\x00'),
+    KIND_BYTE: lambda value: None,
+    KIND_BINARY: lambda value: None,
+    KIND_GUESS: _decode_guess,
+}
+
+
+def decode_kind(value: bytes, kind: str) -> Optional[str]:
+    """以指定方式解碼；不是文字時回傳 None"""
+    if len(value) <= MEMO_MAX_BYTES:
+        return _decode_memo(kind, value)
+    return DECODERS[kind](value)
+
+
+def decode_text(value: bytes, tag_id: int, section: Optional[str] = None) -> Optional[str]:
+    """依標籤解碼位元組值；不是文字時回傳 None"""
+    return decode_kind(value, tag_kind(tag_id, section))
+
+
+def format_binary(value: bytes) -> str:
+    return f"{BINARY_PREFIX}{value.hex()}"
+
+
+def _format(kind: str, value: bytes) -> Any:
+    if kind == KIND_BYTE:
+        return value[0] if len(value) == 1 else tuple(value)
+    text = DECODERS[kind](value)
+    return format_binary(value) if text is None else text
+
+
+# Make、Model、日期等短值在批次中大量重複，結果直接快取
+@lru_cache(maxsize=MEMO_ENTRIES)
+def _decode_memo(kind: str, value: bytes) -> Optional[str]:
+    return DECODERS[kind](value)
+
+
+_format_memo = lru_cache(maxsize=MEMO_ENTRIES)(_format)
+
+
+def format_kind(value: bytes, kind: str) -> Any:
+    """轉成顯示用的值：文字、整數（BYTE 型別）或十六進位表示的二進位資料"""
+    if len(value) <= MEMO_MAX_BYTES:
+        return _format_memo(kind, value)
+    return _format(kind, value)
+
+
+def format_bytes(value: bytes, tag_id: int, section: Optional[str] = None) -> Any:
+    """依標籤轉成顯示用的值（見 format_kind）"""
+    return format_kind(value, (TAG_KINDS or _load_kinds()).get(section, NO_KINDS).get(tag_id, KIND_GUESS))
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提取效能分析
+Extraction Profiler
+
+以 cProfile 分析提取過程，依階段分開統計，不必修改程式碼就能套用在實際的批次上：
+
+    extract            階段以外的提取時間（開檔、掃描、EXIF 解碼、piexif.load 等）
+    parse_exif_data    EXIF 標籤轉為可讀文字
+    parse_gps_data     GPS 區段解析
+    parse_piexif_data  piexif 原始資料轉為可讀文字
+    json.dump          寫出結果
+
+每個階段有各自的 cProfile.Profile，進入內層階段時暫停外層，因此各階段的耗時互不重疊。
+every 大於 1 時只分析每 every 個檔案中的一個，其餘檔案不受分析的額外成本影響。
+memory 為 True 時另以 tracemalloc 記錄每個階段的記憶體配置峰值（只在分析的檔案期間追蹤）。
+
+cProfile 只能分析所在的行程，分析時提取在主行程中進行。
+cProfile、pstats、tracemalloc 在開始分析時才匯入，沒有使用 --profile 時不影響啟動時間。
+"""
+
+import io
+import functools
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# 建立 ExtractionProfiler 時才匯入（見 __init__）
+cProfile = pstats = tracemalloc = None
+
+PHASES = ('extract', 'parse_exif_data', 'parse_gps_data', 'parse_piexif_data', 'json.dump')
+
+# 以階段名稱包裝的提取器方法；extract_metadata 是最外層，決定這個檔案是否分析
+PHASE_METHODS = {
+    'extract_metadata': 'extract',
+    'parse_exif_data': 'parse_exif_data',
+    'parse_gps_data': 'parse_gps_data',
+    'parse_piexif_data': 'parse_piexif_data',
+}
+
+# 摘要中每個階段列出的函式數
+DEFAULT_TOP = 20
+
+
+class _Frame:
+    """進行中的階段：名稱與 tracemalloc 的基準、目前看到的峰值"""
+
+    __slots__ = ('name', 'base', 'peak')
+
+    def __init__(self, name: str, base: int):
+        self.name = name
+        self.base = base
+        self.peak = base
+
+
+class ExtractionProfiler:
+    """依階段分開的 cProfile 分析與 tracemalloc 記憶體峰值"""
+
+    def __init__(self, every: int = 1, memory: bool = False):
+        global cProfile, pstats, tracemalloc
+        import cProfile, pstats, tracemalloc
+        self.every = max(1, every)
+        self.memory = memory
+        self.files = 0            # 經過 extract_metadata 的檔案數
+        self.sampled_files = 0    # 實際分析的檔案數
+        self.profiles: Dict[str, 'cProfile.Profile'] = {}
+        self.calls: Dict[str, int] = {}
+        # 階段 → (最大峰值, 峰值總和)，單位 bytes
+        self.peaks: Dict[str, List[int]] = {}
+        self._stack: List[_Frame] = []
+        self._sampled = False
+        self._patched = []
+
+    def sampled(self, index: int) -> bool:
+        """第 index 個（從 0 起算）檔案是否分析"""
+        return index % self.every == 0
+
+    @contextmanager
+    def phase(self, name: str, sampled: Optional[bool] = None):
+        """在階段 name 中執行；sampled 未指定時沿用目前檔案是否分析"""
+        if not (self._sampled if sampled is None else sampled):
+            yield
+            return
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def _enter(self, name: str):
+        outer = self._stack[-1] if self._stack else None
+        if outer is not None:
+            self.profiles[outer.name].disable()
+        base = 0
+        if self.memory:
+            if outer is None:
+                tracemalloc.start()
+            else:
+                outer.peak = max(outer.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        self._stack.append(_Frame(name, base))
+        self.calls[name] = self.calls.get(name, 0) + 1
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = cProfile.Profile()
+        profile.enable()
+
+    def _exit(self):
+        frame = self._stack.pop()
+        self.profiles[frame.name].disable()
+        outer = self._stack[-1] if self._stack else None
+        if self.memory:
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            stats = self.peaks.setdefault(frame.name, [0, 0])
+            stats[0] = max(stats[0], peak - frame.base)
+            stats[1] += peak - frame.base
+            if outer is None:
+                tracemalloc.stop()
+            else:
+                outer.peak = max(outer.peak, peak)
+        if outer is not None:
+            self.profiles[outer.name].enable()
+
+    def _wrap(self, method: str, function):
+        phase = PHASE_METHODS[method]
+        profiler = self
+
+        if phase == 'extract':
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                profiler._sampled = profiler.sampled(profiler.files)
+                profiler.files += 1
+                if not profiler._sampled:
+                    return function(*args, **kwargs)
+                profiler.sampled_files += 1
+                try:
+                    with profiler.phase(phase):
+                        return function(*args, **kwargs)
+                finally:
+                    profiler._sampled = False
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with profiler.phase(phase):
+                    return function(*args, **kwargs)
+        return wrapper
+
+    def attach(self, cls):
+        """包裝提取器類別的各階段方法（detach() 還原）"""
+        for method in PHASE_METHODS:
+            original = cls.__dict__[method]
+            self._patched.append((cls, method, original))
+            setattr(cls, method, self._wrap(method, original))
+
+    def detach(self):
+        while self._patched:
+            cls, method, original = self._patched.pop()
+            setattr(cls, method, original)
+
+    def _phases(self) -> List[str]:
+        return [name for name in PHASES if name in self.profiles] + sorted(set(self.profiles) - set(PHASES))
+
+    def summary_lines(self) -> List[str]:
+        """各階段的呼叫次數、耗時（含 cProfile 本身的額外成本）與記憶體峰值"""
+        lines = [f"已分析 {self.sampled_files} / {self.files} 個檔案"
+                 + (f"（每 {self.every} 個取 1 個）" if self.every > 1 else "")]
+        header = f"{'階段':<18} {'呼叫':>8} {'耗時 (s)':>10}"
+        if self.memory:
+            header += f" {'峰值 (KB)':>12} {'平均峰值 (KB)':>14}"
+        lines.append(header)
+        for name in self._phases():
+            stats = pstats.Stats(self.profiles[name])
+            line = f"{name:<18} {self.calls[name]:>8} {stats.total_tt:>10.3f}"
+            if self.memory:
+                peak, total = self.peaks.get(name, (0, 0))
+                line += f" {peak / 1024:>12.1f} {total / max(1, self.calls[name]) / 1024:>14.1f}"
+            lines.append(line)
+        return lines
+
+    def write(self, prefix: str, top: int = DEFAULT_TOP) -> List[str]:
+        """寫出 prefix.pstats（所有階段）、prefix.<階段>.pstats 與文字摘要 prefix.txt，回傳寫出的檔案"""
+        phases = self._phases()
+        written = []
+        if phases:
+            combined = pstats.Stats(*(self.profiles[name] for name in phases))
+            combined.dump_stats(f'{prefix}.pstats')
+            written.append(f'{prefix}.pstats')
+            for name in phases:
+                pstats.Stats(self.profiles[name]).dump_stats(f'{prefix}.{name}.pstats')
+                written.append(f'{prefix}.{name}.pstats')
+
+        report = io.StringIO()
+        report.write('\n'.join(self.summary_lines()) + '\n')
+        for name in phases:
+            report.write(f"\n{'=' * 20} {name}（依自身耗時排序前 {top} 名）{'=' * 20}\n")
+            pstats.Stats(self.profiles[name], stream=report).sort_stats('tottime', 'cumulative').print_stats(top)
+        with open(f'{prefix}.txt', 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        written.append(f'{prefix}.txt')
+        return written
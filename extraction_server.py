@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機 HTTP 提取服務
+Local HTTP Extraction Service
+
+其他服務不必每次執行 photo_metadata_cli.py（每次都要啟動直譯器並匯入 Pillow/piexif），
+改為呼叫常駐的本機服務：
+
+- POST /extract：JSON {"path": ..., "sections": [...], "include_blobs": false}，
+  或直接上傳相片位元組（選項放在查詢字串：?name=photo.jpg&sections=gps,exif&include_blobs=1），
+  回傳與 extract_metadata() 相同結構的 JSON
+- POST /extract/batch：JSON {"paths": [...], "sections": [...]}，回傳
+  {"results": [{"file_path": ..., ...}, ...]}（依輸入順序，與 --ndjson 的每一行相同）
+- GET /health：工作行程數與排隊狀況
+- GET /metrics：各提取階段耗時的直方圖與請求計數（Prometheus 文字格式）；
+  請求加上 "timings": true（或 ?timings=1）時每筆結果也帶有 diagnostic_info
+
+提取在啟動時就建立好的工作行程池中進行，相片在工作行程中直接編碼成 JSON，主行程只負責收送。
+排隊中的工作超過 max_queue 時回應 503（Retry-After），不會無限制地累積；
+連線使用 HTTP/1.1 keep-alive，同一條連線可以連續送出多個請求。
+"""
+
+import os
+import json
+import time
+import threading
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import batch_extractor
+from batch_extractor import _init_worker, _error_results, DEFAULT_CHUNKSIZE
+from exif_segment_reader import SECTION_KEYS
+from exif_blobs import expand_blobs
+from json_backend import JSONSerializer
+from stage_timings import StageMetrics, METRIC_PREFIX
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 每個工作行程最多排隊的工作數，超過時回應 503
+DEFAULT_QUEUE_PER_WORKER = 4
+
+# 請求內容上限（位元組）
+DEFAULT_MAX_BODY = 64 * 1024 * 1024
+
+# keep-alive 連線閒置多久（秒）後關閉
+KEEPALIVE_TIMEOUT = 60
+
+# 503 回應建議的重試秒數
+RETRY_AFTER = 1
+
+
+class RequestError(Exception):
+    """以 HTTP 狀態碼回應給用戶端的錯誤"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# 每個工作行程第一次編碼時建立（見 _encode）
+_serializer: Optional[JSONSerializer] = None
+
+
+def _encode(value: Any) -> bytes:
+    global _serializer
+    if _serializer is None:
+        from photo_metadata_cli import json_default
+        _serializer = JSONSerializer(default=json_default)
+    return _serializer.dumps(value)
+
+
+def _finish(metadata: Dict[str, Any], timings: bool) -> Tuple[bytes, Dict[str, Any]]:
+    """編碼一筆記錄，回傳 (JSON, 供 /metrics 累計的樣本)
+
+    工作行程一律計時；timings 為 False 時記錄中不含 diagnostic_info。
+    編碼本身的耗時只計入樣本（serialize 階段），記錄編碼完成前無法得知。
+    """
+    diagnostic = metadata.get('diagnostic_info') if timings else metadata.pop('diagnostic_info', None)
+    start = time.perf_counter()
+    data = _encode(metadata)
+    sample = {}
+    if diagnostic is not None:
+        sample['diagnostic_info'] = {
+            'timings_ms': {**diagnostic['timings_ms'], 'serialize': (time.perf_counter() - start) * 1000},
+            'bytes_read': diagnostic['bytes_read'],
+        }
+    if 'error' in metadata:
+        sample['error'] = metadata['error']
+    return data, sample
+
+
+def _failed(path: str, error: Exception, sections: Optional[List[str]]) -> Tuple[bytes, Dict[str, Any]]:
+    """工作行程異常結束時的錯誤記錄"""
+    return _finish(_error_results([path], error, sections)[0][1], False)
+
+
+def _extract_file(path: str, sections: Optional[List[str]], include_blobs: bool,
+                  timings: bool = False) -> Tuple[bytes, Dict[str, Any]]:
+    """在工作行程中提取一個檔案並編碼成 JSON"""
+    metadata = batch_extractor._worker_cli.extract_metadata(path, sections)
+    if include_blobs:
+        metadata = expand_blobs(metadata, path)
+    return _finish(metadata, timings)
+
+
+def _extract_upload(data: bytes, name: str, sections: Optional[List[str]], include_blobs: bool,
+                    timings: bool = False) -> Tuple[bytes, Dict[str, Any]]:
+    """在工作行程中提取上傳的相片：寫成暫存檔提取後刪除，檔案名稱與路徑改為 name"""
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(name)[1], prefix='photo-upload-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        metadata = batch_extractor._worker_cli.extract_metadata(path, sections)
+        if include_blobs:
+            metadata = expand_blobs(metadata, path)
+    finally:
+        os.unlink(path)
+    basic_info = metadata.get('basic_info')
+    if basic_info:
+        basic_info['檔案名稱'] = name
+        basic_info['檔案路徑'] = name
+    if 'error' in metadata:
+        metadata['error'] = metadata['error'].replace(path, name)
+    return _finish(metadata, timings)
+
+
+def _extract_chunk(paths: List[str], sections: Optional[List[str]], include_blobs: bool,
+                   timings: bool = False) -> List[Tuple[bytes, Dict[str, Any]]]:
+    """在工作行程中提取一批檔案（GPS 座標整批換算），每個檔案編碼成一筆 JSON 記錄"""
+    records = []
+    for path, metadata in batch_extractor._worker_cli.extract_many(paths, sections):
+        if include_blobs:
+            metadata = expand_blobs(metadata, path)
+        records.append(_finish({'file_path': path, **metadata}, timings))
+    return records
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class ExtractionService:
+    """常駐的工作行程池，限制排隊中的工作數"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 chunksize: int = DEFAULT_CHUNKSIZE, blob_threshold: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.workers * DEFAULT_QUEUE_PER_WORKER
+        self.chunksize = max(1, chunksize)
+        self.blob_threshold = blob_threshold
+        self.in_flight = 0
+        self.rejected = 0
+        self.metrics = StageMetrics()
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._executor = self._start_pool()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        """建立工作行程池，並等每個行程都完成初始化（匯入 PIL/piexif），第一個請求不必等待"""
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                       initargs=(self.blob_threshold, True))
+        for future in [executor.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def submit(self, fn: Callable, *args, block: bool = False) -> Future:
+        """送出一個工作；排隊已滿且 block 為 False 時拋出 RequestError(503)"""
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self.rejected += 1
+            raise RequestError(503, '服務忙碌中，請稍後重試')
+        with self._lock:
+            self.in_flight += 1
+        try:
+            try:
+                future = self._executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._restart()
+                future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Optional[Future]):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def result(self, future: Future, fallback: Callable[[Exception], Any]) -> Any:
+        """取得工作結果；工作行程異常結束時重新建立行程池，並以 fallback 產生錯誤記錄"""
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            self._restart()
+            return fallback(e)
+
+    def _restart(self):
+        """工作行程異常結束（例如被系統終止）後重新建立行程池；多個請求同時發現時只重建一次"""
+        with self._restart_lock:
+            try:
+                # 還能送出工作表示其他請求已經重建過
+                self._executor.submit(_ready)
+                return
+            except BrokenProcessPool:
+                pass
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._start_pool()
+
+    def _record(self, result: Tuple[bytes, Dict[str, Any]]) -> bytes:
+        """累計工作行程回傳的樣本，回傳編碼好的記錄"""
+        data, sample = result
+        self.metrics.observe_record(sample)
+        return data
+
+    def extract(self, path: str, sections: Optional[List[str]] = None, include_blobs: bool = False,
+                timings: bool = False) -> bytes:
+        future = self.submit(_extract_file, path, sections, include_blobs, timings)
+        return self._record(self.result(future, lambda e: _failed(path, e, sections)))
+
+    def extract_upload(self, data: bytes, name: str, sections: Optional[List[str]] = None,
+                       include_blobs: bool = False, timings: bool = False) -> bytes:
+        future = self.submit(_extract_upload, data, name, sections, include_blobs, timings)
+        return self._record(self.result(future, lambda e: _failed(name, e, sections)))
+
+    def extract_batch(self, paths: List[str], sections: Optional[List[str]] = None,
+                      include_blobs: bool = False, timings: bool = False) -> List[bytes]:
+        """分批交給工作行程，依輸入順序回傳每個檔案的 JSON 記錄
+
+        第一批和單一請求一樣在排隊已滿時回應 503；已受理的請求之後的批次等待空位，
+        同時送出的批次不超過工作行程數，避免單一大型請求佔滿整個佇列。
+        """
+        chunks = [paths[i:i + self.chunksize] for i in range(0, len(paths), self.chunksize)]
+        futures = []
+        records = []
+        for index, chunk in enumerate(chunks):
+            if len(futures) >= self.workers:
+                records.extend(self._chunk_result(*futures.pop(0), sections))
+            futures.append((chunk, self.submit(_extract_chunk, chunk, sections, include_blobs, timings,
+                                               block=index > 0)))
+        for chunk, future in futures:
+            records.extend(self._chunk_result(chunk, future, sections))
+        return records
+
+    def _chunk_result(self, chunk: List[str], future: Future, sections: Optional[List[str]]) -> List[bytes]:
+        results = self.result(future, lambda e: [_finish({'file_path': path, **metadata}, False)
+                                                 for path, metadata in _error_results(chunk, e, sections)])
+        return [self._record(result) for result in results]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'status': 'ok', 'workers': self.workers, 'max_queue': self.max_queue,
+                    'in_flight': self.in_flight, 'rejected': self.rejected}
+
+    def render_metrics(self) -> str:
+        """/metrics 的內容：各階段耗時的直方圖加上工作行程與排隊狀況"""
+        status = self.status()
+        lines = [self.metrics.render_prometheus()]
+        for name, kind, help_text, value in (
+            ('workers', 'gauge', '工作行程數', status['workers']),
+            ('queue_limit', 'gauge', '排隊中的工作上限', status['max_queue']),
+            ('in_flight', 'gauge', '排隊與執行中的工作數', status['in_flight']),
+            ('rejected_total', 'counter', '排隊已滿而回應 503 的請求數', status['rejected']),
+        ):
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}\n'
+                         f'# TYPE {METRIC_PREFIX}_{name} {kind}\n'
+                         f'{METRIC_PREFIX}_{name} {value}\n')
+        return ''.join(lines)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_sections(value: Any) -> Optional[List[str]]:
+    """'gps,exif' 或 ['gps', 'exif'] 轉成依 SECTION_KEYS 排序的區段清單；未指定時為 None（全部）"""
+    if value is None or value == '' or value == []:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(section, str) for section in value):
+        raise RequestError(400, 'sections 必須是區段名稱的清單')
+    unknown = sorted(set(value) - set(SECTION_KEYS))
+    if unknown:
+        raise RequestError(400, f"未知的區段: {', '.join(unknown)}（可用: {', '.join(SECTION_KEYS)}）")
+    return [section for section in SECTION_KEYS if section in set(value)]
+
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+class ExtractionRequestHandler(BaseHTTPRequestHandler):
+    """處理 /extract、/extract/batch、/health 與 /metrics"""
+
+    # HTTP/1.1：回應都帶 Content-Length，連線保持開啟
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PhotoMetadataServer/1.0'
+    timeout = KEEPALIVE_TIMEOUT
+    # 標頭與內容分兩次寫出，Nagle 演算法加上對方的延遲 ACK 會讓每個回應多等約 40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/health':
+            self.send_json(200, json.dumps(self.server.service.status()).encode('utf-8'))
+        elif path == '/metrics':
+            self.send_body(200, self.server.service.render_metrics().encode('utf-8'),
+                           'text/plain; version=0.0.4; charset=utf-8')
+        else:
+            self.send_error_json(RequestError(404, f'找不到 {self.path}'))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            body = self.read_body()
+            if url.path == '/extract':
+                payload = self.extract(body, parse_qs(url.query))
+            elif url.path == '/extract/batch':
+                payload = self.extract_batch(body)
+            else:
+                raise RequestError(404, f'找不到 {url.path}')
+        except RequestError as e:
+            self.send_error_json(e)
+            return
+        self.send_json(200, payload)
+
+    def read_body(self) -> bytes:
+        length = self.headers.get('Content-Length')
+        if length is None:
+            # 不支援 chunked 上傳，讀不到請求的結尾，連線無法繼續使用
+            self.close_connection = True
+            raise RequestError(411, '請求必須帶有 Content-Length')
+        try:
+            length = int(length)
+        except ValueError:
+            self.close_connection = True
+            raise RequestError(400, 'Content-Length 格式錯誤')
+        if length > self.server.max_body:
+            # 不讀取過大的內容，直接關閉連線
+            self.close_connection = True
+            raise RequestError(413, f'請求內容超過上限 {self.server.max_body} bytes')
+        return self.rfile.read(length)
+
+    def read_json(self, body: bytes) -> Dict[str, Any]:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise RequestError(400, '請求內容不是有效的 JSON')
+        if not isinstance(payload, dict):
+            raise RequestError(400, '請求內容必須是 JSON 物件')
+        return payload
+
+    def extract(self, body: bytes, query: Dict[str, List[str]]) -> bytes:
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        service = self.server.service
+        if content_type == 'application/json':
+            payload = self.read_json(body)
+            path = payload.get('path')
+            if not isinstance(path, str) or not path:
+                raise RequestError(400, '請以 "path" 指定相片路徑')
+            return service.extract(path, parse_sections(payload.get('sections')),
+                                   _flag(payload.get('include_blobs')), _flag(payload.get('timings')))
+        # 其他內容類型視為相片本身
+        if not body:
+            raise RequestError(400, '請上傳相片內容，或以 JSON 指定 "path"')
+        option = lambda key: query.get(key, [None])[-1]
+        return service.extract_upload(body, os.path.basename(option('name') or 'upload'),
+                                      parse_sections(option('sections')), _flag(option('include_blobs')),
+                                      _flag(option('timings')))
+
+    def extract_batch(self, body: bytes) -> bytes:
+        payload = self.read_json(body)
+        paths = payload.get('paths')
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            raise RequestError(400, '請以 "paths" 指定相片路徑的清單')
+        records = self.server.service.extract_batch(paths, parse_sections(payload.get('sections')),
+                                                    _flag(payload.get('include_blobs')), _flag(payload.get('timings')))
+        return b'{"results":[' + b','.join(records) + b']}'
+
+    def send_json(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.send_body(status, body, 'application/json; charset=utf-8', headers)
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, error: RequestError):
+        headers = {'Retry-After': str(RETRY_AFTER)} if error.status == 503 else None
+        self.send_json(error.status, json.dumps({'error': str(error)}, ensure_ascii=False).encode('utf-8'), headers)
+
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+
+class ExtractionServer(ThreadingHTTPServer):
+    """每條連線一個執行緒；提取交給 ExtractionService 的工作行程池"""
+
+    daemon_threads = True
+    # 同時建立大量連線時的 listen backlog
+    request_queue_size = 128
+
+    def __init__(self, address, service: ExtractionService, max_body: int = DEFAULT_MAX_BODY,
+                 access_log: bool = False):
+        self.service = service
+        self.max_body = max_body
+        self.access_log = access_log
+        super().__init__(address, ExtractionRequestHandler)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料夾瀏覽器
+Folder Browser for the Tk GUI
+
+以 ttk.Treeview 列出資料夾（遞迴）中的相片，讓使用者快速檢視上萬張相片：
+- 檔案清單在背景走訪，找到的檔案分段交給主執行緒插入列，第一批列立即出現，
+  不必等整個資料夾走訪完（慢速的網路磁碟上也是如此）
+- 只有捲動到可見範圍（加上前後緩衝）的列才由背景預取器讀取摘要
+  （相機、拍攝時間、有無 GPS），捲走的列尚未開始的讀取會被取消
+- 摘要存在有上限的 LRU 快取，縮圖則由 PreviewPipeline 的快取負責
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, Callable, List, Optional, Tuple
+
+import tkinter as tk
+from tkinter import ttk
+
+from batch_extractor import walk_images
+from background_tasks import BackgroundRunner, CancelToken, check_cancelled
+from exif_segment_reader import scan_jpeg
+
+# 清單欄位：(欄位 ID, 標題, 寬度)
+FOLDER_COLUMNS = (
+    ('camera', '相機', 180),
+    ('date', '拍攝時間', 150),
+    ('gps', 'GPS', 50),
+)
+
+# 每次插入 Treeview 的列數（每批之間讓出主執行緒）
+INSERT_BATCH = 500
+
+# 背景走訪時每找到多少個檔案、或最久隔多少秒，就把已找到的檔案交給主執行緒
+LIST_CHUNK = 200
+LIST_FLUSH_SECONDS = 0.1
+
+# 主執行緒取回已找到檔案的間隔（毫秒）
+LIST_POLL_MS = 50
+
+# 可見範圍前後額外預取的列數
+PREFETCH_MARGIN = 20
+
+# 每個預取工作處理的檔案數
+PREFETCH_CHUNK = 8
+
+# 捲動停止多久後才送出預取（毫秒）
+SCROLL_DEBOUNCE_MS = 50
+
+# 摘要快取的上限
+DEFAULT_SUMMARY_ENTRIES = 50_000
+
+# 預取器的工作執行緒數（與提取、預覽分開，不會搶走使用者操作的執行緒）
+PREFETCH_WORKERS = 2
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+
+
+def summarize_photo(file_path: str) -> Dict[str, str]:
+    """讀取清單需要的摘要：相機、拍攝時間、有無 GPS（只解析 IFD0 與 ExifIFD）"""
+    from PIL import Image
+
+    scan = scan_jpeg(file_path)
+    if scan.is_jpeg:
+        if not scan.exif_segment:
+            return {'camera': '', 'date': '', 'gps': '無'}
+        exif = Image.Exif()
+        exif.load(scan.exif_segment)
+        return _summarize_exif(exif, 'GPS' in scan.ifd_offsets)
+
+    with Image.open(file_path) as img:
+        # TIFF 的子 IFD 在讀取時才從檔案載入，必須在關閉檔案前取出
+        exif = img.getexif()
+        return _summarize_exif(exif, GPS_IFD in exif)
+
+
+def _summarize_exif(exif, has_gps: bool) -> Dict[str, str]:
+    make = str(exif.get(271, '')).strip('\x00 ')
+    model = str(exif.get(272, '')).strip('\x00 ')
+    if model.startswith(make):
+        make = ''
+    date = exif.get_ifd(EXIF_IFD).get(36867) or exif.get(306) or ''
+    return {
+        'camera': f"{make} {model}".strip(),
+        'date': str(date).strip('\x00 '),
+        'gps': '有' if has_gps else '無'
+    }
+
+
+class SummaryCache:
+    """有上限的摘要 LRU 快取，以 (路徑, 大小, 修改時間) 判斷檔案是否變更（可在多個執行緒使用）"""
+
+    def __init__(self, max_entries: int = DEFAULT_SUMMARY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _identity(file_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def get_or_summarize(self, file_path: str) -> Dict[str, str]:
+        identity = self._identity(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == identity:
+                self._entries.move_to_end(file_path)
+                return entry[1]
+
+        try:
+            summary = summarize_photo(file_path)
+        except Exception:
+            summary = {'camera': '（無法讀取）', 'date': '', 'gps': ''}
+
+        with self._lock:
+            self._entries[file_path] = (identity, summary)
+            self._entries.move_to_end(file_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return summary
+
+
+class FolderBrowser:
+    """資料夾相片清單：分批插入列，只預取可見範圍的摘要"""
+
+    def __init__(self, parent, runner: BackgroundRunner, on_select: Callable[[str], None],
+                 summary_cache: Optional[SummaryCache] = None):
+        self.runner = runner
+        self.on_select = on_select
+        self.summary_cache = summary_cache or SummaryCache()
+        self.prefetcher = BackgroundRunner(runner.root, max_workers=PREFETCH_WORKERS)
+
+        self.files: List[str] = []
+        self.folder = ''
+        self._inserted = 0
+        self._loaded = set()
+        self._list_token: Optional[CancelToken] = None
+        self._found: Optional[queue.SimpleQueue] = None
+        self._prefetch_token: Optional[CancelToken] = None
+        self._insert_id = None
+        self._scroll_id = None
+        self._drain_id = None
+
+        self.frame = ttk.Frame(parent, style='Cyber.TFrame')
+        self.status_var = tk.StringVar(value="尚未開啟資料夾")
+        status_label = ttk.Label(self.frame, textvariable=self.status_var, style='Cyber.TLabel', font=('Consolas', 10))
+        status_label.grid(row=0, column=0, columnspan=2, sticky=tk.W)
+
+        self.tree = ttk.Treeview(self.frame, columns=[column[0] for column in FOLDER_COLUMNS],
+                                 height=8, selectmode='browse')
+        self.tree.heading('#0', text='檔案')
+        self.tree.column('#0', width=260)
+        for column_id, title, width in FOLDER_COLUMNS:
+            self.tree.heading(column_id, text=title)
+            self.tree.column(column_id, width=width, stretch=column_id != 'gps')
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        # 捲動時同時更新捲軸並排定可見範圍的預取
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.bind('<Configure>', lambda event: self._schedule_prefetch())
+
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(1, weight=1)
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def open_folder(self, folder: str):
+        """列出資料夾中的相片（在背景執行），之前的清單與預取全部取消"""
+        self.clear()
+        self.folder = folder
+        self.status_var.set(f"正在列出 {folder} ...")
+        self._list_token = CancelToken()
+        self._found = queue.SimpleQueue()
+        self.runner.submit(self._list_files, folder, self._list_token, self._found, token=self._list_token,
+                           on_done=self._on_listed, on_error=self._on_list_error)
+        self._drain_id = self.tree.after(LIST_POLL_MS, self._drain_found)
+
+    @staticmethod
+    def _list_files(folder: str, cancel_token: CancelToken, found: queue.SimpleQueue) -> int:
+        """背景執行緒：走訪資料夾，找到的檔案分段放進 found，回傳檔案總數"""
+        count = 0
+        chunk = []
+        flushed = time.monotonic()
+        for path in walk_images(folder):
+            chunk.append(path)
+            if len(chunk) >= LIST_CHUNK or time.monotonic() - flushed >= LIST_FLUSH_SECONDS:
+                check_cancelled(cancel_token)
+                found.put(chunk)
+                count += len(chunk)
+                chunk = []
+                flushed = time.monotonic()
+        if chunk:
+            found.put(chunk)
+            count += len(chunk)
+        return count
+
+    def _take_found(self):
+        """取回背景已找到的檔案，沒有正在插入時接著插入列"""
+        while True:
+            try:
+                self.files.extend(self._found.get_nowait())
+            except queue.Empty:
+                break
+        if self._insert_id is None and self._inserted < len(self.files):
+            self._insert_batch()
+
+    def _drain_found(self):
+        """主執行緒：走訪期間定期取回已找到的檔案"""
+        self._drain_id = None
+        self._take_found()
+        self.status_var.set(f"正在列出 {self.folder} ... 已找到 {len(self.files):,} 張相片")
+        self._drain_id = self.tree.after(LIST_POLL_MS, self._drain_found)
+
+    def _stop_draining(self):
+        if self._drain_id is not None:
+            self.tree.after_cancel(self._drain_id)
+            self._drain_id = None
+        # 走訪結束前放進的檔案都在佇列中
+        self._take_found()
+        self._list_token = None
+
+    def _on_listed(self, count: int):
+        self._stop_draining()
+        self.status_var.set(f"{self.folder}：{len(self.files):,} 張相片")
+
+    def _on_list_error(self, error: BaseException):
+        self._stop_draining()
+        self.status_var.set(f"無法列出資料夾: {error}")
+
+    def _insert_batch(self):
+        """分批插入列，每批之間讓出主執行緒，第一批列立即可見"""
+        self._insert_id = None
+        start = self._inserted
+        end = min(start + INSERT_BATCH, len(self.files))
+        for index in range(start, end):
+            path = self.files[index]
+            self.tree.insert('', tk.END, iid=str(index), text=os.path.relpath(path, self.folder),
+                             values=('…', '', ''))
+        self._inserted = end
+        # 新的列落在可見範圍內（第一批，或可見範圍還沒填滿）時預取摘要
+        if start < self.visible_range()[1]:
+            self._schedule_prefetch()
+        if self._inserted < len(self.files):
+            self._insert_id = self.tree.after(1, self._insert_batch)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_prefetch()
+
+    def _schedule_prefetch(self):
+        """捲動停止後才預取，避免快速捲動時送出大量工作"""
+        if self._scroll_id is not None:
+            self.tree.after_cancel(self._scroll_id)
+        self._scroll_id = self.tree.after(SCROLL_DEBOUNCE_MS, self._prefetch_visible)
+
+    def visible_range(self) -> Tuple[int, int]:
+        """目前可見的列範圍（含前後緩衝）"""
+        if not self._inserted:
+            return 0, 0
+        first, last = self.tree.yview()
+        start = int(first * self._inserted)
+        end = int(last * self._inserted + 0.999)
+        return max(0, start - PREFETCH_MARGIN), min(self._inserted, end + PREFETCH_MARGIN)
+
+    def _prefetch_visible(self):
+        """取消捲走的預取，送出可見範圍內還沒讀取的列"""
+        self._scroll_id = None
+        if self._prefetch_token is not None:
+            self.prefetcher.cancel(self._prefetch_token)
+        start, end = self.visible_range()
+        wanted = [index for index in range(start, end) if index not in self._loaded]
+        if not wanted:
+            return
+
+        self._prefetch_token = token = CancelToken()
+        for i in range(0, len(wanted), PREFETCH_CHUNK):
+            chunk = [(index, self.files[index]) for index in wanted[i:i + PREFETCH_CHUNK]]
+            self.prefetcher.submit(self._summarize_chunk, chunk, token, token=token, on_done=self._fill_rows)
+
+    def _summarize_chunk(self, chunk: List[Tuple[int, str]],
+                         cancel_token: CancelToken) -> List[Tuple[int, Dict[str, str]]]:
+        results = []
+        for index, path in chunk:
+            check_cancelled(cancel_token)
+            results.append((index, self.summary_cache.get_or_summarize(path)))
+        return results
+
+    def _fill_rows(self, results: List[Tuple[int, Dict[str, str]]]):
+        for index, summary in results:
+            if index >= self._inserted:
+                continue
+            self.tree.item(str(index), values=tuple(summary[column[0]] for column in FOLDER_COLUMNS))
+            self._loaded.add(index)
+
+    def _on_tree_select(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.on_select(self.files[int(selection[0])])
+
+    def clear(self):
+        """清空清單並取消列出、插入與預取"""
+        if self._list_token is not None:
+            self.runner.cancel(self._list_token)
+            self._list_token = None
+        if self._prefetch_token is not None:
+            self.prefetcher.cancel(self._prefetch_token)
+            self._prefetch_token = None
+        for after_id in (self._insert_id, self._scroll_id, self._drain_id):
+            if after_id is not None:
+                self.tree.after_cancel(after_id)
+        self._insert_id = None
+        self._scroll_id = None
+        self._drain_id = None
+        self._found = None
+        self.tree.delete(*self.tree.get_children())
+        self.files = []
+        self._inserted = 0
+        self._loaded.clear()
+        self.status_var.set("尚未開啟資料夾")
+
+    def shutdown(self):
+        self.clear()
+        self.prefetcher.shutdown()
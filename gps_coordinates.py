@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPS 座標換算
+GPS Coordinate Conversion
+
+把 GPS IFD 的度/分/秒有理數、南北東西參考與海拔換算成十進位數值。
+
+- gps_position() 換算單張相片，GUI、命令列與簡化查看器共用
+- GPSColumns 是批次用的欄位式階段：每張相片只把原始的分子、分母與正負號
+  附加到一個 float64 緩衝區，整批讀完後再一次換算；有 NumPy 時以向量運算完成，
+  沒有時逐列換算。兩種方式使用相同的浮點運算順序，結果完全一致。
+  NumPy 在第一次整批換算時才匯入，只換算單張相片或不需要 GPS 時不必付出匯入成本
+
+接受的值：PIL 的 IFDRational、piexif 的 (分子, 分母)、一般數字；
+參考值可以是 str 或 bytes（'S'、b'W'），海拔參考可以是整數或 bytes（b'\\x01'）。
+
+另外提供空間查詢用的大圓距離（haversine）與半徑的經緯度範圍。
+"""
+
+import math
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 選用的 NumPy，由 load_numpy() 在第一次整批換算時匯入
+np = None
+_numpy_checked = False
+
+# GPS IFD 標籤
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+GPS_ALTITUDE_REF = 5
+GPS_ALTITUDE = 6
+
+# 以標籤名稱查詢時使用
+GPS_TAG_IDS = {
+    'GPSLatitudeRef': GPS_LATITUDE_REF,
+    'GPSLatitude': GPS_LATITUDE,
+    'GPSLongitudeRef': GPS_LONGITUDE_REF,
+    'GPSLongitude': GPS_LONGITUDE,
+    'GPSAltitudeRef': GPS_ALTITUDE_REF,
+    'GPSAltitude': GPS_ALTITUDE,
+}
+
+NEGATIVE_REFS = frozenset(('S', 'W', b'S', b'W'))
+
+# 每列的欄位：緯度 度/分/秒 的分子與分母、緯度正負號、經度同上、海拔分子與分母、海拔正負號
+ROW_WIDTH = 17
+LATITUDE_COLUMNS = slice(0, 7)
+LONGITUDE_COLUMNS = slice(7, 14)
+ALTITUDE_COLUMNS = slice(14, 17)
+
+NAN = float('nan')
+MISSING_RATIONAL = (NAN, 1.0)
+MISSING_DMS = MISSING_RATIONAL * 3 + (1.0,)
+MISSING_ALTITUDE = (NAN, 1.0, 1.0)
+
+Position = Tuple[Optional[float], Optional[float], Optional[float]]
+
+# 平均地球半徑（公尺）
+EARTH_RADIUS_M = 6371008.8
+
+# 地表上任兩點的最大距離（半個大圓）
+MAX_DISTANCE_M = math.pi * EARTH_RADIUS_M
+
+# (最小緯度, 最小經度, 最大緯度, 最大經度)
+BoundingBox = Tuple[float, float, float, float]
+
+
+def load_numpy():
+    """匯入 NumPy（只嘗試一次），沒有安裝時回傳 None"""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+        _numpy_checked = True
+    return np
+
+
+def _lookup(gps_data: Dict, key) -> Any:
+    """以標籤 ID 或名稱取值（PIL 的 GPS 字典以數字為 key，舊程式以名稱查詢）"""
+    value = gps_data.get(key)
+    if value is None and isinstance(key, str):
+        value = gps_data.get(GPS_TAG_IDS.get(key))
+    return value
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _rational(value) -> Tuple[float, float]:
+    """(分子, 分母)；無法辨識的值以 NaN 表示"""
+    if isinstance(value, (tuple, list)) and len(value) == 2:
+        numerator, denominator = value
+    elif hasattr(value, 'denominator'):
+        # IFDRational 與 Fraction；int 的分母是 1
+        numerator, denominator = value.numerator, value.denominator
+    else:
+        numerator, denominator = value, 1
+    if _is_number(numerator) and _is_number(denominator):
+        return numerator, denominator
+    return MISSING_RATIONAL
+
+
+def _ref_sign(ref) -> float:
+    if isinstance(ref, (str, bytes)):
+        if ref in NEGATIVE_REFS:
+            return -1.0
+        # 大小寫不一或帶有 NUL 填充的寫法
+        if isinstance(ref, bytes):
+            ref = ref.decode('latin-1')
+        if ref.strip('\x00 ')[:1].upper() in NEGATIVE_REFS:
+            return -1.0
+    return 1.0
+
+
+def _gather_dms(value, ref) -> Tuple[float, ...]:
+    """度/分/秒的 (分子, 分母) ×3 與正負號；只有一個數字時視為十進位的度"""
+    if isinstance(value, (tuple, list)) and len(value) == 3:
+        degrees, minutes, seconds = value
+        try:
+            # PIL 的 IFDRational（最常見的情況，分子與分母一定是數字）
+            parts = (degrees.numerator, degrees.denominator, minutes.numerator, minutes.denominator,
+                     seconds.numerator, seconds.denominator)
+        except AttributeError:
+            if type(degrees) is tuple and type(minutes) is tuple and type(seconds) is tuple:
+                # piexif：((分子, 分母), ...)
+                parts = (*degrees, *minutes, *seconds)
+            else:
+                parts = (*_rational(degrees), *_rational(minutes), *_rational(seconds))
+            if len(parts) != 6 or not all(map(_is_number, parts)):
+                return MISSING_DMS
+    elif _is_number(value) or hasattr(value, 'denominator'):
+        parts = (*_rational(value), 0, 1, 0, 1)
+    else:
+        return MISSING_DMS
+    return (*parts, _ref_sign(ref))
+
+
+def _gather_altitude(value, ref) -> Tuple[float, float, float]:
+    if value is None:
+        return MISSING_ALTITUDE
+    if isinstance(ref, bytes):
+        ref = ref[0] if ref else 0
+    # GPSAltitudeRef 1 表示海平面以下
+    return (*_rational(value), -1.0 if ref == 1 else 1.0)
+
+
+def gather_row(gps_data: Dict) -> Tuple[float, ...]:
+    """一張相片的原始欄位（長度 ROW_WIDTH，值可能是 int 或 float）"""
+    get = gps_data.get
+    return (
+        *_gather_dms(get(GPS_LATITUDE), get(GPS_LATITUDE_REF)),
+        *_gather_dms(get(GPS_LONGITUDE), get(GPS_LONGITUDE_REF)),
+        *_gather_altitude(get(GPS_ALTITUDE), get(GPS_ALTITUDE_REF)),
+    )
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    # 0/0 等無效的有理數（部分裝置以此表示未知）視為缺值
+    return numerator / denominator if denominator else NAN
+
+
+def _combine_dms(row, start: int) -> float:
+    degrees = _ratio(row[start], row[start + 1])
+    minutes = _ratio(row[start + 2], row[start + 3])
+    seconds = _ratio(row[start + 4], row[start + 5])
+    return (degrees + minutes / 60.0 + seconds / 3600.0) * row[start + 6]
+
+
+def _round(value: float, ndigits: Optional[int]) -> Optional[float]:
+    if value != value:
+        return None
+    return value if ndigits is None else round(value, ndigits)
+
+
+def gps_position(gps_data: Dict, ndigits: Optional[int] = 6,
+                 altitude_ndigits: Optional[int] = 2) -> Position:
+    """單張相片的 (緯度, 經度, 海拔公尺)，缺少的值為 None；ndigits 為 None 時不四捨五入"""
+    # 與 GPSColumns 相同，先轉成 float64 再運算
+    row = array('d', gather_row(gps_data))
+    return (_round(_combine_dms(row, 0), ndigits),
+            _round(_combine_dms(row, 7), ndigits),
+            _round(_ratio(row[14], row[15]) * row[16], altitude_ndigits))
+
+
+def gps_coordinate(gps_data: Dict, value_key, ref_key, ndigits: Optional[int] = 6) -> Optional[float]:
+    """單一座標（緯度或經度）的十進位度數；key 可以是標籤 ID 或名稱，沒有參考值時視為北緯/東經"""
+    row = array('d', _gather_dms(_lookup(gps_data, value_key), _lookup(gps_data, ref_key)))
+    return _round(_combine_dms(row, 0), ndigits)
+
+
+class GPSColumns:
+    """批次的 GPS 欄位：逐張附加原始數值，最後一次換算整批的座標與海拔"""
+
+    def __init__(self):
+        self._values = array('d')
+
+    def __len__(self) -> int:
+        return len(self._values) // ROW_WIDTH
+
+    def append(self, gps_data: Dict) -> int:
+        """附加一張相片的 GPS 字典，回傳列號"""
+        self._values.extend(gather_row(gps_data))
+        return len(self) - 1
+
+    def compute(self) -> Tuple[Any, Any, Any]:
+        """整批的 (緯度, 經度, 海拔)，缺值為 NaN
+
+        有 NumPy 時回傳 float64 陣列（直接使用緩衝區，不複製），否則回傳 list。
+        """
+        if load_numpy() is None:
+            rows = [self._values[i:i + ROW_WIDTH] for i in range(0, len(self._values), ROW_WIDTH)]
+            return ([_combine_dms(row, 0) for row in rows],
+                    [_combine_dms(row, 7) for row in rows],
+                    [_ratio(row[14], row[15]) * row[16] for row in rows])
+
+        table = np.frombuffer(self._values, dtype=np.float64).reshape(-1, ROW_WIDTH)
+        return (self._combine_columns(table[:, LATITUDE_COLUMNS]),
+                self._combine_columns(table[:, LONGITUDE_COLUMNS]),
+                self._ratio_columns(table[:, ALTITUDE_COLUMNS])[:, 0] * table[:, 16])
+
+    @staticmethod
+    def _ratio_columns(columns):
+        numerators, denominators = columns[:, 0:-1:2], columns[:, 1::2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominators != 0, numerators / denominators, np.nan)
+
+    @classmethod
+    def _combine_columns(cls, columns):
+        parts = cls._ratio_columns(columns)
+        # 與 _combine_dms 相同的運算順序，結果逐位元一致
+        return (parts[:, 0] + parts[:, 1] / 60.0 + parts[:, 2] / 3600.0) * columns[:, 6]
+
+    def positions(self, ndigits: Optional[int] = 6,
+                  altitude_ndigits: Optional[int] = 2) -> Iterator[Position]:
+        """依附加順序產生每張相片的 (緯度, 經度, 海拔)，與 gps_position() 的結果相同"""
+        latitudes, longitudes, altitudes = self.compute()
+        if np is not None:
+            latitudes, longitudes, altitudes = latitudes.tolist(), longitudes.tolist(), altitudes.tolist()
+        for lat, lon, alt in zip(latitudes, longitudes, altitudes):
+            yield _round(lat, ndigits), _round(lon, ndigits), _round(alt, altitude_ndigits)
+
+    def clear(self):
+        self._values = array('d')
+
+
+def batch_positions(gps_dicts: List[Dict], ndigits: Optional[int] = 6,
+                    altitude_ndigits: Optional[int] = 2) -> List[Position]:
+    """一次換算多張相片的 GPS 字典"""
+    columns = GPSColumns()
+    for gps_data in gps_dicts:
+        columns.append(gps_data)
+    return list(columns.positions(ndigits, altitude_ndigits))
+
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """兩點間的大圓距離（公尺）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(lon2 - lon1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def split_antimeridian(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[BoundingBox]:
+    """把經度範圍正規化到 [-180, 180]；跨越 180 度經線時分成兩個範圍
+
+    min_lon > max_lon 表示範圍本身跨越 180 度經線（例如 170 到 -170）。
+    """
+    if min_lon > max_lon:
+        max_lon += 360
+    if max_lon - min_lon >= 360:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    if min_lon < -180:
+        return [(min_lat, min_lon + 360, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def radius_bounding_boxes(lat: float, lon: float, radius_m: float) -> List[BoundingBox]:
+    """包含以 (lat, lon) 為圓心、radius_m 為半徑之圓的經緯度範圍（跨越 180 度經線時有兩個）"""
+    angular = radius_m / EARTH_RADIUS_M
+    dlat = math.degrees(angular)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        # 圓包含極點：所有經度都可能在範圍內
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+    # 圓上經度差最大的點不在圓心的緯度上，以球面公式計算
+    ratio = math.sin(angular) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    dlon = math.degrees(math.asin(ratio))
+    return split_antimeridian(min_lat, lon - dlon, max_lat, lon + dlon)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 序列化後端
+JSON Serialization Backend
+
+有安裝 orjson（選用依賴）時以 orjson 編碼，否則使用標準函式庫 json。兩種後端的輸出逐位元組相同，
+下游程式不必知道用的是哪一個：
+- 精簡格式（separators=(',', ':')）與美化格式（indent=2），非 ASCII 字元直接以 UTF-8 輸出
+- orjson 與 json 只有浮點數的寫法不同（json 的 1e-05、1e+16，orjson 寫成 0.00001、1e16），
+  輸出中出現這類數字時改以 json 重新編碼這一筆；超過 64 位元的整數、不合法的 Unicode、
+  default 轉換出的 NaN（例如分母為 0 的 IFDRational）等 orjson 寫法不同或不支援的值也一樣
+- dump() 把最外層的字典或串列逐項編碼後寫入檔案，不必先組出整份輸出
+
+NaN 與 Infinity 不是合法的 JSON：資料中原本就是 float 的 NaN/Infinity，json 寫成 NaN/Infinity，orjson 寫成 null。
+"""
+
+import re
+import json
+import math
+from typing import Any, BinaryIO, Callable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+BACKENDS = ('auto', 'orjson', 'json')
+
+# orjson 與 json 寫法不同的數字：指數形式（e 後面 1 至 4 個字元的指數），或小於 1e-4 時 orjson 寫成的 0.0000…
+# 數字之後一定接著 , ] } 、換行或輸出的結尾；把輸出反轉並將字元歸類（數字與負號 → d、結尾字元 → t、
+# 其餘 → x），在最前面補上代表輸出結尾的 t 後再比對，正規表示式只需在少數的結尾字元處嘗試，
+# 十六進位的 blob 中大量的 e 不會拖慢比對。
+# 字串內容偶爾也會符合，此時只是改用 json 編碼
+_FLOAT_CLASSES = bytes(
+    ord('d') if c in b'123456789-' else c if c in b'0.e' else ord('t') if c in b',]}\n' else ord('x')
+    for c in range(256))
+_FLOAT_MISMATCH = re.compile(rb't(?:[0d]{1,4}e|[0d]*0000\.0)')
+
+
+def default_backend() -> str:
+    """auto 實際使用的後端"""
+    return 'orjson' if HAS_ORJSON else 'json'
+
+
+class JSONSerializer:
+    """以選定的後端把值編碼成 UTF-8 的 JSON；default 處理無法直接序列化的值（同 json.dumps）"""
+
+    def __init__(self, pretty: bool = False, default: Optional[Callable[[Any], Any]] = None,
+                 backend: str = 'auto'):
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的 JSON 後端: {backend}")
+        if backend == 'auto':
+            backend = default_backend()
+        if backend == 'orjson' and not HAS_ORJSON:
+            raise RuntimeError("--json-backend orjson 需要安裝 orjson：pip install orjson")
+        self.backend = backend
+        self.pretty = pretty
+        self.default = default
+        if pretty:
+            self._json_options = {'indent': 2, 'ensure_ascii': False, 'default': default}
+        else:
+            self._json_options = {'ensure_ascii': False, 'separators': (',', ':'), 'default': default}
+        if backend == 'orjson':
+            self._orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | \
+                orjson.OPT_PASSTHROUGH_DATACLASS | (orjson.OPT_INDENT_2 if pretty else 0)
+
+    def _orjson_default(self, value: Any) -> Any:
+        result = self.default(value)
+        if type(result) is float and not math.isfinite(result):
+            # orjson 會寫成 null，交給 json 寫成 NaN/Infinity
+            raise TypeError("non-finite float")
+        return result
+
+    def _json_dumps(self, value: Any) -> bytes:
+        return json.dumps(value, **self._json_options).encode('utf-8')
+
+    def dumps(self, value: Any) -> bytes:
+        """編碼成 UTF-8 的 JSON（結尾沒有換行）"""
+        if self.backend == 'json':
+            return self._json_dumps(value)
+        try:
+            data = orjson.dumps(value, default=self._orjson_default if self.default else None,
+                                option=self._orjson_options)
+        except TypeError:
+            # orjson 不支援的值：交給 json 處理，無法序列化時拋出與 json 相同的錯誤
+            return self._json_dumps(value)
+        if _FLOAT_MISMATCH.search(b't' + data[::-1].translate(_FLOAT_CLASSES)):
+            return self._json_dumps(value)
+        return data
+
+    def dump(self, value: Any, f: BinaryIO):
+        """寫入二進位檔案；最外層的字典（鍵都是字串時）或串列逐項寫出，結果與 dumps() 相同"""
+        if isinstance(value, dict) and value and all(type(key) is str for key in value):
+            items = ((self.dumps(key), item) for key, item in value.items())
+            opening, closing = b'{', b'}'
+        elif isinstance(value, (list, tuple)) and value:
+            items = ((None, item) for item in value)
+            opening, closing = b'[', b']'
+        else:
+            f.write(self.dumps(value))
+            return
+
+        if self.pretty:
+            # 內層的值多縮排一層；字串中的換行一定經過跳脫，所以輸出中的換行都是縮排
+            separator, indent, key_separator = b',\n  ', b'\n  ', b': '
+        else:
+            separator, indent, key_separator = b',', b'', b':'
+        f.write(opening + (b'\n  ' if self.pretty else b''))
+        for i, (key, item) in enumerate(items):
+            if i:
+                f.write(separator)
+            if key is not None:
+                f.write(key + key_separator)
+            data = self.dumps(item)
+            f.write(data.replace(b'\n', indent) if self.pretty else data)
+        f.write((b'\n' if self.pretty else b'') + closing)
+
+    def loads(self, data) -> Any:
+        """解碼 JSON（str 或 bytes）"""
+        if self.backend == 'orjson':
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # NaN、超過 64 位元的整數等 orjson 不接受的內容
+                pass
+        return json.loads(data)
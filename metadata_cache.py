@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化提取結果快取
+Persistent Metadata Cache
+
+以 SQLite 檔案保存每張相片解析後的各區段資料，以檔案身分
+(路徑, 大小, 修改時間, inode) 作為鍵：
+- 命中時只需要一次 stat()，不必再開啟相片
+- 超過筆數上限時淘汰最久沒用到的記錄
+- 解析器輸出格式改變時遞增 SCHEMA_VERSION，舊快取會整個失效；
+  影響輸出的提取選項（例如二進位值的門檻）不同時也會失效
+- 只保存完整提取的結果；只要部分區段時從完整記錄中取出
+- 存取時間等不影響檔案身分的時間，命中時以這次的 stat 重新產生
+"""
+
+import os
+import json
+import time
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from exif_segment_reader import project_sections
+from photo_record import file_times
+from json_backend import JSONSerializer
+
+# 解析器輸出格式改變時必須遞增
+SCHEMA_VERSION = 3
+
+# 預設最多保存的記錄數
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# 累積多少筆寫入後提交一次交易
+COMMIT_EVERY = 1000
+
+
+class MetadataCache:
+    """以檔案身分為鍵的 SQLite 提取結果快取"""
+
+    def __init__(self, db_path: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 default: Optional[Callable[[Any], Any]] = None,
+                 options: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.default = default
+        self.serializer = JSONSerializer(default=default)
+        self.options = json.dumps(options or {}, sort_keys=True)
+        self.hits = 0
+        self.misses = 0
+
+        import sqlite3
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._init_schema()
+
+        # 本次執行的序號，用來記錄每筆資料最後一次被使用的時間
+        self.run_id = time.time_ns()
+        self._touched: List[str] = []
+        self._pending_writes = 0
+
+    def _init_schema(self):
+        """建立資料表；版本或提取選項不符時清空舊資料"""
+        self.conn.execute('CREATE TABLE IF NOT EXISTS cache_info (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                last_used INTEGER NOT NULL,
+                data TEXT NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+
+        info = dict(self.conn.execute("SELECT key, value FROM cache_info"))
+        if info.get('schema_version') != str(SCHEMA_VERSION) or info.get('options', '{}') != self.options:
+            self.conn.execute('DELETE FROM entries')
+            self.conn.executemany("INSERT OR REPLACE INTO cache_info (key, value) VALUES (?, ?)",
+                                  [('schema_version', str(SCHEMA_VERSION)), ('options', self.options)])
+        self.conn.commit()
+
+    @staticmethod
+    def file_stat(file_path: str) -> Optional[os.stat_result]:
+        """取得檔案身分；檔案不存在時回傳 None"""
+        try:
+            return os.stat(file_path)
+        except OSError:
+            return None
+
+    def get(self, file_path: str, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """查詢快取；檔案大小、修改時間或 inode 不同即視為未命中"""
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, inode, data FROM entries WHERE path = ?', (file_path,)
+        ).fetchone()
+        if row is None or row[:3] != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched.append(file_path)
+        self._count_write()
+        metadata = self.serializer.loads(row[3])
+        basic_info = metadata.get('basic_info')
+        if basic_info and '存取時間' in basic_info:
+            # 讀取檔案會更新存取時間（chmod 等也會更新建立時間），與不使用快取時一樣顯示目前的值
+            basic_info.update(file_times(stat))
+        return metadata
+
+    def put(self, file_path: str, stat: os.stat_result, metadata: Dict[str, Any]):
+        """寫入一筆提取結果"""
+        # 耗時只屬於當次提取，命中時不應該重複回報
+        metadata = {key: value for key, value in metadata.items() if key != 'diagnostic_info'}
+        data = self.serializer.dumps(metadata).decode('utf-8')
+        self.conn.execute(
+            'INSERT OR REPLACE INTO entries (path, size, mtime_ns, inode, last_used, data) VALUES (?, ?, ?, ?, ?, ?)',
+            (file_path, stat.st_size, stat.st_mtime_ns, stat.st_ino, self.run_id, data)
+        )
+        self._count_write()
+
+    def get_or_extract(self, file_path: str, extract: Callable[[str], Dict[str, Any]],
+                       sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """快取命中就直接回傳，否則呼叫 extract 並寫入快取
+
+        指定 sections 時 extract 只提取部分區段：命中時從完整記錄取出這些區段，
+        未命中時提取結果不完整，不寫入快取。
+        """
+        stat = self.file_stat(file_path)
+        if stat is None:
+            self.misses += 1
+            return extract(file_path)
+
+        metadata = self.get(file_path, stat)
+        if metadata is None:
+            metadata = extract(file_path)
+            if sections is None:
+                self.put(file_path, stat, metadata)
+            return metadata
+        return project_sections(metadata, sections)
+
+    def _count_write(self):
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        """更新命中記錄的使用時間並提交交易"""
+        if self._touched:
+            self.conn.executemany('UPDATE entries SET last_used = ? WHERE path = ?',
+                                  ((self.run_id, path) for path in self._touched))
+            self._touched.clear()
+        self.conn.commit()
+        self._pending_writes = 0
+
+    def evict(self) -> int:
+        """超過筆數上限時淘汰最久沒用到的記錄，回傳刪除的筆數"""
+        count = self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            'DELETE FROM entries WHERE path IN (SELECT path FROM entries ORDER BY last_used LIMIT ?)',
+            (excess,)
+        )
+        self.conn.commit()
+        return excess
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中統計"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def close(self):
+        """提交、淘汰超出上限的記錄並關閉資料庫"""
+        self.commit()
+        self.evict()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
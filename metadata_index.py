@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可查詢的相片資訊索引
+Queryable SQLite Metadata Index
+
+把 PhotoRecord 的有型別欄位（basic_info、exif_data、gps_data 中常用的欄位）存進 SQLite，
+之後的搜尋直接查索引，不必重新開啟任何相片：
+- 欄位名稱與 Parquet/Arrow 輸出相同（見 columnar_writer.EXPORT_COLUMNS）
+- 拍攝時間、相機型號、鏡頭與座標都有索引；時間以 'YYYY-MM-DD HH:MM:SS' 文字保存，可直接比較大小
+- 以檔案身分 (大小, 修改時間, inode) 判斷是否需要重新索引，重跑 index 只處理變更的檔案
+- 欄位定義改變時遞增 INDEX_SCHEMA_VERSION，舊索引會被清空重建
+
+空間查詢（範圍、半徑、最近的 k 張）使用 SQLite 的 R-tree 模組：
+- photos_rtree 由觸發器與 photos 同步，新增、取代、刪除記錄時自動更新
+- R-tree 只用來篩選候選列（座標以 32 位元浮點數保存，範圍會稍微放大），
+  最後仍以 photos 中的 REAL 座標與 haversine 距離精確判斷
+- SQLite 沒有編譯 R-tree 模組時，改用 (緯度, 經度) 的 B-tree 索引，結果相同
+"""
+
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from columnar_writer import EXPORT_COLUMNS
+from photo_record import PhotoRecord
+from gps_coordinates import (BoundingBox, MAX_DISTANCE_M, haversine_distance,
+                             radius_bounding_boxes, split_antimeridian)
+
+# 欄位定義改變時必須遞增
+INDEX_SCHEMA_VERSION = 2
+
+# 累積多少筆寫入後提交一次交易
+COMMIT_EVERY = 1000
+
+SQL_TYPES = {'string': 'TEXT', 'int64': 'INTEGER', 'int32': 'INTEGER', 'float64': 'REAL', 'timestamp': 'TEXT'}
+
+# 欄位名稱 -> (SQLite 型別, 取值函式)；file_path 是主鍵，另外處理
+INDEX_COLUMNS = {name: (SQL_TYPES[type_name], get) for name, type_name, get in EXPORT_COLUMNS
+                 if name != 'file_path'}
+
+# 文字欄位不分大小寫比對（索引也使用相同的 collation 才能用上）
+NOCASE_COLUMNS = ('make', 'model', 'lens_model')
+
+# 相機與鏡頭的索引附帶拍攝時間，依時間排序（預設）並加上 --limit 時不必排序全部符合的列
+INDEXES = (
+    ('photos_datetime', 'datetime_original'),
+    ('photos_model', 'model COLLATE NOCASE, datetime_original'),
+    ('photos_make', 'make COLLATE NOCASE, datetime_original'),
+    ('photos_lens', 'lens_model COLLATE NOCASE, datetime_original'),
+    ('photos_coordinates', 'gps_latitude, gps_longitude'),
+)
+
+# 查詢結果預設顯示的欄位
+SUMMARY_COLUMNS = ('file_path', 'datetime_original', 'make', 'model', 'lens_model', 'iso',
+                   'f_number', 'exposure_time', 'focal_length', 'gps_latitude', 'gps_longitude')
+
+ORDER_COLUMNS = ('datetime_original', 'file_path', 'model', 'iso', 'file_size', 'modified_time')
+
+# 最近鄰搜尋的起始半徑與每次找不到足夠結果時的放大倍數
+KNN_INITIAL_RADIUS_M = 1000.0
+KNN_GROWTH = 4.0
+
+RTREE_SCHEMA = (
+    'CREATE VIRTUAL TABLE photos_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)',
+    '''CREATE TRIGGER IF NOT EXISTS photos_rtree_insert AFTER INSERT ON photos
+       WHEN NEW.gps_latitude IS NOT NULL AND NEW.gps_longitude IS NOT NULL
+       BEGIN
+           INSERT INTO photos_rtree VALUES (NEW.id, NEW.gps_latitude, NEW.gps_latitude,
+                                            NEW.gps_longitude, NEW.gps_longitude);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS photos_rtree_delete AFTER DELETE ON photos
+       BEGIN
+           DELETE FROM photos_rtree WHERE id = OLD.id;
+       END''',
+)
+
+
+def _haversine_sql(lat1, lon1, lat2, lon2) -> Optional[float]:
+    if lat1 is None or lon1 is None:
+        return None
+    return haversine_distance(lat1, lon1, lat2, lon2)
+
+
+def _sql_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    return value
+
+
+def parse_time_bound(text: str, end: bool = False) -> str:
+    """'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM:SS' 轉成索引中的時間格式
+
+    也接受 EXIF 的 'YYYY:MM:DD' 寫法。只有日期的上限包含整天，因此轉成隔天 00:00:00 並以 < 比較。
+    """
+    text = text.strip().replace('T', ' ')
+    if text[4:5] == ':' and text[7:8] == ':':
+        text = f"{text[:4]}-{text[5:7]}-{text[8:]}"
+    if len(text) == 10:
+        day = date.fromisoformat(text)
+        if end:
+            day += timedelta(days=1)
+        return f"{day.isoformat()} 00:00:00"
+    return datetime.fromisoformat(text).isoformat(' ', timespec='seconds')
+
+
+def filter_clauses(make: Optional[str] = None, model: Optional[str] = None, lens: Optional[str] = None,
+                   iso_min: Optional[int] = None, iso_max: Optional[int] = None,
+                   since: Optional[str] = None, until: Optional[str] = None,
+                   has_gps: bool = False, where: Optional[str] = None) -> Tuple[List[str], List[Any]]:
+    """把搜尋條件轉成 WHERE 子句與參數（所有條件以 AND 連接）"""
+    clauses: List[str] = []
+    params: List[Any] = []
+    for column, value in (('make', make), ('model', model), ('lens_model', lens)):
+        if value is not None:
+            clauses.append(f"{column} = ? COLLATE NOCASE")
+            params.append(value)
+    if iso_min is not None:
+        clauses.append("iso >= ?")
+        params.append(iso_min)
+    if iso_max is not None:
+        clauses.append("iso <= ?")
+        params.append(iso_max)
+    if since is not None:
+        clauses.append("datetime_original >= ?")
+        params.append(parse_time_bound(since))
+    if until is not None:
+        bound = parse_time_bound(until, end=True)
+        # 只有日期時已換成隔天，不包含；完整時間則包含該秒
+        clauses.append("datetime_original < ?" if len(until.strip()) == 10 else "datetime_original <= ?")
+        params.append(bound)
+    if has_gps:
+        clauses.append("gps_latitude IS NOT NULL AND gps_longitude IS NOT NULL")
+    if where:
+        # 進階條件直接使用 SQL 運算式（查詢時以唯讀模式開啟資料庫）
+        clauses.append(f"({where})")
+    return clauses, params
+
+
+class MetadataIndex:
+    """以檔案路徑為鍵、欄位有型別的 SQLite 相片索引"""
+
+    def __init__(self, db_path: str, readonly: bool = False):
+        self.db_path = db_path
+        self.readonly = readonly
+        self.indexed = 0
+        self.skipped = 0
+
+        if readonly:
+            if not os.path.exists(db_path):
+                raise FileNotFoundError(f"索引不存在: {db_path}")
+            self.conn = sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro", uri=True)
+        else:
+            self.conn = sqlite3.connect(db_path)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            # INSERT OR REPLACE 取代舊記錄時也要觸發刪除觸發器，R-tree 才不會留下舊的項目
+            self.conn.execute('PRAGMA recursive_triggers=ON')
+            self._init_schema()
+        self.has_rtree = self._has_table('photos_rtree')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function('haversine_m', 4, _haversine_sql, deterministic=True)
+        self._pending_writes = 0
+
+    def _init_schema(self):
+        """建立資料表與索引；版本不符時重建"""
+        self.conn.execute('CREATE TABLE IF NOT EXISTS index_info (key TEXT PRIMARY KEY, value TEXT)')
+        info = dict(self.conn.execute("SELECT key, value FROM index_info"))
+        if info.get('schema_version') != str(INDEX_SCHEMA_VERSION):
+            self.conn.execute('DROP TABLE IF EXISTS photos')
+            self.conn.execute('DROP TABLE IF EXISTS photos_rtree')
+            self.conn.execute("INSERT OR REPLACE INTO index_info (key, value) VALUES (?, ?)",
+                              ('schema_version', str(INDEX_SCHEMA_VERSION)))
+
+        columns = ',\n'.join(
+            f"    {name} {sql_type}{' COLLATE NOCASE' if name in NOCASE_COLUMNS else ''}"
+            for name, (sql_type, _) in INDEX_COLUMNS.items())
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS photos (
+                id INTEGER PRIMARY KEY,
+                file_path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+            {columns}
+            )
+        ''')
+        for name, columns in INDEXES:
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON photos ({columns})')
+        if not self._has_table('photos_rtree'):
+            try:
+                for statement in RTREE_SCHEMA:
+                    self.conn.execute(statement)
+            except sqlite3.OperationalError:
+                # 沒有 R-tree 模組（no such module: rtree），空間查詢改用 B-tree 索引
+                pass
+            else:
+                self.conn.execute('''
+                    INSERT INTO photos_rtree
+                    SELECT id, gps_latitude, gps_latitude, gps_longitude, gps_longitude FROM photos
+                    WHERE gps_latitude IS NOT NULL AND gps_longitude IS NOT NULL
+                ''')
+        self.conn.commit()
+
+    def _has_table(self, name: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+    @staticmethod
+    def file_stat(file_path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(file_path)
+        except OSError:
+            return None
+
+    def is_current(self, file_path: str, stat: os.stat_result) -> bool:
+        """索引中的記錄是否仍對應目前的檔案"""
+        row = self.conn.execute('SELECT size, mtime_ns, inode FROM photos WHERE file_path = ?',
+                                (file_path,)).fetchone()
+        return row is not None and tuple(row) == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def put(self, file_path: str, stat: os.stat_result, record: Union[PhotoRecord, Dict[str, Any]]):
+        """寫入（或取代）一張相片的索引欄位；record 也可以是 extract_metadata() 的結果"""
+        if not isinstance(record, PhotoRecord):
+            record = PhotoRecord.from_metadata(record, file_path)
+        names = list(INDEX_COLUMNS)
+        values = [_sql_value(get(record)) for _, get in INDEX_COLUMNS.values()]
+        placeholders = ', '.join('?' * (len(names) + 4))
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO photos (file_path, size, mtime_ns, inode, {', '.join(names)}) "
+            f"VALUES ({placeholders})",
+            (file_path, stat.st_size, stat.st_mtime_ns, stat.st_ino, *values)
+        )
+        self.indexed += 1
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_EVERY:
+            self.commit()
+
+    def remove_missing(self) -> int:
+        """刪除檔案已不存在的記錄，回傳刪除的筆數"""
+        missing = [(path,) for (path,) in self.conn.execute('SELECT file_path FROM photos')
+                   if not os.path.exists(path)]
+        self.conn.executemany('DELETE FROM photos WHERE file_path = ?', missing)
+        self.conn.commit()
+        return len(missing)
+
+    def box_filter(self, boxes: List[BoundingBox]) -> Tuple[List[str], List[Any]]:
+        """座標落在任一範圍內的條件（與 filter_clauses() 的結果一起使用）"""
+        candidates, exact, params, exact_params = [], [], [], []
+        for min_lat, min_lon, max_lat, max_lon in boxes:
+            candidates.append("id IN (SELECT id FROM photos_rtree WHERE max_lat >= ? AND min_lat <= ? "
+                              "AND max_lon >= ? AND min_lon <= ?)")
+            params.extend((min_lat, max_lat, min_lon, max_lon))
+            exact.append("(gps_latitude BETWEEN ? AND ? AND gps_longitude BETWEEN ? AND ?)")
+            exact_params.extend((min_lat, max_lat, min_lon, max_lon))
+        clauses = [f"({' OR '.join(exact)})"]
+        if self.has_rtree:
+            return [f"({' OR '.join(candidates)})", *clauses], params + exact_params
+        return clauses, exact_params
+
+    def bbox_filter(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Tuple[List[str], List[Any]]:
+        """經緯度範圍的條件；min_lon > max_lon 表示範圍跨越 180 度經線"""
+        return self.box_filter(split_antimeridian(min_lat, min_lon, max_lat, max_lon))
+
+    def radius_filter(self, lat: float, lon: float, radius_m: float) -> Tuple[List[str], List[Any]]:
+        """距離 (lat, lon) 不超過 radius_m 公尺的條件：先以外接範圍篩選，再計算 haversine 距離"""
+        clauses, params = self.box_filter(radius_bounding_boxes(lat, lon, radius_m))
+        clauses.append("haversine_m(gps_latitude, gps_longitude, ?, ?) <= ?")
+        return clauses, [*params, lat, lon, radius_m]
+
+    def query(self, clauses: List[str], params: List[Any], columns: Optional[List[str]] = None,
+              order_by: Optional[str] = None, descending: bool = False,
+              limit: Optional[int] = None,
+              near: Optional[Tuple[float, float]] = None) -> Iterator[Dict[str, Any]]:
+        """依 filter_clauses() 等產生的條件搜尋，逐筆產生欄位字典
+
+        指定 near=(緯度, 經度) 時多一個 distance_m 欄位，預設依距離排序。
+        """
+        selected = list(columns or SUMMARY_COLUMNS)
+        select_params: List[Any] = []
+        if near is not None:
+            selected.append("haversine_m(gps_latitude, gps_longitude, ?, ?) AS distance_m")
+            select_params.extend(near)
+        if order_by is None:
+            order_by = 'distance_m' if near is not None else 'datetime_original'
+        elif order_by not in ORDER_COLUMNS:
+            raise ValueError(f"不支援的排序欄位: {order_by}")
+
+        sql = f"SELECT {', '.join(selected)} FROM photos"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by}{' DESC' if descending else ''}, file_path"
+        params = [*select_params, *params]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for row in self.conn.execute(sql, params):
+            yield dict(row)
+
+    def nearest(self, lat: float, lon: float, k: int, clauses: Optional[List[str]] = None,
+                params: Optional[List[Any]] = None,
+                columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """距離 (lat, lon) 最近的 k 張相片（可再加上其他條件），依距離排序
+
+        以半徑查詢逐步放大範圍：半徑內已有 k 張時，範圍外的相片一定更遠，結果即為最近的 k 張。
+        """
+        radius = KNN_INITIAL_RADIUS_M
+        while True:
+            spatial, spatial_params = self.radius_filter(lat, lon, radius)
+            rows = list(self.query([*(clauses or []), *spatial], [*(params or []), *spatial_params],
+                                   columns, limit=k, near=(lat, lon)))
+            if len(rows) >= k or radius >= MAX_DISTANCE_M:
+                return rows
+            radius = min(radius * KNN_GROWTH, MAX_DISTANCE_M)
+
+    def count(self, clauses: List[str], params: List[Any]) -> int:
+        sql = "SELECT COUNT(*) FROM photos"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def commit(self):
+        self.conn.commit()
+        self._pending_writes = 0
+
+    def close(self):
+        if not self.readonly:
+            self.commit()
+            # 讓 SQLite 依目前資料更新索引統計，查詢規劃才會選對索引
+            self.conn.execute('PRAGMA optimize')
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
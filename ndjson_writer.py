@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NDJSON 串流輸出
+Streaming NDJSON Writer
+
+每張相片寫成一行精簡的 JSON 物件，結果一產生就寫出：
+- 緩衝區達到上限或超過時間間隔就寫出並 flush，記憶體用量固定
+- 輸出路徑為 '-' 時寫到標準輸出，可以直接接管線給下游程式
+- append 時附加到既有檔案的結尾（監看模式持續寫入同一個檔案）
+- 以 json_backend 編碼（有安裝 orjson 時使用 orjson），檔案以二進位寫入，不必再轉碼
+"""
+
+import sys
+import time
+from typing import Dict, Any, Callable, Optional
+
+from json_backend import JSONSerializer
+
+# 緩衝區上限（位元組）
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+# 最長多久一定要寫出一次（秒），讓下游在處理速度慢時也能即時讀到資料
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+class NDJSONWriter:
+    """逐筆寫出 NDJSON（每行一個 JSON 物件）"""
+
+    def __init__(self, output_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 default: Optional[Callable[[Any], Any]] = None, append: bool = False,
+                 backend: str = 'auto'):
+        self.output_path = output_path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.default = default
+        self.serializer = JSONSerializer(default=default, backend=backend)
+        self.records_written = 0
+
+        if output_path == '-':
+            self.stream = sys.stdout
+            self._owns_stream = False
+        else:
+            self.stream = open(output_path, 'ab' if append else 'wb')
+            self._owns_stream = True
+
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, record: Dict[str, Any]):
+        """寫入一筆記錄"""
+        line = self.serializer.dumps(record)
+        self._buffer.append(line)
+        self._buffer.append(b'\n')
+        self._buffered += len(line) + 1
+        self.records_written += 1
+
+        if (self._buffered >= self.buffer_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """寫出緩衝區內容"""
+        if self._buffer:
+            data = b''.join(self._buffer)
+            # 標準輸出是文字串流
+            self.stream.write(data if self._owns_stream else data.decode('utf-8'))
+            self._buffer.clear()
+            self._buffered = 0
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """寫出剩餘資料並關閉檔案"""
+        self.flush()
+        if self._owns_stream:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -12,22 +12,62 @@ Photo Metadata Extractor - Command Line Version
 import os
 import sys
 import json
+import time
+import signal
 import argparse
+from contextlib import nullcontext
 from datetime import datetime
-from pathlib import Path
-from PIL import Image
-try:
-    from PIL.ExifTags import TAGS, GPSTAGS
-except ImportError:
-    # 如果無法匯入 ExifTags，使用基本字典
-    TAGS = {}
-    GPSTAGS = {}
-import piexif
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
+
+from exif_segment_reader import scan_jpeg, load_piexif, SECTION_KEYS
+from exif_text import format_bytes
+from exif_blobs import BlobLocator, expand_blobs, DEFAULT_BLOB_THRESHOLD
+from gps_coordinates import GPSColumns, gps_position, gps_coordinate
+from batch_extractor import iter_image_files, iter_extract, is_batch_request, DEFAULT_CHUNKSIZE
+from photo_record import PhotoRecord, EXIF_TAG_IDS, GPS_INFO_TAG
+from ndjson_writer import NDJSONWriter, DEFAULT_BUFFER_SIZE
+from json_backend import JSONSerializer, BACKENDS, HAS_ORJSON, default_backend
+from columnar_writer import ColumnarWriter, EXPORT_FORMATS, DEFAULT_BATCH_ROWS, format_for_path
+from metadata_cache import MetadataCache, DEFAULT_MAX_ENTRIES
+from directory_watcher import create_watcher, DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL
+from stage_timings import StageTimer, StageMetrics, NULL_TIMER, add_timing
+from extraction_profiler import ExtractionProfiler, DEFAULT_TOP
+
+# Pillow、piexif、索引與 HTTP 服務只在需要的路徑上才匯入：每張相片執行一次的用法（例如
+# --basic-only）中，直譯器啟動與匯入的時間往往比提取本身還長
+
+# query --near 未指定 --radius 與 --limit 時列出的最近相片數
+DEFAULT_NEAREST = 10
+
+
+def json_default(value):
+    """JSON 無法直接序列化的值（PIL 的 IFDRational、bytes 等）"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='ignore')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+def stop_on_sigterm():
+    """讓 SIGTERM（systemd、docker stop）和 Ctrl+C 一樣結束監看，輸出會正常寫完"""
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, interrupt)
 
 class PhotoMetadataCLI:
-    def __init__(self):
+    def __init__(self, blob_threshold: int = DEFAULT_BLOB_THRESHOLD):
         self.parser = self.setup_argument_parser()
+        # 超過這個大小的二進位值（MakerNote 等）以 {offset, length, sha256} 描述表示
+        self.blob_threshold = blob_threshold
+        # extract_many() 期間：(待填入座標的 GPS 區段, GPSColumns)
+        self._gps_batch = None
+        # 記錄各階段耗時與讀取量，結果加上 diagnostic_info
+        self.timings = False
+        # --profile 時的 ExtractionProfiler
+        self.profiler = None
+        # JSON 輸出使用的後端（見 json_backend）
+        self.json_backend = 'auto'
         
     def setup_argument_parser(self):
         """設定命令列參數解析器"""
@@ -40,168 +80,414 @@ class PhotoMetadataCLI:
   python photo_metadata_cli.py photo.jpg --output metadata.json
   python photo_metadata_cli.py photo.jpg --gps-only
   python photo_metadata_cli.py photo.jpg --exif-only
+
+批次模式（資料夾、萬用字元、多個檔案或檔案清單）:
+  python photo_metadata_cli.py photos/ --workers 8 --output all.json
+  python photo_metadata_cli.py "photos/**/*.jpg" --gps-only
+  python photo_metadata_cli.py --files-from list.txt --chunksize 128
+  python photo_metadata_cli.py photos/ --ndjson -o - | jq .file_path
+  python photo_metadata_cli.py photos/ --cache metadata.db --ndjson -o all.ndjson
+  python photo_metadata_cli.py photos/ --export-format parquet -o all.parquet
+  python photo_metadata_cli.py photo.jpg --raw-only --include-blobs
+  python photo_metadata_cli.py photos/ --ndjson -o all.ndjson --timings --metrics-file extract.prom
+  python photo_metadata_cli.py photos/ --ndjson -o all.ndjson --profile prof --profile-every 10 --profile-memory
+
+監看模式（只提取新增或修改的相片，Ctrl+C 結束）:
+  python photo_metadata_cli.py inbox/ --watch --ndjson -o inbox.ndjson
+  python photo_metadata_cli.py index photos.db photos/ --watch
+
+索引與搜尋（詳見 index --help、query --help）:
+  python photo_metadata_cli.py index photos.db photos/
+  python photo_metadata_cli.py query photos.db --model "iPhone 13" --iso-min 3200 --since 2024-01-01 --until 2024-06-30
+
+本機 HTTP 服務（詳見 serve --help）:
+  python photo_metadata_cli.py serve --port 8765 --workers 4
             """
         )
         
-        parser.add_argument('file_path', help='相片檔案路徑')
+        parser.add_argument('paths', nargs='*', metavar='file_path',
+                            help='相片檔案路徑；也可指定多個檔案、資料夾或萬用字元進入批次模式')
         parser.add_argument('-o', '--output', help='輸出 JSON 檔案路徑')
         parser.add_argument('--gps-only', action='store_true', help='只顯示 GPS 資訊')
         parser.add_argument('--exif-only', action='store_true', help='只顯示 EXIF 資訊')
         parser.add_argument('--basic-only', action='store_true', help='只顯示基本資訊')
         parser.add_argument('--raw-only', action='store_true', help='只顯示原始資料')
-        parser.add_argument('--no-pretty', action='store_true', help='不使用美化格式輸出')
+        parser.add_argument('--no-pretty', action='store_true', help='以精簡格式輸出 JSON（不含空白與換行）')
+        parser.add_argument('--json-backend', choices=BACKENDS, default='auto',
+                            help=f'JSON 編碼器：orjson 或標準函式庫 json，兩者輸出相同（預設 auto，目前為 {default_backend()}）')
         parser.add_argument('--map-link', action='store_true', help='顯示 Google Maps 連結')
+        parser.add_argument('--include-blobs', action='store_true',
+                            help='輸出大型二進位值（MakerNote 等）的完整內容，而不是 {offset, length, sha256} 描述')
+        parser.add_argument('--blob-threshold', type=int, default=DEFAULT_BLOB_THRESHOLD, metavar='BYTES',
+                            help=f'超過這個大小的二進位值以描述表示（預設 {DEFAULT_BLOB_THRESHOLD}）')
+        
+        # 批次模式
+        parser.add_argument('--files-from', metavar='LIST', help='從檔案清單讀取路徑（每行一個，- 代表標準輸入）')
+        parser.add_argument('-j', '--workers', type=int, help='平行處理的行程數（預設為 CPU 核心數）')
+        parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                            help=f'每個行程一次處理的檔案數（預設 {DEFAULT_CHUNKSIZE}）')
+        parser.add_argument('--ndjson', action='store_true',
+                            help='以 NDJSON 串流輸出（每張相片一行），未指定 --output 或指定 - 時寫到標準輸出')
+        parser.add_argument('--buffer-size', type=int, default=DEFAULT_BUFFER_SIZE,
+                            help=f'NDJSON 輸出緩衝區大小（預設 {DEFAULT_BUFFER_SIZE} 位元組）')
+        parser.add_argument('--export-format', choices=EXPORT_FORMATS,
+                            help='把結果寫成有型別的欄位式檔案（Parquet 或 Arrow IPC，需要 pyarrow）；'
+                                 '--output 為 .parquet/.arrow/.feather 時自動使用')
+        parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                            help=f'Parquet/Arrow 每個 record batch 的列數（預設 {DEFAULT_BATCH_ROWS}）')
+        
+        # 快取
+        parser.add_argument('--cache', metavar='DB', help='持久化快取檔案（SQLite），未變更的檔案不會重新解析')
+        parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                            help=f'快取最多保存的記錄數（預設 {DEFAULT_MAX_ENTRIES}）')
+        
+        # 效能診斷
+        parser.add_argument('--timings', action='store_true',
+                            help='記錄各階段（stat、開檔、EXIF 解碼、piexif、解析、GPS、輸出）的耗時與讀取量：'
+                                 '每筆結果加上 diagnostic_info，批次結束時印出耗時分佈')
+        parser.add_argument('--metrics-file', metavar='PATH',
+                            help='把各階段耗時的直方圖以 Prometheus 文字格式寫入此檔案（監看模式每批更新）')
+        parser.add_argument('--profile', metavar='PREFIX',
+                            help='以 cProfile 分析提取，依階段（extract、parse_exif_data、parse_gps_data、'
+                                 'parse_piexif_data、json.dump）寫出 PREFIX.pstats、PREFIX.<階段>.pstats 與摘要 '
+                                 'PREFIX.txt；分析時在單一行程中提取')
+        parser.add_argument('--profile-every', type=int, default=1, metavar='N',
+                            help='只分析每 N 個檔案中的一個（預設 1，全部分析）')
+        parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP, metavar='N',
+                            help=f'摘要中每個階段列出的函式數（預設 {DEFAULT_TOP}）')
+        parser.add_argument('--profile-memory', action='store_true',
+                            help='搭配 --profile：以 tracemalloc 記錄每個階段的記憶體配置峰值')
+        
+        # 監看模式
+        self.add_watch_arguments(parser)
         
         return parser
         
-    def extract_metadata(self, file_path: str) -> Dict[str, Any]:
-        """提取相片的所有隱藏資訊"""
-        metadata = {
-            'basic_info': {},
-            'exif_data': {},
-            'gps_data': {},
-            'raw_data': {}
-        }
+    def add_watch_arguments(self, parser):
+        """--watch 相關參數（主命令與 index 子命令共用）"""
+        parser.add_argument('--watch', action='store_true',
+                            help='持續監看資料夾，只提取新增或修改的相片（Ctrl+C 結束）')
+        parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, metavar='SECONDS',
+                            help=f'檔案最後一次寫入後等待多久才提取（預設 {DEFAULT_DEBOUNCE} 秒）')
+        parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL, metavar='SECONDS',
+                            help=f'輪詢間隔（預設 {DEFAULT_POLL_INTERVAL} 秒，只在無法使用 inotify 時）')
+        parser.add_argument('--polling', action='store_true',
+                            help='不使用 inotify，改為定期輪詢（NFS/SMB 等網路磁碟）')
+        
+    def setup_index_parser(self):
+        """index 子命令的參數解析器"""
+        parser = argparse.ArgumentParser(
+            prog='photo_metadata_cli.py index',
+            description='提取相片資訊並寫入可查詢的 SQLite 索引（只處理新增或變更的檔案）'
+        )
+        parser.add_argument('database', help='索引檔案（SQLite），不存在時自動建立')
+        parser.add_argument('paths', nargs='*', metavar='file_path', help='相片檔案、資料夾或萬用字元')
+        parser.add_argument('--files-from', metavar='LIST', help='從檔案清單讀取路徑（每行一個，- 代表標準輸入）')
+        parser.add_argument('-j', '--workers', type=int, help='平行處理的行程數（預設為 CPU 核心數）')
+        parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                            help=f'每個行程一次處理的檔案數（預設 {DEFAULT_CHUNKSIZE}）')
+        parser.add_argument('--prune', action='store_true', help='移除檔案已不存在的記錄')
+        self.add_watch_arguments(parser)
+        return parser
+        
+    def setup_serve_parser(self):
+        """serve 子命令的參數解析器"""
+        from extraction_server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_BODY
+        parser = argparse.ArgumentParser(
+            prog='photo_metadata_cli.py serve',
+            description='以本機 HTTP 服務提供提取功能（工作行程常駐，不必每次重新啟動）',
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+            epilog=f"""
+端點:
+  POST /extract        JSON {{"path": "photo.jpg", "sections": ["gps"]}}，或直接上傳相片位元組
+                       （選項放在查詢字串：?name=photo.jpg&sections=gps,exif&include_blobs=1）
+  POST /extract/batch  JSON {{"paths": ["a.jpg", "b.jpg"]}}
+  GET  /health         工作行程數與排隊狀況
+  GET  /metrics        各提取階段耗時的直方圖（Prometheus 文字格式）；請求加上 "timings": true
+                       或 ?timings=1 時每筆結果也帶有 diagnostic_info
+
+範例:
+  python photo_metadata_cli.py serve --workers 4
+  curl -s localhost:{DEFAULT_PORT}/extract -H 'Content-Type: application/json' -d '{{"path": "photo.jpg"}}'
+  curl -s localhost:{DEFAULT_PORT}/extract?name=photo.jpg --data-binary @photo.jpg -H 'Content-Type: image/jpeg'
+            """
+        )
+        parser.add_argument('--host', default=DEFAULT_HOST, help=f'監聽位址（預設 {DEFAULT_HOST}，只接受本機連線）')
+        parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'監聽埠號（預設 {DEFAULT_PORT}）')
+        parser.add_argument('-j', '--workers', type=int, help='工作行程數（預設為 CPU 核心數）')
+        parser.add_argument('--max-queue', type=int,
+                            help='排隊中的工作上限，超過時回應 503（預設為工作行程數的 4 倍）')
+        parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                            help=f'/extract/batch 每個工作一次處理的檔案數（預設 {DEFAULT_CHUNKSIZE}）')
+        parser.add_argument('--max-body', type=int, default=DEFAULT_MAX_BODY, metavar='BYTES',
+                            help=f'請求內容上限（預設 {DEFAULT_MAX_BODY} bytes）')
+        parser.add_argument('--blob-threshold', type=int, default=DEFAULT_BLOB_THRESHOLD, metavar='BYTES',
+                            help=f'超過這個大小的二進位值以描述表示（預設 {DEFAULT_BLOB_THRESHOLD}）')
+        parser.add_argument('--access-log', action='store_true', help='在標準錯誤輸出每個請求的紀錄')
+        return parser
+        
+    def setup_query_parser(self):
+        """query 子命令的參數解析器"""
+        from metadata_index import ORDER_COLUMNS
+        parser = argparse.ArgumentParser(
+            prog='photo_metadata_cli.py query',
+            description='直接從索引搜尋相片（不會開啟任何相片），所有條件以 AND 連接',
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+            epilog="""
+範例:
+  python photo_metadata_cli.py query photos.db --model "iPhone 13" --iso-min 3200
+  python photo_metadata_cli.py query photos.db --since 2024-01-01 --until 2024-01-31 --has-gps --paths
+  python photo_metadata_cli.py query photos.db --where "f_number <= 2.0 AND focal_length >= 50" --count
+  python photo_metadata_cli.py query photos.db --bbox 21.8 119.3 25.4 122.1
+  python photo_metadata_cli.py query photos.db --near 25.0330 121.5654 --radius 2000
+  python photo_metadata_cli.py query photos.db --near 25.0330 121.5654 --limit 5 --model "iPhone 13"
+            """
+        )
+        parser.add_argument('database', help='index 子命令建立的索引檔案')
+        parser.add_argument('--make', help='相機品牌（不分大小寫）')
+        parser.add_argument('--model', help='相機型號（不分大小寫）')
+        parser.add_argument('--lens', help='鏡頭型號（不分大小寫）')
+        parser.add_argument('--iso-min', type=int, help='ISO 下限（包含）')
+        parser.add_argument('--iso-max', type=int, help='ISO 上限（包含）')
+        parser.add_argument('--since', metavar='DATE', help='拍攝時間下限，YYYY-MM-DD 或 "YYYY-MM-DD HH:MM:SS"')
+        parser.add_argument('--until', metavar='DATE', help='拍攝時間上限（只有日期時包含當天）')
+        parser.add_argument('--has-gps', action='store_true', help='只列出有 GPS 座標的相片')
+        parser.add_argument('--where', metavar='SQL', help='進階條件，以 SQL 運算式表示（欄位名稱同 Parquet 輸出）')
+        parser.add_argument('--bbox', nargs=4, type=float, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                            help='座標範圍（MIN_LON 大於 MAX_LON 表示跨越 180 度經線）')
+        parser.add_argument('--near', nargs=2, type=float, metavar=('LAT', 'LON'),
+                            help='依與此點的距離排序；未指定 --radius 時列出最近的 --limit 張（預設 '
+                                 f'{DEFAULT_NEAREST}）')
+        parser.add_argument('--radius', type=float, metavar='METERS', help='搭配 --near：只列出此半徑（公尺）內的相片')
+        parser.add_argument('--order-by', choices=ORDER_COLUMNS, default='datetime_original',
+                            help='排序欄位（指定 --near 時依距離排序）')
+        parser.add_argument('--desc', action='store_true', help='由大到小排序')
+        parser.add_argument('--limit', type=int, help='最多列出的筆數')
+        output = parser.add_mutually_exclusive_group()
+        output.add_argument('--count', action='store_true', help='只顯示符合的筆數')
+        output.add_argument('--paths', action='store_true', help='只輸出檔案路徑（每行一個）')
+        output.add_argument('--ndjson', action='store_true', help='每筆結果輸出一行 JSON')
+        return parser
+        
+    @staticmethod
+    def stat_file(file_path: str) -> os.stat_result:
+        """取得檔案資訊；檔案不存在時拋出 FileNotFoundError"""
+        try:
+            return os.stat(file_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"檔案不存在: {file_path}")
+        
+    def extract_metadata(self, file_path: str, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """提取相片的隱藏資訊
+        
+        sections 指定要提取的區段（'basic'、'exif'、'gps'、'raw'），預設全部；
+        沒有指定的區段不會被解析，也不會出現在結果中。
+        """
+        sections = set(SECTION_KEYS) if sections is None else set(sections)
+        metadata = {key: {} for section, key in SECTION_KEYS.items() if section in sections}
+        # 基本資訊先以有型別的欄位記錄，最後才轉成顯示文字
+        record = PhotoRecord(file_path)
+        # 只有遇到大型二進位值時才會掃描 IFD 取得位置
+        blobs = BlobLocator(file_path, self.blob_threshold)
+        timer = StageTimer() if self.timings else NULL_TIMER
         
         try:
-            # 檢查檔案是否存在
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"檔案不存在: {file_path}")
+            # 檢查檔案是否存在並取得檔案資訊（開檔後沿用，不再 fstat）
+            stat = self.stat_file(file_path)
+            timer.lap('stat')
                 
-            # 基本檔案資訊
-            file_path_obj = Path(file_path)
-            stat = file_path_obj.stat()
+            # 單次開檔讀取 JPEG 標記鏈（APP1 EXIF 區段、SOF）
+            scan = scan_jpeg(file_path, stat)
+            timer.add_bytes(scan.bytes_read)
+            timer.lap('open')
             
-            metadata['basic_info'] = {
-                '檔案名稱': file_path_obj.name,
-                '檔案路徑': str(file_path_obj.absolute()),
-                '檔案大小': f"{stat.st_size:,} bytes ({self.format_size(stat.st_size)})",
-                '建立時間': datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                '修改時間': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                '存取時間': datetime.fromtimestamp(stat.st_atime).strftime('%Y-%m-%d %H:%M:%S')
-            }
+            # 基本檔案資訊
+            if 'basic' in sections:
+                record.set_file_stat(scan.stat)
             
-            # 使用 PIL 提取 EXIF 資料
-            with Image.open(file_path) as img:
-                # 基本圖片資訊
-                metadata['basic_info'].update({
-                    '圖片格式': img.format,
-                    '圖片模式': img.mode,
-                    '圖片尺寸': f"{img.width} x {img.height}",
-                    '圖片大小': f"{img.width * img.height:,} pixels"
-                })
+            exif_data = None
+            gps_data = None
+            if scan.usable:
+                # JPEG：圖片資訊與 EXIF 都來自同一次讀取的位元組
+                if 'basic' in sections:
+                    record.set_image('JPEG', scan.mode, scan.width, scan.height)
+                timer.lap('parse')
+                if 'exif' in sections:
+                    exif_data = scan.exif_dict()
+                elif 'gps' in sections:
+                    # 只要 GPS：經由 IFD0 的 GPS 指標直接解析 GPS IFD，不解碼 ExifIFD
+                    gps_data = scan.gps_dict()
+                timer.lap('getexif')
+                load_piexif_data = scan.piexif_dict
+            else:
+                if sections & {'basic', 'exif', 'gps'}:
+                    # 其他格式：使用 PIL 提取 EXIF 資料
+                    with timer.open_image(file_path) as img:
+                        timer.lap('open')
+                        # 基本圖片資訊
+                        if 'basic' in sections:
+                            record.set_image(img.format, img.mode, img.width, img.height)
+                        timer.lap('parse')
+                        if sections & {'exif', 'gps'} and hasattr(img, '_getexif'):
+                            exif_data = img._getexif()
+                        timer.lap('getexif')
+                load_piexif_data = lambda: load_piexif(file_path, timer.add_bytes)
                 
-                # EXIF 資料
-                if hasattr(img, '_getexif') and img._getexif():
-                    exif_data = img._getexif()
-                    metadata['exif_data'] = self.parse_exif_data(exif_data)
-                    
-                    # GPS 資料
-                    if 34853 in exif_data:  # GPSInfo tag
-                        gps_data = exif_data[34853]
-                        metadata['gps_data'] = self.parse_gps_data(gps_data)
+            # EXIF 資料
+            if exif_data:
+                if 'exif' in sections:
+                    metadata['exif_data'] = self.parse_exif_data(exif_data, blobs)
+                gps_data = exif_data.get(34853)  # GPSInfo tag
+                timer.lap('parse')
+                
+            # GPS 資料
+            if 'gps' in sections and gps_data is not None:
+                metadata['gps_data'] = self.parse_gps_data(gps_data)
+                timer.lap('gps')
                         
             # 使用 piexif 提取更詳細的 EXIF 資料
-            try:
-                exif_dict = piexif.load(file_path)
-                metadata['raw_data'] = self.parse_piexif_data(exif_dict)
-            except:
-                pass
+            if 'raw' in sections:
+                try:
+                    exif_dict = load_piexif_data()
+                    timer.lap('piexif')
+                    metadata['raw_data'] = self.parse_piexif_data(exif_dict, blobs)
+                    timer.lap('parse')
+                except:
+                    pass
                 
         except Exception as e:
             metadata['error'] = str(e)
             
+        if 'basic' in sections:
+            metadata['basic_info'] = record.basic_info(self.format_size)
+        if timer.enabled:
+            metadata['diagnostic_info'] = timer.as_dict()
         return metadata
         
-    def parse_exif_data(self, exif_data: Dict) -> Dict[str, Any]:
-        """解析 EXIF 資料"""
-        parsed_data = {}
+    def extract_record(self, file_path: str) -> PhotoRecord:
+        """提取索引與欄位式輸出用到的有型別欄位（見 photo_record.PhotoRecord）
+        
+        結果與 PhotoRecord.from_metadata(extract_metadata(file_path, ['basic', 'exif', 'gps'])) 相同，
+        但只格式化用到的 EXIF 標籤，也不產生任何顯示文字。
+        """
+        from exif_tags import format_tags, ALL_TAG_REGISTRY
+        record = PhotoRecord(file_path)
         
-        for tag_id, value in exif_data.items():
-            tag_name = TAGS.get(tag_id, f"Unknown Tag {tag_id}")
+        try:
+            scan = scan_jpeg(file_path, self.stat_file(file_path))
+            record.set_file_stat(scan.stat)
             
-            # 處理特殊格式的資料
-            if isinstance(value, bytes):
-                try:
-                    value = value.decode('utf-8', errors='ignore')
-                except:
-                    value = str(value)
-            elif isinstance(value, tuple):
-                value = str(value)
-                
-            parsed_data[tag_name] = value
+            if scan.usable:
+                record.set_image('JPEG', scan.mode, scan.width, scan.height)
+                exif_data = scan.exif_dict()
+            else:
+                from PIL import Image
+                with Image.open(file_path) as img:
+                    record.set_image(img.format, img.mode, img.width, img.height)
+                    exif_data = img._getexif() if hasattr(img, '_getexif') else None
+                    
+            if exif_data:
+                used = {tag_id: exif_data[tag_id] for tag_id in EXIF_TAG_IDS if tag_id in exif_data}
+                record.set_exif(format_tags(used, ALL_TAG_REGISTRY))
+                gps_data = exif_data.get(GPS_INFO_TAG)
+                if gps_data is not None:
+                    try:
+                        record.set_position(*gps_position(gps_data))
+                    except Exception:
+                        # 與 parse_gps_data 相同：座標計算錯誤時沒有座標，其他欄位照常保留
+                        pass
+                        
+        except Exception as e:
+            record.error = str(e)
             
-        return parsed_data
+        return record
+        
+    def extract_many(self, paths: Iterable[str], sections: Optional[Iterable[str]] = None) -> List[tuple]:
+        """提取一批檔案，回傳 [(檔案路徑, metadata)]
+        
+        每張相片只收集 GPS 的原始有理數，整批讀完後由 GPSColumns 一次換算座標與海拔，
+        結果與逐張呼叫 extract_metadata() 相同。
+        """
+        targets, columns = self._gps_batch = ([], GPSColumns())
+        try:
+            results = [(path, self.extract_metadata(path, sections)) for path in paths]
+            start = time.perf_counter()
+            for parsed_gps, position in zip(targets, columns.positions()):
+                self.add_coordinates(parsed_gps, *position)
+            if self.timings and targets:
+                # 整批換算座標的時間平均分攤到有 GPS 的相片
+                share = (time.perf_counter() - start) / len(targets)
+                converted = {id(parsed_gps) for parsed_gps in targets}
+                for _, metadata in results:
+                    if id(metadata.get('gps_data')) in converted:
+                        add_timing(metadata, 'gps', share)
+        finally:
+            self._gps_batch = None
+        return results
+        
+    def parse_exif_data(self, exif_data: Dict, blobs: Optional[BlobLocator] = None) -> Dict[str, Any]:
+        """解析 EXIF 資料（指定 blobs 時大型二進位值以描述表示）"""
+        # 標籤名稱表來自 PIL.ExifTags，第一次解析時才載入
+        from exif_tags import format_tags, format_plain, ALL_TAG_REGISTRY
+        if blobs is not None:
+            exif_data = blobs.replace_blobs(exif_data)
+        return format_tags(exif_data, ALL_TAG_REGISTRY, unknown=format_plain)
         
     def parse_gps_data(self, gps_data: Dict) -> Dict[str, Any]:
         """解析 GPS 資料"""
+        from exif_tags import GPSTAGS
         parsed_gps = {}
         
         for tag_id, value in gps_data.items():
             tag_name = GPSTAGS.get(tag_id, f"GPS Tag {tag_id}")
             
             if isinstance(value, bytes):
-                try:
-                    value = value.decode('utf-8', errors='ignore')
-                except:
-                    value = str(value)
+                value = format_bytes(value, tag_id, 'GPS')
                     
             parsed_gps[tag_name] = value
             
+        # 批次提取時座標留到整批讀完後一次換算（見 extract_many）
+        if self._gps_batch is not None:
+            self._gps_batch[0].append(parsed_gps)
+            self._gps_batch[1].append(gps_data)
+            return parsed_gps
+            
         # 嘗試計算 GPS 座標
         try:
-            lat = self.get_gps_coordinate(gps_data, 'GPSLatitude', 'GPSLatitudeRef')
-            lon = self.get_gps_coordinate(gps_data, 'GPSLongitude', 'GPSLongitudeRef')
-            
-            if lat and lon:
-                parsed_gps['緯度 (十進位)'] = lat
-                parsed_gps['經度 (十進位)'] = lon
-                parsed_gps['Google Maps 連結'] = f"https://www.google.com/maps?q={lat},{lon}"
-                
+            self.add_coordinates(parsed_gps, *gps_position(gps_data))
         except Exception as e:
             parsed_gps['座標計算錯誤'] = str(e)
             
         return parsed_gps
         
+    def add_coordinates(self, parsed_gps: Dict[str, Any], lat: Optional[float], lon: Optional[float],
+                        altitude: Optional[float]):
+        """把換算後的十進位座標與海拔加入 GPS 區段"""
+        if lat and lon:
+            parsed_gps['緯度 (十進位)'] = lat
+            parsed_gps['經度 (十進位)'] = lon
+            parsed_gps['Google Maps 連結'] = f"https://www.google.com/maps?q={lat},{lon}"
+        if altitude is not None:
+            parsed_gps['海拔 (公尺)'] = altitude
+        
     def get_gps_coordinate(self, gps_data: Dict, lat_key: str, ref_key: str) -> Optional[float]:
-        """從 GPS 資料中提取座標"""
-        try:
-            if lat_key in gps_data and ref_key in gps_data:
-                lat_data = gps_data[lat_key]
-                ref_data = gps_data[ref_key]
-                
-                if isinstance(lat_data, tuple) and len(lat_data) == 3:
-                    degrees = float(lat_data[0])
-                    minutes = float(lat_data[1])
-                    seconds = float(lat_data[2])
-                    
-                    coordinate = degrees + (minutes / 60.0) + (seconds / 3600.0)
-                    
-                    if ref_data == b'S' or ref_data == 'S':
-                        coordinate = -coordinate
-                    elif ref_data == b'W' or ref_data == 'W':
-                        coordinate = -coordinate
-                        
-                    return round(coordinate, 6)
-                    
-        except Exception as e:
-            return None
-            
-        return None
+        """從 GPS 資料中提取座標（key 可以是標籤名稱或 ID）"""
+        return gps_coordinate(gps_data, lat_key, ref_key)
         
-    def parse_piexif_data(self, exif_dict: Dict) -> Dict[str, Any]:
-        """解析 piexif 資料"""
+    def parse_piexif_data(self, exif_dict: Dict, blobs: Optional[BlobLocator] = None) -> Dict[str, Any]:
+        """解析 piexif 資料（指定 blobs 時大型二進位值以描述表示）"""
         parsed_data = {}
         
         for section, data in exif_dict.items():
-            if data:
+            # 'thumbnail' 區段是縮圖的位元組，不是標籤字典
+            if data and isinstance(data, dict):
+                if blobs is not None:
+                    data = blobs.replace_blobs(data, section)
                 parsed_data[section] = {}
                 for tag_id, value in data.items():
                     if isinstance(value, bytes):
-                        try:
-                            value = value.decode('utf-8', errors='ignore')
-                        except:
-                            value = str(value)
+                        # 依標籤的型別與字元集解碼，二進位資料以十六進位表示
+                        value = format_bytes(value, tag_id, section)
                     parsed_data[section][str(tag_id)] = value
                     
         return parsed_data
@@ -245,6 +531,20 @@ class PhotoMetadataCLI:
             print("錯誤資訊:")
             print(f"錯誤: {metadata['error']}")
             
+        if 'diagnostic_info' in metadata:
+            print()
+            self.print_diagnostic_info(metadata['diagnostic_info'])
+            
+    def print_diagnostic_info(self, diagnostic_info: Dict[str, Any]):
+        """印出各階段耗時（--timings）"""
+        print("⏱️  各階段耗時:")
+        print("-" * 40)
+        timings = diagnostic_info.get('timings_ms', {})
+        for stage, ms in timings.items():
+            print(f"{stage:<10}: {ms:.3f} ms")
+        print(f"{'合計':<8}: {sum(timings.values()):.3f} ms")
+        print(f"讀取量    : {self.format_size(diagnostic_info.get('bytes_read', 0))}")
+            
     def print_basic_info(self, basic_info: Dict[str, Any]):
         """印出基本資訊"""
         print("基本檔案資訊:")
@@ -277,40 +577,444 @@ class PhotoMetadataCLI:
         print("原始 EXIF 資料:")
         print("-" * 30)
         if raw_data:
-            print(json.dumps(raw_data, indent=2, ensure_ascii=False))
+            print(JSONSerializer(True, json_default, self.json_backend).dumps(raw_data).decode('utf-8'))
         else:
             print("沒有原始資料")
             
+    def selected_sections(self, args) -> Optional[List[str]]:
+        """依 --*-only 參數決定要提取的區段，None 表示全部"""
+        if args.gps_only:
+            return ['gps']
+        elif args.exif_only:
+            return ['exif']
+        elif args.basic_only:
+            return ['basic']
+        elif args.raw_only:
+            return ['raw']
+        return None
+        
     def save_to_json(self, metadata: Dict[str, Any], output_path: str, pretty: bool = True):
         """儲存為 JSON 檔案"""
+        serializer = JSONSerializer(pretty, json_default, self.json_backend)
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                if pretty:
-                    json.dump(metadata, f, indent=2, ensure_ascii=False)
-                else:
-                    json.dump(metadata, f, ensure_ascii=False)
+            # 批次結果逐筆編碼寫出，不必先組出整份輸出
+            with open(output_path, 'wb') as f:
+                serializer.dump(metadata, f)
             print(f"\n資料已儲存至: {output_path}")
         except Exception as e:
             print(f"\n儲存檔案時發生錯誤: {str(e)}")
             
+    def run_batch(self, args, cache: Optional[MetadataCache] = None):
+        """批次模式：以多個行程平行提取"""
+        paths = iter_image_files(args.paths, args.files_from)
+        # 只有單一檔案（例如 --ndjson）時不需要行程池
+        workers = args.workers if is_batch_request(args.paths, args.files_from) else 1
+        sections = self.selected_sections(args)
+        results = {}
+        count = 0
+        errors = 0
+        metrics = StageMetrics() if self.timings else None
+        
+        writer = None
+        log = sys.stdout
+        # Parquet/Arrow 只需要有型別的欄位：工作行程直接回傳 PhotoRecord，不格式化其他標籤，
+        # 也不必由顯示文字還原數值（快取、部分區段、展開二進位值與耗時統計仍需要完整的結果）
+        records = bool(args.export_format) and cache is None and sections is None \
+            and not args.include_blobs and not self.timings
+        if args.export_format:
+            writer = ColumnarWriter(args.output, args.export_format, args.batch_rows)
+        elif args.ndjson:
+            writer = NDJSONWriter(args.output or '-', args.buffer_size, default=json_default,
+                                  backend=self.json_backend)
+            if writer.stream is sys.stdout:
+                # 資料寫到標準輸出時，摘要改印到標準錯誤，避免混入資料流
+                log = sys.stderr
+                
+        try:
+            for file_path, metadata in iter_extract(paths, workers, args.chunksize, cache, sections,
+                                                    self.blob_threshold, self.timings, records):
+                count += 1
+                if records:
+                    if metadata.error is not None:
+                        errors += 1
+                    with self.output_phase(count - 1):
+                        writer.write(metadata)
+                    continue
+                if args.include_blobs:
+                    metadata = expand_blobs(metadata, file_path)
+                if 'error' in metadata:
+                    errors += 1
+                if metrics:
+                    self.observe_timings(metrics, metadata, args)
+                if args.output and not writer:
+                    results[file_path] = metadata
+                    continue
+                    
+                start = time.perf_counter()
+                with self.output_phase(count - 1):
+                    if writer:
+                        writer.write({'file_path': file_path, **metadata})
+                    else:
+                        print(f"\n檔案: {file_path}")
+                        self.print_metadata(metadata, args)
+                if metrics:
+                    metrics.observe('serialize', time.perf_counter() - start)
+        finally:
+            if writer:
+                writer.close()
+                
+        if args.output and not writer:
+            with self.output_phase(0):
+                self.save_to_json(results, args.output, not args.no_pretty)
+            
+        print(f"\n批次處理完成: {count} 個檔案，{errors} 個錯誤", file=log)
+        if cache:
+            print(f"快取命中: {cache.hits}，未命中: {cache.misses}", file=log)
+        if metrics:
+            self.report_timings(metrics, args, log)
+            
+    def output_phase(self, index: int):
+        """寫出第 index 筆（從 0 起算）結果的區段：--profile 時計入 json.dump 階段"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase('json.dump', self.profiler.sampled(index))
+            
+    def observe_timings(self, metrics: StageMetrics, metadata: Dict[str, Any], args):
+        """把一筆結果的耗時計入分佈；沒有指定 --timings 時從結果移除 diagnostic_info"""
+        metrics.observe_record(metadata)
+        if not args.timings:
+            metadata.pop('diagnostic_info', None)
+            
+    def report_timings(self, metrics: StageMetrics, args, log):
+        """印出耗時分佈（--timings）並寫入 --metrics-file"""
+        if args.timings:
+            print("\n各階段耗時分佈（p50/p99 由直方圖估計）:", file=log)
+            for line in metrics.summary_lines():
+                print(line, file=log)
+        if args.metrics_file:
+            metrics.write_prometheus(args.metrics_file)
+            
+    def open_watcher(self, parser, args):
+        """依 --watch 相關參數建立監看器（只能監看資料夾）"""
+        if args.files_from or not args.paths:
+            parser.error('--watch 需要指定要監看的資料夾')
+        for path in args.paths:
+            if not os.path.isdir(path):
+                parser.error(f'--watch 只能監看資料夾: {path}')
+        return create_watcher(args.paths, args.debounce, args.poll_interval, args.polling)
+        
+    def watch_workers(self, args, count: int) -> int:
+        """監看模式每批的行程數：只有幾張相片時直接在本行程處理，不必啟動行程池"""
+        return max(1, min(args.workers or os.cpu_count() or 1, -(-count // max(1, args.chunksize))))
+        
+    def run_watch(self, args, cache: Optional[MetadataCache] = None):
+        """監看模式：只提取新增或修改的相片，結果附加到輸出"""
+        watcher = self.open_watcher(self.parser, args)
+        sections = self.selected_sections(args)
+        count = 0
+        errors = 0
+        metrics = StageMetrics() if self.timings else None
+        
+        writer = None
+        log = sys.stdout
+        if args.ndjson:
+            writer = NDJSONWriter(args.output or '-', args.buffer_size, default=json_default, append=True,
+                                  backend=self.json_backend)
+            if writer.stream is sys.stdout:
+                log = sys.stderr
+        print(f"監看中（{watcher.method}）: {', '.join(args.paths)}，按 Ctrl+C 結束", file=log, flush=True)
+        
+        stop_on_sigterm()
+        try:
+            for paths in watcher.changes():
+                for file_path, metadata in iter_extract(paths, self.watch_workers(args, len(paths)),
+                                                        args.chunksize, cache, sections, self.blob_threshold,
+                                                        self.timings):
+                    count += 1
+                    if args.include_blobs:
+                        metadata = expand_blobs(metadata, file_path)
+                    if 'error' in metadata:
+                        errors += 1
+                    if metrics:
+                        self.observe_timings(metrics, metadata, args)
+                        
+                    start = time.perf_counter()
+                    with self.output_phase(count - 1):
+                        if writer:
+                            writer.write({'file_path': file_path, **metadata})
+                        else:
+                            print(f"\n檔案: {file_path}")
+                            self.print_metadata(metadata, args)
+                    if metrics:
+                        metrics.observe('serialize', time.perf_counter() - start)
+                # 每批處理完立即寫出，下游不必等緩衝區滿
+                if writer:
+                    writer.flush()
+                if cache:
+                    cache.commit()
+                if args.metrics_file:
+                    metrics.write_prometheus(args.metrics_file)
+                print(f"[{datetime.now():%H:%M:%S}] 已處理 {len(paths)} 個檔案", file=log, flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            if writer:
+                writer.close()
+                
+        print(f"\n監看結束: {count} 個檔案，{errors} 個錯誤", file=log)
+        if metrics:
+            self.report_timings(metrics, args, log)
+        
+    def run_index(self, argv: List[str]):
+        """index 子命令：提取並寫入索引，未變更的檔案只需要一次 stat()"""
+        from metadata_index import MetadataIndex
+        parser = self.setup_index_parser()
+        args = parser.parse_args(argv)
+        if not args.paths and not args.files_from:
+            parser.error('請指定相片檔案路徑')
+        # 先開始監看再建立索引，索引期間寫入的檔案也不會遺漏
+        watcher = self.open_watcher(parser, args) if args.watch else None
+        if watcher:
+            stop_on_sigterm()
+            
+        errors = 0
+        removed = 0
+        try:
+            with MetadataIndex(args.database) as index:
+                stats = {}
+                
+                def changed(paths: Iterable[str]) -> Iterable[str]:
+                    for path in paths:
+                        stat = index.file_stat(path)
+                        if stat is not None and index.is_current(path, stat):
+                            index.skipped += 1
+                            continue
+                        stats[path] = stat
+                        yield path
+                        
+                def update(paths: Iterable[str], workers: Optional[int]):
+                    nonlocal errors
+                    # 工作行程只回傳索引用到的欄位，不格式化其他標籤
+                    for file_path, record in iter_extract(changed(paths), workers, args.chunksize,
+                                                          records=True):
+                        stat = stats.pop(file_path, None)
+                        if stat is None:
+                            # 檔案在提取前就無法讀取，不寫入索引
+                            errors += 1
+                            continue
+                        if record.error is not None:
+                            errors += 1
+                        index.put(file_path, stat, record)
+                        
+                update(iter_image_files(args.paths, args.files_from), args.workers)
+                if args.prune:
+                    removed = index.remove_missing()
+                    
+                if watcher:
+                    index.commit()
+                    print(f"索引完成: {index.indexed} 個檔案已更新，{index.skipped} 個未變更，{errors} 個錯誤")
+                    print(f"監看中（{watcher.method}）: {', '.join(args.paths)}，按 Ctrl+C 結束", flush=True)
+                    try:
+                        for paths in watcher.changes():
+                            indexed = index.indexed
+                            update(paths, self.watch_workers(args, len(paths)))
+                            index.commit()
+                            print(f"[{datetime.now():%H:%M:%S}] {index.indexed - indexed} 個檔案已更新",
+                                  flush=True)
+                    except KeyboardInterrupt:
+                        pass
+        except Exception as e:
+            print(f"錯誤: {str(e)}")
+            sys.exit(1)
+        finally:
+            if watcher:
+                watcher.close()
+            
+        print(f"索引完成: {index.indexed} 個檔案已更新，{index.skipped} 個未變更，{errors} 個錯誤")
+        if args.prune:
+            print(f"已移除 {removed} 筆不存在的檔案")
+            
+    def run_query(self, argv: List[str]):
+        """query 子命令：從索引搜尋相片"""
+        from metadata_index import MetadataIndex, filter_clauses
+        parser = self.setup_query_parser()
+        args = parser.parse_args(argv)
+        if args.radius is not None and args.near is None:
+            parser.error('--radius 需要搭配 --near')
+        nearest = args.near is not None and args.radius is None
+        if nearest and args.count:
+            parser.error('--count 不能用於最近鄰搜尋，請指定 --radius')
+            
+        try:
+            clauses, params = filter_clauses(make=args.make, model=args.model, lens=args.lens,
+                                             iso_min=args.iso_min, iso_max=args.iso_max,
+                                             since=args.since, until=args.until,
+                                             has_gps=args.has_gps, where=args.where)
+            with MetadataIndex(args.database, readonly=True) as index:
+                spatial_filters = []
+                if args.bbox:
+                    spatial_filters.append(index.bbox_filter(*args.bbox))
+                if args.radius is not None:
+                    spatial_filters.append(index.radius_filter(*args.near, args.radius))
+                for spatial, spatial_params in spatial_filters:
+                    clauses += spatial
+                    params += spatial_params
+                    
+                if args.count:
+                    print(index.count(clauses, params))
+                    return
+                if nearest:
+                    rows = index.nearest(*args.near, args.limit or DEFAULT_NEAREST, clauses, params)
+                else:
+                    rows = index.query(clauses, params, order_by=None if args.near else args.order_by,
+                                       descending=args.desc, limit=args.limit, near=args.near)
+                for row in rows:
+                    if args.paths:
+                        print(row['file_path'])
+                    elif args.ndjson:
+                        print(json.dumps(row, ensure_ascii=False))
+                    else:
+                        self.print_index_row(row)
+        except Exception as e:
+            print(f"錯誤: {str(e)}")
+            sys.exit(1)
+            
+    def run_serve(self, argv: List[str]):
+        """serve 子命令：常駐的本機 HTTP 提取服務"""
+        from extraction_server import ExtractionService, ExtractionServer
+        parser = self.setup_serve_parser()
+        args = parser.parse_args(argv)
+        
+        try:
+            service = ExtractionService(args.workers, args.max_queue, args.chunksize, args.blob_threshold)
+        except Exception as e:
+            print(f"錯誤: {str(e)}")
+            sys.exit(1)
+        try:
+            server = ExtractionServer((args.host, args.port), service, args.max_body, args.access_log)
+        except OSError as e:
+            service.close()
+            print(f"錯誤: 無法監聽 {args.host}:{args.port}: {str(e)}")
+            sys.exit(1)
+            
+        print(f"服務已啟動: http://{args.host}:{server.server_address[1]}（{service.workers} 個工作行程），"
+              f"按 Ctrl+C 結束", flush=True)
+        stop_on_sigterm()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.close()
+        print("服務已停止")
+        
+    def print_index_row(self, row: Dict[str, Any]):
+        """以一行文字印出一筆搜尋結果"""
+        camera = ' '.join(value for value in (row['make'], row['model']) if value)
+        iso = f"ISO {row['iso']}" if row['iso'] is not None else ''
+        aperture = f"f/{row['f_number']:g}" if row['f_number'] is not None else ''
+        distance = f"{row['distance_m']:>10.0f} m  " if row.get('distance_m') is not None else ''
+        print(f"{distance}{row['datetime_original'] or '-':<19}  {camera[:28]:<28}  {iso:<9} {aperture:<6}  "
+              f"{row['file_path']}")
+        
     def run(self):
         """執行程式"""
-        args = self.parser.parse_args()
+        argv = sys.argv[1:]
+        # 第一個參數是子命令（且不是同名的相片檔案）
+        if argv and argv[0] in ('index', 'query', 'serve') and not os.path.exists(argv[0]):
+            if argv[0] == 'index':
+                self.run_index(argv[1:])
+            elif argv[0] == 'query':
+                self.run_query(argv[1:])
+            else:
+                self.run_serve(argv[1:])
+            return
+            
+        args = self.parser.parse_args(argv)
+        if not args.paths and not args.files_from:
+            self.parser.error('請指定相片檔案路徑')
+        self.blob_threshold = args.blob_threshold
+        self.timings = args.timings or bool(args.metrics_file)
+        if args.json_backend == 'orjson' and not HAS_ORJSON:
+            self.parser.error('--json-backend orjson 需要安裝 orjson：pip install orjson')
+        self.json_backend = args.json_backend
+        if args.output and not args.export_format and not args.ndjson:
+            args.export_format = format_for_path(args.output)
+        if args.export_format and (not args.output or args.output == '-'):
+            self.parser.error('--export-format 需要以 --output 指定輸出檔案')
+        if args.watch and args.export_format:
+            self.parser.error('Parquet/Arrow 檔案無法附加寫入，--watch 請改用 --ndjson')
+        if args.watch and args.output and not args.ndjson:
+            self.parser.error('--watch 的結果以 NDJSON 附加到輸出檔案，請加上 --ndjson')
         
+        if args.profile:
+            # cProfile 只能分析所在的行程，提取改在主行程中進行
+            args.workers = 1
+            self.profiler = ExtractionProfiler(args.profile_every, args.profile_memory)
+            # 以腳本執行時本模組是 __main__，batch_extractor 使用的是另外匯入的 photo_metadata_cli
+            import photo_metadata_cli
+            for cls in {PhotoMetadataCLI, photo_metadata_cli.PhotoMetadataCLI}:
+                self.profiler.attach(cls)
+        
+        cache = None
         try:
-            # 提取資訊
-            metadata = self.extract_metadata(args.file_path)
+            if args.cache:
+                # 門檻不同時記錄的內容也不同，快取依門檻區分
+                cache = MetadataCache(args.cache, args.cache_max_entries, default=json_default,
+                                      options={'blob_threshold': args.blob_threshold})
+                
+            if args.watch:
+                self.run_watch(args, cache)
+                return
+            if args.ndjson or args.export_format or is_batch_request(args.paths, args.files_from):
+                self.run_batch(args, cache)
+                return
+                
+            # 提取資訊（只解析需要顯示的區段）
+            sections = self.selected_sections(args)
+            extract = lambda path: self.extract_metadata(path, sections)
+            if cache:
+                metadata = cache.get_or_extract(args.paths[0], extract, sections)
+            else:
+                metadata = extract(args.paths[0])
+            if args.include_blobs:
+                metadata = expand_blobs(metadata, args.paths[0])
+            metrics = StageMetrics() if self.timings else None
+            if metrics:
+                self.observe_timings(metrics, metadata, args)
             
             # 顯示資訊
-            self.print_metadata(metadata, args)
-            
-            # 如果指定了輸出檔案，儲存為 JSON
-            if args.output:
-                self.save_to_json(metadata, args.output, not args.no_pretty)
+            start = time.perf_counter()
+            with self.output_phase(0):
+                self.print_metadata(metadata, args)
+                
+                # 如果指定了輸出檔案，儲存為 JSON
+                if args.output:
+                    self.save_to_json(metadata, args.output, not args.no_pretty)
+            if metrics:
+                metrics.observe('serialize', time.perf_counter() - start)
+                if args.metrics_file:
+                    metrics.write_prometheus(args.metrics_file)
                 
         except Exception as e:
             print(f"錯誤: {str(e)}")
             sys.exit(1)
+        finally:
+            if cache:
+                cache.close()
+            if self.profiler:
+                self.write_profile(args)
+                
+    def write_profile(self, args):
+        """寫出效能分析結果，摘要印到標準錯誤（標準輸出可能是資料流）"""
+        self.profiler.detach()
+        written = self.profiler.write(args.profile, args.profile_top)
+        print("\n效能分析:", file=sys.stderr)
+        for line in self.profiler.summary_lines():
+            print(line, file=sys.stderr)
+        print(f"已寫入: {', '.join(written)}", file=sys.stderr)
 
 def main():
     """主程式"""
@@ -13,24 +13,43 @@ Photo Metadata Extractor
 
 import os
 import sys
-import json
 from datetime import datetime
 from pathlib import Path
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
-from PIL import Image, ImageTk
-try:
-    from PIL.ExifTags import TAGS, GPSTAGS
-except ImportError:
-    # 如果無法匯入 ExifTags，使用基本字典
-    TAGS = {}
-    GPSTAGS = {}
-import piexif
-import webbrowser
 from typing import Dict, Any, Optional, List
 
+from exif_segment_reader import scan_jpeg, load_piexif
+from photo_record import PhotoRecord
+from exif_tags import format_tags, IMPORTANT_TAG_REGISTRY, GPSTAGS
+from exif_text import format_bytes
+from exif_blobs import BlobLocator, expand_blobs, count_blobs, DEFAULT_BLOB_THRESHOLD
+from gps_coordinates import gps_coordinate
+from background_tasks import BackgroundRunner, CancelToken, TaskCancelled, check_cancelled
+from preview_pipeline import PreviewPipeline, Preview, SOURCE_NAMES
+from stage_timings import StageTimer
+from json_backend import JSONSerializer
+
+# 圖形介面的模組在建立視窗時才匯入（見 import_gui）：只呼叫 get_all_metadata 等提取方法時
+# 不需要 tkinter，也能在沒有顯示環境的機器上使用
+tk = ttk = filedialog = messagebox = scrolledtext = ImageTk = webbrowser = FolderBrowser = None
+
+
+def import_gui():
+    """匯入 tkinter、ImageTk、webbrowser 與資料夾瀏覽器"""
+    global tk, ttk, filedialog, messagebox, scrolledtext, ImageTk, webbrowser, FolderBrowser
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox, scrolledtext
+    from PIL import ImageTk
+    import webbrowser
+    from folder_browser import FolderBrowser
+
 class PhotoMetadataExtractor:
+    # 超過這個大小的二進位值（MakerNote 等）在原始資料中以 {offset, length, sha256} 描述表示
+    blob_threshold = DEFAULT_BLOB_THRESHOLD
+    # 原始資料分頁與儲存的 JSON（有安裝 orjson 時以 orjson 編碼，輸出相同）
+    json_serializer = JSONSerializer(pretty=True)
+    
     def __init__(self):
+        import_gui()
         self.root = tk.Tk()
         self.root.title("相片抓包器 - Photo Metadata Extractor")
         self.root.geometry("1200x800")
@@ -42,6 +61,19 @@ class PhotoMetadataExtractor:
         
         self.setup_ui()
         
+        # 提取與預覽在背景執行緒進行，視窗不會在處理大檔案時凍結
+        self.runner = BackgroundRunner(self.root, on_busy_changed=self.set_busy)
+        self.task_tokens: Dict[str, CancelToken] = {}
+        
+        # 預覽依成本嘗試內嵌縮圖、draft 縮小解碼、完整解碼，結果放在 LRU 快取
+        self.preview_pipeline = PreviewPipeline()
+        self.current_preview: Optional[Preview] = None
+        
+        # 資料夾模式：清單分批顯示，只在背景預取可見列的摘要
+        self.folder_browser = FolderBrowser(self.folder_frame, self.runner, on_select=self.select_file)
+        self.folder_browser.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
     def setup_ui(self):
         """設定使用者介面"""
         # 主框架
@@ -77,7 +109,18 @@ class PhotoMetadataExtractor:
         browse_btn.grid(row=0, column=1, padx=(0, 10))
         
         extract_btn = ttk.Button(file_frame, text="提取資訊", command=self.extract_metadata, style='Cyber.TButton')
-        extract_btn.grid(row=0, column=2)
+        extract_btn.grid(row=0, column=2, padx=(0, 10))
+        
+        folder_btn = ttk.Button(file_frame, text="瀏覽資料夾", command=self.browse_folder, style='Cyber.TButton')
+        folder_btn.grid(row=0, column=3)
+        
+        # 處理中指示
+        self.status_var = tk.StringVar()
+        status_label = ttk.Label(file_frame, textvariable=self.status_var, style='Cyber.TLabel', font=('Consolas', 10))
+        status_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        
+        self.progress = ttk.Progressbar(file_frame, mode='indeterminate', length=200)
+        self.progress.grid(row=1, column=1, columnspan=3, sticky=(tk.W, tk.E), pady=(5, 0))
         
         # 預覽區域
         preview_frame = ttk.LabelFrame(main_frame, text="相片預覽", padding="10", style='Cyber.TLabelframe')
@@ -129,9 +172,13 @@ class PhotoMetadataExtractor:
         self.diagnostic_text = scrolledtext.ScrolledText(self.diagnostic_frame, width=60, height=20, bg=cyber_bg, fg=cyber_fg, insertbackground=cyber_fg, font=('Consolas', 11))
         self.diagnostic_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # 資料夾清單區域（FolderBrowser 在建立背景工作執行器後放入）
+        self.folder_frame = ttk.LabelFrame(main_frame, text="資料夾", padding="10", style='Cyber.TLabelframe')
+        self.folder_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
+        
         # 按鈕區域
         button_frame = ttk.Frame(main_frame, style='Cyber.TFrame')
-        button_frame.grid(row=3, column=0, columnspan=3, pady=(20, 0))
+        button_frame.grid(row=4, column=0, columnspan=3, pady=(20, 0))
         
         save_btn = ttk.Button(button_frame, text="儲存為 JSON", command=self.save_to_json, style='Cyber.TButton')
         save_btn.grid(row=0, column=0, padx=(0, 10))
@@ -139,8 +186,11 @@ class PhotoMetadataExtractor:
         map_btn = ttk.Button(button_frame, text="在地圖中查看", command=self.open_in_map, style='Cyber.TButton')
         map_btn.grid(row=0, column=1, padx=(0, 10))
         
+        blobs_btn = ttk.Button(button_frame, text="展開二進位資料", command=self.expand_blobs, style='Cyber.TButton')
+        blobs_btn.grid(row=0, column=2, padx=(0, 10))
+        
         clear_btn = ttk.Button(button_frame, text="清除", command=self.clear_all, style='Cyber.TButton')
-        clear_btn.grid(row=0, column=2)
+        clear_btn.grid(row=0, column=3)
         
         # 設定網格權重
         self.root.columnconfigure(0, weight=1)
@@ -148,6 +198,9 @@ class PhotoMetadataExtractor:
         main_frame.columnconfigure(1, weight=1)
         main_frame.columnconfigure(2, weight=1)
         main_frame.rowconfigure(2, weight=1)
+        main_frame.rowconfigure(3, weight=1)
+        self.folder_frame.columnconfigure(0, weight=1)
+        self.folder_frame.rowconfigure(0, weight=1)
         info_frame.columnconfigure(0, weight=1)
         info_frame.rowconfigure(0, weight=1)
         self.exif_frame.columnconfigure(0, weight=1)
@@ -180,51 +233,111 @@ class PhotoMetadataExtractor:
         )
         
         if filename:
-            self.file_path_var.set(filename)
-            self.current_file_path = filename
-            self.load_preview()
+            self.select_file(filename, extract=False)
             
-    def load_preview(self):
-        """載入相片預覽"""
-        try:
-            # 載入圖片
-            image = Image.open(self.current_file_path)
+    def select_file(self, filename: str, extract: bool = True):
+        """切換目前的相片（資料夾清單選擇時直接提取）"""
+        # 選擇新檔案時中止舊檔案還在進行的工作，舊的結果也不再保留
+        self.cancel_tasks()
+        self.current_metadata = {}
+        self.clear_text_widgets()
+        self.file_path_var.set(filename)
+        self.current_file_path = filename
+        self.load_preview()
+        if extract:
+            self.extract_metadata()
             
-            # 調整大小以適應預覽區域
-            max_size = (300, 300)
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    def browse_folder(self):
+        """瀏覽並開啟資料夾，在清單中列出其中的相片"""
+        folder = filedialog.askdirectory(title="選擇相片資料夾")
+        if folder:
+            self.folder_browser.open_folder(folder)
             
-            # 轉換為 Tkinter 可用的格式
-            photo = ImageTk.PhotoImage(image)
+    def start_task(self, kind: str, func, *args, on_done, on_error=None):
+        """在背景執行工作，同一類工作只保留最新的一個
+        
+        func 的最後一個參數是取消權杖，on_done / on_error 在主執行緒執行。
+        """
+        self.cancel_tasks(kind)
+        token = CancelToken()
+        self.task_tokens[kind] = token
+        self.runner.submit(func, *args, token, token=token, on_done=on_done, on_error=on_error)
+        
+    def cancel_tasks(self, *kinds: str):
+        """取消指定類型（預設全部）的背景工作"""
+        for kind in kinds or list(self.task_tokens):
+            token = self.task_tokens.pop(kind, None)
+            if token is not None:
+                self.runner.cancel(token)
+                
+    def set_busy(self, busy: bool):
+        """顯示或隱藏處理中指示"""
+        if busy:
+            self.status_var.set("處理中...")
+            self.progress.start(10)
+        else:
+            self.status_var.set("")
+            self.progress.stop()
             
-            # 更新預覽標籤
-            self.preview_label.configure(image=photo, text="")
-            self.preview_label.image = photo  # 保持參考
+    def load_preview(self):
+        """載入相片預覽：快取命中立即顯示，否則在背景產生"""
+        self.current_preview = None
+        preview = self.preview_pipeline.cached(self.current_file_path)
+        if preview is not None:
+            self.show_preview(preview)
+            return
             
-        except Exception as e:
-            self.preview_label.configure(text=f"無法載入預覽: {str(e)}")
+        self.preview_label.configure(image="", text="載入預覽中...")
+        self.preview_label.image = None
+        # 預覽在工作執行緒產生，PhotoImage 必須在主執行緒建立
+        self.start_task('preview', self.preview_pipeline.render, self.current_file_path,
+                        on_done=self.show_preview, on_error=self.show_preview_error)
+        
+    def show_preview(self, preview: Preview):
+        """主執行緒：顯示預覽"""
+        self.current_preview = preview
+        
+        # 轉換為 Tkinter 可用的格式
+        photo = ImageTk.PhotoImage(preview.image)
+        
+        # 更新預覽標籤
+        self.preview_label.configure(image=photo, text="")
+        self.preview_label.image = photo  # 保持參考
+        
+        # 已經顯示提取結果時，補上預覽的診斷資訊
+        if self.current_metadata:
+            self.display_diagnostic_info()
+        
+    def show_preview_error(self, error: BaseException):
+        self.preview_label.configure(text=f"無法載入預覽: {str(error)}")
             
     def extract_metadata(self):
-        """提取相片的隱藏資訊"""
+        """在背景提取相片的隱藏資訊"""
         if not self.current_file_path:
             messagebox.showwarning("警告", "請先選擇相片檔案")
             return
             
-        try:
-            # 清空之前的資料
-            self.clear_text_widgets()
-            
-            # 提取所有資訊
-            self.current_metadata = self.get_all_metadata(self.current_file_path)
-            
-            # 顯示資訊
-            self.display_metadata()
-            
-        except Exception as e:
-            messagebox.showerror("錯誤", f"提取資訊時發生錯誤: {str(e)}")
+        # 清空之前的資料
+        self.clear_text_widgets()
+        self.current_metadata = {}
+        
+        # 提取所有資訊
+        self.start_task('extract', self.get_all_metadata, self.current_file_path,
+                        on_done=self.show_metadata, on_error=self.show_extract_error)
+        
+    def show_metadata(self, metadata: Dict[str, Any]):
+        """主執行緒：顯示提取結果"""
+        self.current_metadata = metadata
+        self.display_metadata()
+        
+    def show_extract_error(self, error: BaseException):
+        messagebox.showerror("錯誤", f"提取資訊時發生錯誤: {str(error)}")
             
-    def get_all_metadata(self, file_path: str) -> Dict[str, Any]:
-        """獲取相片的所有隱藏資訊"""
+    def get_all_metadata(self, file_path: str, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """獲取相片的所有隱藏資訊
+        
+        指定 cancel_token 時在各階段之間檢查，已取消就拋出 TaskCancelled。
+        """
         metadata = {
             'basic_info': {},
             'exif_data': {},
@@ -233,64 +346,84 @@ class PhotoMetadataExtractor:
             'diagnostic_info': {}
         }
         
+        # 基本資訊先以有型別的欄位記錄，最後才轉成顯示文字
+        record = PhotoRecord(file_path)
+        # 只有遇到大型二進位值時才會掃描 IFD 取得位置
+        blobs = BlobLocator(file_path, self.blob_threshold)
+        timer = StageTimer()
+        
         try:
-            # 基本檔案資訊
-            file_path_obj = Path(file_path)
-            stat = file_path_obj.stat()
+            stat = os.stat(file_path)
+            timer.lap('stat')
+            
+            # 單次開檔讀取 JPEG 標記鏈（檔案頭部、APP1 EXIF 區段、SOF）
+            scan = scan_jpeg(file_path, stat)
+            timer.add_bytes(scan.bytes_read)
+            timer.lap('open')
+            check_cancelled(cancel_token)
             
-            metadata['basic_info'] = {
-                '檔案名稱': file_path_obj.name,
-                '檔案路徑': str(file_path_obj.absolute()),
-                '檔案大小': f"{stat.st_size:,} bytes ({self.format_size(stat.st_size)})",
-                '建立時間': datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                '修改時間': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                '存取時間': datetime.fromtimestamp(stat.st_atime).strftime('%Y-%m-%d %H:%M:%S')
-            }
+            # 基本檔案資訊
+            record.set_file_stat(scan.stat)
             
             # 診斷資訊
             diagnostic_info = {}
             
-            # 使用 PIL 提取 EXIF 資料
-            with Image.open(file_path) as img:
-                # 基本圖片資訊
-                metadata['basic_info'].update({
-                    '圖片格式': img.format,
-                    '圖片模式': img.mode,
-                    '圖片尺寸': f"{img.width} x {img.height}",
-                    '圖片大小': f"{img.width * img.height:,} pixels"
-                })
+            if scan.usable:
+                # JPEG：圖片資訊與 EXIF 都來自同一次讀取的位元組
+                record.set_image('JPEG', scan.mode, scan.width, scan.height)
+                timer.lap('parse')
+                has_exif_support = True
+                exif_data = scan.exif_dict()
+                timer.lap('getexif')
+                load_piexif_data = scan.piexif_dict
+            else:
+                # 其他格式：使用 PIL 提取 EXIF 資料
+                with timer.open_image(file_path) as img:
+                    timer.lap('open')
+                    # 基本圖片資訊
+                    record.set_image(img.format, img.mode, img.width, img.height)
+                    timer.lap('parse')
+                    has_exif_support = hasattr(img, '_getexif')
+                    exif_data = img._getexif() if has_exif_support else None
+                    timer.lap('getexif')
+                load_piexif_data = lambda: load_piexif(file_path, timer.add_bytes)
                 
-                # 檢查 EXIF 支援
-                diagnostic_info['PIL_has_exif_support'] = hasattr(img, '_getexif')
+            # 檢查 EXIF 支援
+            diagnostic_info['PIL_has_exif_support'] = has_exif_support
+            
+            # EXIF 資料
+            if has_exif_support:
+                diagnostic_info['exif_data_found'] = exif_data is not None
+                diagnostic_info['exif_tags_count'] = len(exif_data) if exif_data else 0
                 
-                # EXIF 資料
-                if hasattr(img, '_getexif'):
-                    exif_data = img._getexif()
-                    diagnostic_info['exif_data_found'] = exif_data is not None
-                    diagnostic_info['exif_tags_count'] = len(exif_data) if exif_data else 0
+                if exif_data:
+                    metadata['exif_data'] = self.parse_exif_data(exif_data)
+                    timer.lap('parse')
                     
-                    if exif_data:
-                        metadata['exif_data'] = self.parse_exif_data(exif_data)
-                        
-                        # GPS 資料
-                        if 34853 in exif_data:  # GPSInfo tag
-                            gps_data = exif_data[34853]
-                            metadata['gps_data'] = self.parse_gps_data(gps_data)
-                            diagnostic_info['gps_data_found'] = True
-                        else:
-                            diagnostic_info['gps_data_found'] = False
+                    # GPS 資料
+                    if 34853 in exif_data:  # GPSInfo tag
+                        gps_data = exif_data[34853]
+                        metadata['gps_data'] = self.parse_gps_data(gps_data)
+                        timer.lap('gps')
+                        diagnostic_info['gps_data_found'] = True
                     else:
                         diagnostic_info['gps_data_found'] = False
                 else:
-                    diagnostic_info['exif_data_found'] = False
-                    diagnostic_info['exif_tags_count'] = 0
                     diagnostic_info['gps_data_found'] = False
+            else:
+                diagnostic_info['exif_data_found'] = False
+                diagnostic_info['exif_tags_count'] = 0
+                diagnostic_info['gps_data_found'] = False
+                
+            check_cancelled(cancel_token)
                         
             # 使用 piexif 提取更詳細的 EXIF 資料
             try:
-                exif_dict = piexif.load(file_path)
+                exif_dict = load_piexif_data()
+                timer.lap('piexif')
                 if exif_dict and isinstance(exif_dict, dict):
-                    metadata['raw_data'] = self.parse_piexif_data(exif_dict)
+                    metadata['raw_data'] = self.parse_piexif_data(exif_dict, blobs)
+                    timer.lap('parse')
                     diagnostic_info['piexif_success'] = True
                     diagnostic_info['piexif_sections'] = list(exif_dict.keys()) if exif_dict else []
                     
@@ -299,6 +432,7 @@ class PhotoMetadataExtractor:
                         gps_data = exif_dict['GPS']
                         if not metadata.get('gps_data'):  # 如果 PIL 沒有找到 GPS
                             metadata['gps_data'] = self.parse_piexif_gps_data(gps_data)
+                            timer.lap('gps')
                             diagnostic_info['gps_data_found'] = True
                             diagnostic_info['gps_source'] = 'piexif'
                 else:
@@ -309,201 +443,31 @@ class PhotoMetadataExtractor:
                 diagnostic_info['piexif_success'] = False
                 diagnostic_info['piexif_error'] = str(e)
                 
-            # 嘗試其他方法提取資料
-            try:
-                # 檢查檔案頭部是否有 EXIF 標記
-                with open(file_path, 'rb') as f:
-                    header = f.read(20)
-                    diagnostic_info['file_header'] = header.hex()[:40]
-                    
-                    # 檢查 JPEG EXIF 標記
-                    if b'\xff\xe1' in header:
-                        diagnostic_info['jpeg_exif_marker'] = True
-                    else:
-                        diagnostic_info['jpeg_exif_marker'] = False
-            except Exception as e:
-                diagnostic_info['header_check_error'] = str(e)
+            # 檔案頭部（沿用掃描時讀到的頭部）
+            diagnostic_info['file_header'] = scan.header.hex()[:40]
+            
+            # 檢查 JPEG EXIF 標記（掃描整條標記鏈，不只檔案開頭的 20 bytes）
+            diagnostic_info['jpeg_exif_marker'] = scan.exif_segment is not None
+            
+            # 區段與 IFD 位置
+            diagnostic_info.update(scan.diagnostics)
+            
+            # 各階段耗時與讀取量
+            diagnostic_info.update(timer.as_dict())
                 
             metadata['diagnostic_info'] = diagnostic_info
                 
+        except TaskCancelled:
+            raise
         except Exception as e:
             metadata['error'] = str(e)
             
+        metadata['basic_info'] = record.basic_info(self.format_size)
         return metadata
         
     def parse_exif_data(self, exif_data: Dict) -> Dict[str, Any]:
-        """解析 EXIF 資料"""
-        parsed_data = {}
-        
-        # 重要且易讀的標籤對應
-        important_tags = {
-            271: '相機品牌',
-            272: '相機型號', 
-            306: '拍攝時間',
-            36867: '原始拍攝時間',
-            37377: '光圈值',
-            37387: '快門速度',
-            37380: 'ISO 感光度',
-            37396: '焦距',
-            37395: '閃光燈',
-            41987: '白平衡',
-            41990: '場景模式',
-            41992: '對比度',
-            41993: '飽和度',
-            41994: '銳利度',
-            42035: '鏡頭品牌',
-            42036: '鏡頭型號',
-            256: '圖片寬度',
-            257: '圖片高度',
-            274: '方向',
-            296: '解析度單位',
-            282: 'X 解析度',
-            283: 'Y 解析度',
-            531: 'YCbCr 定位',
-            34665: 'EXIF 偏移',
-            36864: 'EXIF 版本',
-            40960: 'FlashPix 版本',
-            40961: '色彩空間',
-            40962: '像素 X 維度',
-            40963: '像素 Y 維度',
-            40965: '互通性 IFD 指標',
-            36880: '時區偏移',
-            36881: '原始時區偏移',
-            36868: '數位化時間',
-            37378: '曝光程式',
-            37379: '光譜敏感度',
-            37381: '光電轉換函數',
-            37382: 'EXIF 版本',
-            37383: '原始日期時間',
-            37384: '數位化日期時間',
-            37385: '元件配置',
-            37386: '壓縮位元數',
-            37388: '光圈值',
-            37389: '亮度值',
-            37390: '曝光偏差值',
-            37391: '最大光圈值',
-            37392: '主體距離',
-            37393: '測光模式',
-            37394: '光源',
-            37398: '製造商註記',
-            37399: '使用者註記',
-            37400: '子秒時間',
-            37401: '原始子秒時間',
-            37402: '數位化子秒時間',
-            37500: 'FlashPix 版本',
-            37510: '色彩空間',
-            37520: '像素 X 維度',
-            37521: '像素 Y 維度',
-            37522: '相關音訊檔案',
-            41483: '閃光燈',
-            41484: '閃光燈返回光',
-            41485: '閃光燈模式',
-            41486: '閃光燈功能',
-            41487: '閃光燈紅眼模式',
-            41488: '閃光燈曝光補償',
-            41492: '閃光燈來源',
-            41493: '閃光燈狀態',
-            41494: '閃光燈模式',
-            41985: '自訂渲染',
-            41986: '曝光模式',
-            41988: '數位變焦比例',
-            41989: '35mm 膠片焦距',
-            41991: '增益控制',
-            41995: '裝置設定描述',
-            41996: '主體距離範圍',
-            42016: '影像唯一 ID',
-            42032: '相機擁有者名稱',
-            42033: '機身序號',
-            42034: '鏡頭規格',
-            42035: '鏡頭品牌',
-            42036: '鏡頭型號',
-            42037: '鏡頭序號'
-        }
-        
-        for tag_id, value in exif_data.items():
-            if tag_id in important_tags:
-                tag_name = important_tags[tag_id]
-                
-                # 格式化數值
-                if tag_id == 37377:  # 光圈值
-                    if isinstance(value, tuple) and len(value) == 2:
-                        value = f"f/{value[0]/value[1]:.1f}"
-                    else:
-                        value = f"f/{value/100}" if value > 0 else str(value)
-                elif tag_id == 37387:  # 快門速度
-                    if isinstance(value, tuple) and len(value) == 2:
-                        value = f"1/{int(value[0]/value[1])}s"
-                    else:
-                        value = f"1/{int(2**value)}s" if value > 0 else str(value)
-                elif tag_id == 37396:  # 焦距
-                    value = f"{value}mm"
-                elif tag_id == 37380:  # ISO
-                    if isinstance(value, tuple) and len(value) == 2:
-                        value = f"ISO {value[0]}"
-                    else:
-                        value = f"ISO {value}"
-                elif tag_id == 37395:  # 閃光燈
-                    flash_values = {
-                        0: "未使用", 1: "使用", 9: "強制使用", 16: "關閉",
-                        24: "未使用，自動模式", 25: "使用，自動模式",
-                        32: "未使用，無閃光燈功能", 65: "使用，紅眼減少",
-                        73: "強制使用，紅眼減少", 89: "使用，自動模式，紅眼減少"
-                    }
-                    value = flash_values.get(value, str(value))
-                elif tag_id == 41987:  # 白平衡
-                    wb_values = {0: "自動", 1: "手動"}
-                    value = wb_values.get(value, str(value))
-                elif tag_id == 41990:  # 場景模式
-                    scene_values = {0: "標準", 1: "風景", 2: "人像", 3: "夜景"}
-                    value = scene_values.get(value, str(value))
-                elif tag_id == 41992:  # 對比度
-                    contrast_values = {0: "正常", 1: "柔和", 2: "強烈"}
-                    value = contrast_values.get(value, str(value))
-                elif tag_id == 41993:  # 飽和度
-                    saturation_values = {0: "正常", 1: "低飽和度", 2: "高飽和度"}
-                    value = saturation_values.get(value, str(value))
-                elif tag_id == 41994:  # 銳利度
-                    sharpness_values = {0: "正常", 1: "柔和", 2: "強烈"}
-                    value = sharpness_values.get(value, str(value))
-                elif tag_id == 274:  # 方向
-                    orientation_values = {
-                        1: "正常", 2: "水平翻轉", 3: "旋轉180度",
-                        4: "垂直翻轉", 5: "水平翻轉+順時針90度",
-                        6: "順時針90度", 7: "水平翻轉+逆時針90度",
-                        8: "逆時針90度"
-                    }
-                    value = orientation_values.get(value, str(value))
-                elif tag_id == 296:  # 解析度單位
-                    unit_values = {1: "無", 2: "英寸", 3: "公分"}
-                    value = unit_values.get(value, str(value))
-                elif isinstance(value, bytes):
-                    try:
-                        # 嘗試不同的編碼
-                        for encoding in ['utf-8', 'latin-1', 'cp1252', 'gbk']:
-                            try:
-                                decoded_value = value.decode(encoding)
-                                if decoded_value and decoded_value.isprintable():
-                                    value = decoded_value
-                                    break
-                            except:
-                                continue
-                        else:
-                            # 如果所有編碼都失敗，跳過這個標籤
-                            continue
-                    except:
-                        continue
-                elif isinstance(value, tuple):
-                    # 處理座標等特殊格式
-                    if len(value) == 3 and all(isinstance(x, (int, float)) for x in value):
-                        value = f"({value[0]}, {value[1]}, {value[2]})"
-                    elif len(value) == 2 and all(isinstance(x, (int, float)) for x in value):
-                        value = f"({value[0]}, {value[1]})"
-                    else:
-                        value = str(value)
-                
-                parsed_data[tag_name] = value
-                
-        return parsed_data
+        """解析 EXIF 資料（只保留重要且易讀的標籤）"""
+        return format_tags(exif_data, IMPORTANT_TAG_REGISTRY)
         
     def parse_gps_data(self, gps_data: Dict) -> Dict[str, Any]:
         """解析 GPS 資料"""
@@ -511,10 +475,7 @@ class PhotoMetadataExtractor:
         for tag_id, value in gps_data.items():
             tag_name = GPSTAGS.get(tag_id, f"GPS Tag {tag_id}")
             if isinstance(value, bytes):
-                try:
-                    value = value.decode('utf-8', errors='ignore')
-                except:
-                    value = str(value)
+                value = format_bytes(value, tag_id, 'GPS')
             parsed_gps[tag_name] = value
 
         # 嘗試計算 GPS 座標
@@ -537,53 +498,15 @@ class PhotoMetadataExtractor:
         return parsed_gps
         
     def get_gps_coordinate(self, gps_data: Dict, lat_key: str, ref_key: str) -> Optional[float]:
+        """從 PIL 的 GPS 資料中提取座標（支援字串與數字 key，沒有參考值時視為北緯/東經）"""
         try:
-            # 支援字串與數字 key
-            lat_data = gps_data.get(lat_key)
-            if lat_data is None:
-                # 嘗試數字 key
-                key_map = {
-                    'GPSLatitude': 2,
-                    'GPSLatitudeRef': 1,
-                    'GPSLongitude': 4,
-                    'GPSLongitudeRef': 3
-                }
-                lat_data = gps_data.get(key_map.get(lat_key))
-                ref_data = gps_data.get(ref_key) or gps_data.get(key_map.get(ref_key))
-            else:
-                ref_data = gps_data.get(ref_key)
-            if lat_data is None:
-                return None
-            if ref_data in [None, '', b'']:
-                ref_data = 'N' if 'Lat' in lat_key else 'E'
-            # 處理 tuple/list of float 或 rational
-            if isinstance(lat_data, (tuple, list)) and len(lat_data) == 3:
-                # rational 格式
-                if all(isinstance(v, (tuple, list)) and len(v) == 2 for v in lat_data):
-                    def rational_to_float(x):
-                        return float(x[0]) / float(x[1]) if x[1] != 0 else 0
-                    degrees = rational_to_float(lat_data[0])
-                    minutes = rational_to_float(lat_data[1])
-                    seconds = rational_to_float(lat_data[2])
-                else:
-                    degrees = float(lat_data[0])
-                    minutes = float(lat_data[1])
-                    seconds = float(lat_data[2])
-                coordinate = degrees + (minutes / 60.0) + (seconds / 3600.0)
-                if isinstance(ref_data, bytes):
-                    ref_data = ref_data.decode('utf-8', errors='ignore')
-                if ref_data in ['S', 'W']:
-                    coordinate = -coordinate
-                return round(coordinate, 8)
-            elif isinstance(lat_data, float):
-                return lat_data
+            return gps_coordinate(gps_data, lat_key, ref_key, ndigits=8)
         except Exception as e:
             print(f"GPS 解析錯誤: {e}")
             return None
-        return None
         
-    def parse_piexif_data(self, exif_dict: Dict) -> Dict[str, Any]:
-        """解析 piexif 資料"""
+    def parse_piexif_data(self, exif_dict: Dict, blobs: Optional[BlobLocator] = None) -> Dict[str, Any]:
+        """解析 piexif 資料（指定 blobs 時大型二進位值以描述表示）"""
         parsed_data = {}
         
         if not exif_dict:
@@ -591,24 +514,13 @@ class PhotoMetadataExtractor:
             
         for section, data in exif_dict.items():
             if data and isinstance(data, dict):
+                if blobs is not None:
+                    data = blobs.replace_blobs(data, section)
                 parsed_data[section] = {}
                 for tag_id, value in data.items():
                     if isinstance(value, bytes):
-                        try:
-                            # 嘗試不同的編碼
-                            for encoding in ['utf-8', 'latin-1', 'cp1252', 'gbk']:
-                                try:
-                                    decoded_value = value.decode(encoding)
-                                    if decoded_value and decoded_value.isprintable():
-                                        value = decoded_value
-                                        break
-                                except:
-                                    continue
-                            else:
-                                # 如果所有編碼都失敗，顯示十六進制
-                                value = f"[HEX] {value.hex()}"
-                        except:
-                            value = str(value)
+                        # 依標籤的型別與字元集解碼，二進位資料顯示十六進制
+                        value = format_bytes(value, tag_id, section)
                     elif isinstance(value, tuple):
                         # 處理座標等特殊格式
                         if len(value) == 3 and all(isinstance(x, (int, float)) for x in value):
@@ -617,8 +529,11 @@ class PhotoMetadataExtractor:
                             value = str(value)
                     parsed_data[section][str(tag_id)] = value
             elif data:
-                # 如果 data 不是字典，直接儲存
-                parsed_data[section] = str(data)
+                # 內嵌縮圖等不是字典的區段：大型位元組以描述表示，否則直接儲存
+                descriptor = None
+                if blobs is not None and isinstance(data, bytes) and len(data) > blobs.threshold:
+                    descriptor = blobs.describe_thumbnail(data)
+                parsed_data[section] = descriptor or str(data)
                     
         return parsed_data
         
@@ -665,10 +580,7 @@ class PhotoMetadataExtractor:
             tag_name = gps_tags.get(tag_id, f"GPS Tag {tag_id}")
             
             if isinstance(value, bytes):
-                try:
-                    value = value.decode('utf-8', errors='ignore')
-                except:
-                    value = str(value)
+                value = format_bytes(value, tag_id, 'GPS')
                     
             parsed_gps[tag_name] = value
             
@@ -688,31 +600,11 @@ class PhotoMetadataExtractor:
         return parsed_gps
         
     def get_piexif_gps_coordinate(self, gps_data: Dict, coord_key: int, ref_key: int) -> Optional[float]:
-        """從 piexif GPS 資料中提取座標"""
+        """從 piexif GPS 資料中提取座標（值是 (分子, 分母) 組成的 tuple）"""
         try:
-            if coord_key in gps_data and ref_key in gps_data:
-                coord_data = gps_data[coord_key]
-                ref_data = gps_data[ref_key]
-                
-                if isinstance(coord_data, tuple) and len(coord_data) == 3:
-                    degrees = float(coord_data[0])
-                    minutes = float(coord_data[1])
-                    seconds = float(coord_data[2])
-                    
-                    coordinate = degrees + (minutes / 60.0) + (seconds / 3600.0)
-                    
-                    if isinstance(ref_data, bytes):
-                        ref_data = ref_data.decode('utf-8', errors='ignore')
-                    
-                    if ref_data == 'S' or ref_data == 'W':
-                        coordinate = -coordinate
-                        
-                    return round(coordinate, 6)
-                    
+            return gps_coordinate(gps_data, coord_key, ref_key)
         except Exception as e:
             return None
-            
-        return None
         
     def format_size(self, size_bytes: int) -> str:
         """格式化檔案大小"""
@@ -748,10 +640,15 @@ class PhotoMetadataExtractor:
         # 顯示原始資料
         raw_data = self.current_metadata.get('raw_data', {})
         raw_text = "原始 EXIF 資料:\n" + "="*50 + "\n"
-        raw_text += json.dumps(raw_data, indent=2, ensure_ascii=False)
+        raw_text += self.json_serializer.dumps(raw_data).decode('utf-8')
         self.raw_text.insert(tk.END, raw_text)
         
         # 顯示診斷資訊
+        self.display_diagnostic_info()
+        
+    def display_diagnostic_info(self):
+        """顯示診斷資訊（包含預覽的來源與成本）"""
+        self.diagnostic_text.delete(1.0, tk.END)
         diagnostic_info = self.current_metadata.get('diagnostic_info', {})
         diagnostic_text = "診斷資訊:\n" + "="*50 + "\n"
         
@@ -771,6 +668,29 @@ class PhotoMetadataExtractor:
         if 'file_header' in diagnostic_info:
             diagnostic_text += f"檔案頭部: {diagnostic_info.get('file_header', 'Unknown')}\n"
         
+        # 區段與 IFD 位置
+        if diagnostic_info.get('segments'):
+            diagnostic_text += f"JPEG 區段: {', '.join(diagnostic_info['segments'])}\n"
+            diagnostic_text += f"APP13 (IPTC): {diagnostic_info.get('app13_found')}，APP2 (ICC/MPF): {diagnostic_info.get('app2_found')}\n"
+        if diagnostic_info.get('ifd_offsets'):
+            offsets = ', '.join(f"{name}={offset}" for name, offset in diagnostic_info['ifd_offsets'].items())
+            diagnostic_text += f"IFD 位置: {offsets}\n"
+        
+        # 各階段耗時與讀取量
+        if diagnostic_info.get('timings_ms'):
+            timings = ', '.join(f"{stage} {ms:.3f}" for stage, ms in diagnostic_info['timings_ms'].items())
+            diagnostic_text += f"提取耗時 (ms): {timings}\n"
+            diagnostic_text += f"讀取量: {self.format_size(diagnostic_info.get('bytes_read', 0))}\n"
+        
+        # 預覽來源與成本
+        if self.current_preview is not None:
+            preview_info = self.current_preview.info()
+            diagnostic_text += f"預覽來源: {SOURCE_NAMES.get(preview_info['preview_source'])}"
+            diagnostic_text += "（快取）\n" if preview_info['preview_cached'] else "\n"
+            diagnostic_text += f"預覽耗時: {preview_info['preview_ms']} ms\n"
+            diagnostic_text += f"預覽解碼尺寸: {preview_info['preview_decoded_size']}\n"
+            diagnostic_text += f"預覽記憶體峰值 (估計): {self.format_size(preview_info['preview_peak_bytes'])}\n"
+        
         # piexif 詳細資訊
         if diagnostic_info.get('piexif_success'):
             sections = diagnostic_info.get('piexif_sections', [])
@@ -798,6 +718,27 @@ class PhotoMetadataExtractor:
         
         self.diagnostic_text.insert(tk.END, diagnostic_text)
         
+    def expand_blobs(self):
+        """在背景讀回原始資料中以描述表示的二進位值，並重新顯示"""
+        if not self.current_metadata or not count_blobs(self.current_metadata):
+            messagebox.showinfo("資訊", "沒有需要展開的二進位資料")
+            return
+        self.start_task('blobs', self.load_blobs, self.current_metadata, self.current_file_path,
+                        on_done=self.show_expanded_blobs, on_error=self.show_extract_error)
+        
+    def load_blobs(self, metadata: Dict[str, Any], file_path: str,
+                   cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """工作執行緒：依描述從檔案讀回二進位值"""
+        check_cancelled(cancel_token)
+        return expand_blobs(metadata, file_path)
+        
+    def show_expanded_blobs(self, metadata: Dict[str, Any]):
+        """主執行緒：顯示展開後的結果"""
+        self.current_metadata = metadata
+        self.clear_text_widgets()
+        self.display_metadata()
+        self.notebook.select(self.raw_frame)
+        
     def clear_text_widgets(self):
         """清空所有文字顯示區域"""
         self.exif_text.delete(1.0, tk.END)
@@ -820,8 +761,8 @@ class PhotoMetadataExtractor:
         
         if filename:
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(self.current_metadata, f, indent=2, ensure_ascii=False)
+                with open(filename, 'wb') as f:
+                    self.json_serializer.dump(self.current_metadata, f)
                 messagebox.showinfo("成功", f"資料已儲存至: {filename}")
             except Exception as e:
                 messagebox.showerror("錯誤", f"儲存檔案時發生錯誤: {str(e)}")
@@ -848,11 +789,20 @@ class PhotoMetadataExtractor:
             
     def clear_all(self):
         """清除所有資料"""
+        self.cancel_tasks()
         self.file_path_var.set("")
         self.current_file_path = ""
         self.current_metadata = {}
+        self.current_preview = None
         self.clear_text_widgets()
         self.preview_label.configure(image="", text="選擇相片檔案以顯示預覽")
+        self.folder_browser.clear()
+        
+    def on_close(self):
+        """關閉視窗：取消背景工作，不等待執行中的工作"""
+        self.folder_browser.shutdown()
+        self.runner.shutdown()
+        self.root.destroy()
         
     def run(self):
         """執行程式"""
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+精簡的相片記錄
+Compact Typed Photo Record
+
+extract_metadata() 的結果是以中文顯示文字為鍵的巢狀字典，值也已經格式化
+（'6,888 bytes (6.7 KB)'、'640 x 480'），佔用記憶體又無法還原成數值。
+PhotoRecord 以 __slots__ 保存有型別的常用欄位，顯示文字只在輸出時產生：
+- 大小與尺寸是 int，座標與海拔是 float，時間是 datetime（秒為單位）
+- 光圈、曝光時間、焦距保留 EXIF 的有理數 (分子, 分母)，需要時才換算（見 ratio()）
+- 相機品牌、型號、鏡頭與圖片格式以 sys.intern 共用同一個字串物件
+- basic_info() 產生與 extract_metadata() 相同的基本資訊字典
+
+欄位名稱與 Parquet/Arrow 輸出、SQLite 索引相同（見 columnar_writer.EXPORT_COLUMNS），
+from_metadata() 可由 extract_metadata() 的字典（包括快取或 JSON 讀回的結果）建立記錄。
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+# 有理數：(分子, 分母)；由 JSON 讀回的結果只剩 float
+Rational = Union[Tuple[int, int], float]
+
+# 用到的 EXIF 標籤：(標籤 ID, exif_data 區段中的名稱, 欄位)
+EXIF_FIELDS = (
+    (271, 'Make', 'make'),
+    (272, 'Model', 'model'),
+    (42036, 'LensModel', 'lens_model'),
+    (36867, 'DateTimeOriginal', 'datetime_original'),
+    (34855, 'ISOSpeedRatings', 'iso'),
+    (33437, 'FNumber', 'f_number'),
+    (33434, 'ExposureTime', 'exposure_time'),
+    (37386, 'FocalLength', 'focal_length'),
+    (41989, 'FocalLengthIn35mmFilm', 'focal_length_35mm'),
+    (37385, 'Flash', 'flash'),
+    (274, 'Orientation', 'orientation'),
+)
+
+GPS_INFO_TAG = 34853
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _number(value: Any) -> Optional[float]:
+    """IFDRational、int、float（或 tuple 的第一個值）轉成 float；無法轉換或 NaN 時為 None"""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if value is None or isinstance(value, (str, bytes, dict, bool)):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return None if number != number else number
+
+
+def _integer(value: Any) -> Optional[int]:
+    number = _number(value)
+    return None if number is None else int(number)
+
+
+def _rational(value: Any) -> Optional[Rational]:
+    """IFDRational（或 tuple 的第一個值）保留為 (分子, 分母)；int 的分母為 1，float 原樣保留"""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if value is None or isinstance(value, (str, bytes, dict, bool)):
+        return None
+    if isinstance(value, int):
+        return (value, 1)
+    numerator = getattr(value, 'numerator', None)
+    denominator = getattr(value, 'denominator', None)
+    if numerator is not None and denominator is not None:
+        return (numerator, denominator)
+    return _number(value)
+
+
+def ratio(value: Optional[Rational]) -> Optional[float]:
+    """有理數換算成 float；分母為 0 時為 None"""
+    if isinstance(value, tuple):
+        numerator, denominator = value
+        if not denominator:
+            return None
+        return _number(numerator / denominator)
+    return value
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """'YYYY:MM:DD HH:MM:SS'（EXIF）或 'YYYY-MM-DD HH:MM:SS'（基本資訊）；相機未設定時間時為 None"""
+    if not isinstance(value, str) or len(value) < 19:
+        return None
+    try:
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except ValueError:
+        return None
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, dict):
+        return None
+    text = str(value).strip('\x00 ')
+    return sys.intern(text) if text else None
+
+
+def _file_size(text: Any) -> Optional[int]:
+    # '6,888 bytes (6.7 KB)'
+    if not isinstance(text, str):
+        return None
+    try:
+        return int(text.partition(' ')[0].replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _dimensions(text: Any) -> Tuple[Optional[int], Optional[int]]:
+    # '640 x 480'
+    parts = str(text).split(' x ')
+    try:
+        return (int(parts[0]), int(parts[1])) if len(parts) == 2 else (None, None)
+    except ValueError:
+        return None, None
+
+
+def _file_time(timestamp: float) -> datetime:
+    # 顯示與輸出都只到秒
+    return datetime.fromtimestamp(timestamp).replace(microsecond=0)
+
+
+# 基本資訊中由 stat 產生的時間：(顯示名稱, stat 欄位)
+FILE_TIME_FIELDS = (('建立時間', 'st_ctime'), ('修改時間', 'st_mtime'), ('存取時間', 'st_atime'))
+
+
+def file_times(stat) -> Dict[str, str]:
+    """stat 結果的建立、修改、存取時間顯示文字（與 basic_info() 相同）"""
+    return {name: _file_time(getattr(stat, field)).strftime(TIME_FORMAT) for name, field in FILE_TIME_FIELDS}
+
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'make': _text, 'model': _text, 'lens_model': _text,
+    'datetime_original': parse_timestamp,
+    'iso': _integer, 'focal_length_35mm': _integer, 'flash': _integer, 'orientation': _integer,
+    'f_number': _rational, 'exposure_time': _rational, 'focal_length': _rational,
+}
+
+EXIF_TAG_IDS = tuple(tag_id for tag_id, _, _ in EXIF_FIELDS)
+
+
+class PhotoRecord:
+    """一張相片的有型別欄位；沒有的值為 None"""
+
+    __slots__ = ('file_path', 'file_name', 'file_size', 'created_time', 'modified_time', 'accessed_time',
+                 'image_format', 'image_mode', 'width', 'height',
+                 'make', 'model', 'lens_model', 'datetime_original', 'iso',
+                 'f_number', 'exposure_time', 'focal_length', 'focal_length_35mm', 'flash', 'orientation',
+                 'gps_latitude', 'gps_longitude', 'gps_altitude', 'error')
+
+    def __init__(self, file_path: Optional[str] = None, **fields):
+        for name in self.__slots__:
+            setattr(self, name, None)
+        self.file_path = file_path
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def set_file_stat(self, stat):
+        """由 stat 結果填入檔案名稱、大小與時間"""
+        self.file_name = Path(self.file_path).name
+        self.file_size = stat.st_size
+        self.created_time = _file_time(stat.st_ctime)
+        self.modified_time = _file_time(stat.st_mtime)
+        self.accessed_time = _file_time(stat.st_atime)
+
+    def set_image(self, image_format: Optional[str], mode: Optional[str], width: int, height: int):
+        self.image_format = sys.intern(image_format) if image_format else image_format
+        self.image_mode = sys.intern(mode) if mode else mode
+        self.width = width
+        self.height = height
+
+    def set_exif(self, exif_data: Dict[str, Any]):
+        """由 exif_data 區段（以標籤名稱為鍵、經過 parse_exif_data 格式化）填入相機與拍攝參數"""
+        for _, tag_name, field in EXIF_FIELDS:
+            setattr(self, field, _CONVERTERS[field](exif_data.get(tag_name)))
+
+    def set_position(self, lat: Optional[float], lon: Optional[float], altitude: Optional[float]):
+        """換算後的座標與海拔（與 gps_data 區段相同：緯度或經度為 0 時不記錄座標）"""
+        if lat and lon:
+            self.gps_latitude = lat
+            self.gps_longitude = lon
+        self.gps_altitude = altitude
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict[str, Any], file_path: Optional[str] = None) -> 'PhotoRecord':
+        """由 extract_metadata() 的字典（或含 'file_path' 的批次結果）建立記錄"""
+        record = cls(file_path or metadata.get('file_path'))
+        basic_info = metadata.get('basic_info') or {}
+        record.file_name = basic_info.get('檔案名稱')
+        record.file_size = _file_size(basic_info.get('檔案大小'))
+        record.created_time = parse_timestamp(basic_info.get('建立時間'))
+        record.modified_time = parse_timestamp(basic_info.get('修改時間'))
+        record.accessed_time = parse_timestamp(basic_info.get('存取時間'))
+        if '圖片尺寸' in basic_info:
+            record.set_image(_text(basic_info.get('圖片格式')), _text(basic_info.get('圖片模式')),
+                             *_dimensions(basic_info['圖片尺寸']))
+        record.set_exif(metadata.get('exif_data') or {})
+        gps_data = metadata.get('gps_data') or {}
+        record.gps_latitude = _number(gps_data.get('緯度 (十進位)'))
+        record.gps_longitude = _number(gps_data.get('經度 (十進位)'))
+        record.gps_altitude = _number(gps_data.get('海拔 (公尺)'))
+        record.error = metadata.get('error')
+        return record
+
+    def basic_info(self, format_size: Callable[[int], str]) -> Dict[str, Any]:
+        """基本資訊區段的顯示文字（與 extract_metadata() 的 basic_info 相同）"""
+        info = {}
+        if self.file_size is not None:
+            info.update({
+                '檔案名稱': self.file_name,
+                '檔案路徑': str(Path(self.file_path).absolute()),
+                '檔案大小': f"{self.file_size:,} bytes ({format_size(self.file_size)})",
+                '建立時間': self.created_time.strftime(TIME_FORMAT),
+                '修改時間': self.modified_time.strftime(TIME_FORMAT),
+                '存取時間': self.accessed_time.strftime(TIME_FORMAT)
+            })
+        if self.width is not None:
+            info.update({
+                '圖片格式': self.image_format,
+                '圖片模式': self.image_mode,
+                '圖片尺寸': f"{self.width} x {self.height}",
+                '圖片大小': f"{self.width * self.height:,} pixels"
+            })
+        return info
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__[1:]
+                           if getattr(self, name) is not None)
+        return f"PhotoRecord({self.file_path!r}{', ' if fields else ''}{fields})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PhotoRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+預覽產生流程
+Preview Pipeline
+
+依成本由低到高嘗試不同的預覽來源：
+1. EXIF 內嵌縮圖（IFD1 的 JPEG，直接從記憶體映射取出，不解碼原圖）
+2. JPEG draft 模式（在 DCT 階段直接縮小 1/2 ~ 1/8 解碼）
+3. 完整解碼後縮小
+
+產生的預覽以檔案身分（路徑、大小、修改時間、inode）為鍵放進 LRU 快取，
+再次選擇同一張相片時可以立即顯示。
+"""
+
+import io
+import os
+import time
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from PIL import Image
+
+from mmap_scanner import MappedFile, scan_mapped
+from background_tasks import CancelToken, check_cancelled
+
+PREVIEW_SIZE = (300, 300)
+
+# 快取最多保存的預覽數
+DEFAULT_CACHE_ENTRIES = 64
+
+# 內嵌縮圖與原圖長寬比相差超過這個比例就不使用（部分相機的縮圖會補黑邊）
+ASPECT_TOLERANCE = 0.02
+
+# 解碼後每個像素在記憶體中佔用的位元組（PIL 的 RGB 以 4 bytes 儲存）
+MODE_PIXEL_BYTES = {'1': 1, 'L': 1, 'P': 1, 'I;16': 2, 'LA': 4, 'RGB': 4, 'RGBA': 4,
+                    'CMYK': 4, 'YCbCr': 4, 'I': 4, 'F': 4}
+
+SOURCE_EXIF_THUMBNAIL = 'exif_thumbnail'
+SOURCE_DRAFT = 'draft'
+SOURCE_FULL = 'full'
+
+SOURCE_NAMES = {
+    SOURCE_EXIF_THUMBNAIL: 'EXIF 內嵌縮圖',
+    SOURCE_DRAFT: 'JPEG draft 縮小解碼',
+    SOURCE_FULL: '完整解碼'
+}
+
+
+class Preview:
+    """產生好的預覽與其成本"""
+
+    __slots__ = ('image', 'source', 'elapsed_ms', 'decoded_size', 'peak_bytes', 'cached')
+
+    def __init__(self, image: Image.Image, source: str, elapsed_ms: float,
+                 decoded_size: Tuple[int, int], peak_bytes: int):
+        self.image = image
+        self.source = source
+        self.elapsed_ms = elapsed_ms
+        self.decoded_size = decoded_size  # 實際解碼的尺寸
+        self.peak_bytes = peak_bytes  # 解碼時的像素緩衝區大小（估計的記憶體峰值）
+        self.cached = False
+
+    def info(self) -> Dict[str, Any]:
+        """診斷資訊"""
+        return {
+            'preview_source': self.source,
+            'preview_ms': round(self.elapsed_ms, 2),
+            'preview_decoded_size': f"{self.decoded_size[0]} x {self.decoded_size[1]}",
+            'preview_peak_bytes': self.peak_bytes,
+            'preview_cached': self.cached
+        }
+
+
+def decoded_bytes(mode: str, size: Tuple[int, int]) -> int:
+    """估計解碼後的像素緩衝區大小"""
+    return size[0] * size[1] * MODE_PIXEL_BYTES.get(mode, 4)
+
+
+class PreviewPipeline:
+    """依成本嘗試不同來源產生預覽，並以 LRU 快取保存結果（可在多個執行緒使用）"""
+
+    def __init__(self, size: Tuple[int, int] = PREVIEW_SIZE, max_entries: int = DEFAULT_CACHE_ENTRIES,
+                 use_exif_thumbnail: bool = True):
+        self.size = size
+        self.max_entries = max_entries
+        self.use_exif_thumbnail = use_exif_thumbnail
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int, int], Preview]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _identity(file_path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+    def cached(self, file_path: str) -> Optional[Preview]:
+        """查詢快取（只需要一次 stat），檔案變更過就視為未命中"""
+        identity = self._identity(file_path)
+        with self._lock:
+            entry = self._cache.get(file_path)
+            if entry is None or entry[0] != identity:
+                return None
+            self._cache.move_to_end(file_path)
+            preview = entry[1]
+        preview.cached = True
+        return preview
+
+    def render(self, file_path: str, cancel_token: Optional[CancelToken] = None) -> Preview:
+        """取得預覽：快取命中直接回傳，否則依序嘗試各個來源"""
+        preview = self.cached(file_path)
+        if preview is not None:
+            return preview
+
+        identity = self._identity(file_path)
+        start = time.perf_counter()
+        preview = None
+        if self.use_exif_thumbnail:
+            preview = self._from_exif_thumbnail(file_path)
+        if preview is None:
+            check_cancelled(cancel_token)
+            preview = self._decode(file_path)
+        preview.elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if identity is not None:
+            with self._lock:
+                self._cache[file_path] = (identity, preview)
+                self._cache.move_to_end(file_path)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return preview
+
+    def _from_exif_thumbnail(self, file_path: str) -> Optional[Preview]:
+        """取出 JPEG 的 IFD1 內嵌縮圖；沒有縮圖、結構損壞或長寬比與原圖不符時回傳 None"""
+        with MappedFile(file_path) as mf:
+            try:
+                result = scan_mapped(mf)
+                if result.kind != 'jpeg' or result.thumbnail is None or result.sof is None:
+                    return None
+                _, height, width, _ = mf.unpack('>BHHB', result.sof.offset)
+            except (struct.error, ValueError):
+                # IFD1 或 SOF 損壞時改用 draft / 完整解碼
+                return None
+            offset, length = result.thumbnail
+            data = bytes(mf.slice(offset, offset + length))
+
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except Exception:
+            # 縮圖損毀時改用其他來源
+            return None
+        if not width or not height or abs(image.width / image.height - width / height) > ASPECT_TOLERANCE * width / height:
+            return None
+
+        decoded_size = image.size
+        peak = decoded_bytes(image.mode, decoded_size)
+        image.thumbnail(self.size, Image.Resampling.LANCZOS)
+        return Preview(image, SOURCE_EXIF_THUMBNAIL, 0.0, decoded_size, peak)
+
+    def _decode(self, file_path: str) -> Preview:
+        """JPEG 以 draft 模式縮小解碼，其他格式完整解碼後縮小"""
+        with Image.open(file_path) as image:
+            original_size = image.size
+            if image.format == 'JPEG':
+                # 選擇不小於預覽尺寸的最大縮小倍率（1/2、1/4、1/8）
+                image.draft(None, self.size)
+            source = SOURCE_DRAFT if image.size != original_size else SOURCE_FULL
+            decoded_size = image.size
+            peak = decoded_bytes(image.mode, decoded_size)
+            # 在關閉檔案前載入像素（已小於預覽尺寸時 thumbnail 不會載入）
+            image.load()
+
+        image.thumbnail(self.size, Image.Resampling.LANCZOS)
+        return Preview(image, source, 0.0, decoded_size, peak)
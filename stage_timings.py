@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提取階段計時
+Per-stage Extraction Timings
+
+以單調時鐘（time.perf_counter）記錄每張相片在各階段花費的時間與讀取的位元組，
+找出瓶頸是在 I/O（stat、開檔）還是解析：
+
+    stat       os.stat() 取得檔案資訊（網路磁碟上通常需要一次往返），開檔後沿用不再 fstat
+    open       開檔並掃描 JPEG 標記鏈；其他格式是 PIL 開檔與讀取標頭
+    getexif    解碼 EXIF IFD（JPEG 由掃描結果解碼，其他格式為 PIL 的 _getexif()）
+    piexif     piexif.load()
+    parse      把標籤轉為可讀文字
+    gps        GPS 區段解析與座標換算
+    serialize  寫出結果（NDJSON、Parquet、終端機、HTTP 回應）
+
+StageTimer 記錄單次提取；StageMetrics 累計成直方圖，可印出摘要或輸出 Prometheus 文字格式。
+"""
+
+import os
+import time
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+STAGES = ('stat', 'open', 'getexif', 'piexif', 'parse', 'gps', 'serialize')
+
+# 直方圖的上界（秒），單一階段從數十微秒（快取中的小檔案）到數秒（網路磁碟）
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Prometheus 指標名稱的前綴
+METRIC_PREFIX = 'photo_metadata'
+
+
+class CountingFile:
+    """計算 read() 讀取位元組的檔案包裝，其餘操作直接交給原本的檔案"""
+
+    def __init__(self, f, count: Callable[[int], None]):
+        self._f = f
+        self._count = count
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self._count(len(data))
+        return data
+
+    def __getattr__(self, name: str):
+        return getattr(self._f, name)
+
+    def __repr__(self) -> str:
+        # PIL 無法辨識格式時以 repr 顯示檔案，錯誤訊息與直接傳入路徑時相同
+        return repr(self._f.name)
+
+
+class _CountingImage:
+    """開啟圖片並計算 PIL 讀取的位元組（context manager）"""
+
+    def __init__(self, file_path: str, count: Callable[[int], None]):
+        self.file_path = file_path
+        self.count = count
+        self.f = None
+        self.img = None
+
+    def __enter__(self):
+        from PIL import Image
+        self.f = open(self.file_path, 'rb')
+        try:
+            self.img = Image.open(CountingFile(self.f, self.count))
+        except BaseException:
+            self.f.close()
+            raise
+        return self.img
+
+    def __exit__(self, exc_type, exc, tb):
+        self.img.close()
+        self.f.close()
+
+
+class StageTimer:
+    """單次提取的計時器：lap(stage) 把上一次 lap() 之後經過的時間計入 stage"""
+
+    __slots__ = ('stages', 'bytes_read', '_last')
+
+    enabled = True
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.bytes_read = 0
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def add_bytes(self, count: int):
+        self.bytes_read += count
+
+    def open_image(self, file_path: str):
+        """以 PIL 開啟圖片，讀取的位元組計入 bytes_read"""
+        return _CountingImage(file_path, self.add_bytes)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """diagnostic_info 的內容：各階段毫秒數與讀取的位元組"""
+        return {
+            'timings_ms': {stage: round(self.stages[stage] * 1000, 3) for stage in STAGES if stage in self.stages},
+            'bytes_read': self.bytes_read,
+        }
+
+
+class NullTimer:
+    """不計時（預設）：所有操作都是空的，提取流程不必到處判斷是否計時"""
+
+    __slots__ = ()
+
+    enabled = False
+
+    def lap(self, stage: str):
+        pass
+
+    def add_bytes(self, count: int):
+        pass
+
+    def open_image(self, file_path: str):
+        from PIL import Image
+        return Image.open(file_path)
+
+
+NULL_TIMER = NullTimer()
+
+
+def add_timing(metadata: Dict[str, Any], stage: str, seconds: float):
+    """把 seconds 計入記錄的 diagnostic_info（沒有計時的記錄不變）"""
+    timings = metadata.get('diagnostic_info', {}).get('timings_ms')
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 3)
+
+
+class StageMetrics:
+    """各階段耗時的累計直方圖與檔案、錯誤、讀取位元組計數（可跨執行緒使用）"""
+
+    def __init__(self, buckets: Optional[tuple] = None):
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        # 階段 → 各區間的次數（最後一格是超過最大上界的次數）
+        self.counts: Dict[str, List[int]] = {}
+        self.sums: Dict[str, float] = {}
+        self.files = 0
+        self.errors = 0
+        self.bytes_read = 0
+        self._lock = threading.Lock()
+
+    def _observe(self, stage: str, seconds: float):
+        counts = self.counts.get(stage)
+        if counts is None:
+            counts = self.counts[stage] = [0] * (len(self.buckets) + 1)
+            self.sums[stage] = 0.0
+        counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sums[stage] += seconds
+
+    def observe(self, stage: str, seconds: float):
+        """記錄一次階段耗時（秒）"""
+        with self._lock:
+            self._observe(stage, seconds)
+
+    def observe_record(self, metadata: Dict[str, Any]):
+        """記錄一筆提取結果：檔案數、錯誤數與 diagnostic_info 中的耗時和讀取量"""
+        diagnostic = metadata.get('diagnostic_info') or {}
+        with self._lock:
+            self.files += 1
+            if 'error' in metadata:
+                self.errors += 1
+            self.bytes_read += diagnostic.get('bytes_read', 0)
+            for stage, ms in diagnostic.get('timings_ms', {}).items():
+                self._observe(stage, ms / 1000)
+
+    def _stages(self) -> List[str]:
+        return [stage for stage in STAGES if stage in self.counts] + sorted(set(self.counts) - set(STAGES))
+
+    def quantile(self, stage: str, q: float) -> float:
+        """由直方圖估計分位數（秒），以所在區間內的線性內插計算"""
+        counts = self.counts.get(stage)
+        if not counts:
+            return 0.0
+        rank = q * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    # 超過最大上界：只知道下限
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summary_lines(self) -> List[str]:
+        """各階段的次數、總耗時、平均與估計的 p50/p99，以及佔總耗時的比例"""
+        with self._lock:
+            stages = self._stages()
+            total = sum(self.sums.values()) or 1.0
+            lines = [f"{'階段':<10} {'次數':>8} {'總計 (s)':>10} {'平均 (ms)':>10} "
+                     f"{'p50 (ms)':>10} {'p99 (ms)':>10} {'佔比':>7}"]
+            for stage in stages:
+                count = sum(self.counts[stage])
+                seconds = self.sums[stage]
+                lines.append(f"{stage:<10} {count:>8} {seconds:>10.3f} {seconds / count * 1000:>10.3f} "
+                             f"{self.quantile(stage, 0.5) * 1000:>10.3f} {self.quantile(stage, 0.99) * 1000:>10.3f} "
+                             f"{seconds / total:>6.1%}")
+            lines.append(f"讀取: {self.bytes_read:,} bytes（{self.files} 個檔案）")
+        return lines
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文字格式（text/plain; version=0.0.4）"""
+        histogram = f'{METRIC_PREFIX}_stage_duration_seconds'
+        with self._lock:
+            lines = [
+                f'# HELP {histogram} 各提取階段的耗時',
+                f'# TYPE {histogram} histogram',
+            ]
+            for stage in self._stages():
+                cumulative = 0
+                for bound, count in zip(self.buckets, self.counts[stage]):
+                    cumulative += count
+                    lines.append(f'{histogram}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                cumulative += self.counts[stage][-1]
+                lines.append(f'{histogram}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+                lines.append(f'{histogram}_sum{{stage="{stage}"}} {self.sums[stage]!r}')
+                lines.append(f'{histogram}_count{{stage="{stage}"}} {cumulative}')
+            for name, help_text, value in (
+                ('files_total', '已提取的檔案數', self.files),
+                ('errors_total', '提取失敗的檔案數', self.errors),
+                ('read_bytes_total', '提取時讀取的位元組', self.bytes_read),
+            ):
+                lines += [f'# HELP {METRIC_PREFIX}_{name} {help_text}',
+                          f'# TYPE {METRIC_PREFIX}_{name} counter',
+                          f'{METRIC_PREFIX}_{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """寫入 Prometheus 文字檔（node_exporter textfile collector）；先寫暫存檔再改名，
+        讀取端不會看到寫到一半的內容"""
+        import tempfile
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.metrics-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render_prometheus())
+            # mkstemp 建立的檔案只有擁有者可讀，收集程式通常以其他使用者執行
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet 輸出回歸測試：沒有快取、部分區段等選項時，批次輸出直接寫入工作行程提取的 PhotoRecord，
+不再由顯示文字還原；內容與由完整結果轉換的相同。
+
+執行方式: python -m pytest tests（需要 pyarrow）
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+import photo_record
+from corpus import generate_corpus
+from photo_metadata_cli import PhotoMetadataCLI
+
+
+def export(monkeypatch, argv):
+    monkeypatch.setattr(sys, 'argv', ['photo_metadata_cli.py'] + argv)
+    PhotoMetadataCLI().run()
+
+
+def rows(path):
+    return sorted(pq.read_table(path).to_pylist(), key=lambda row: row['file_path'])
+
+
+def test_export_writes_records_directly(tmp_path, monkeypatch):
+    folder = tmp_path / 'photos'
+    generate_corpus(str(folder), per_kind=2)
+    output = str(tmp_path / 'records.parquet')
+
+    def from_metadata(*args, **kwargs):
+        raise AssertionError('不應由顯示文字還原記錄')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(photo_record.PhotoRecord, 'from_metadata', from_metadata)
+        export(patch, [str(folder), '-j', '1', '-o', output])
+
+    # --include-blobs 需要完整的結果，經由 from_metadata 轉換
+    converted = str(tmp_path / 'converted.parquet')
+    export(monkeypatch, [str(folder), '-j', '1', '--include-blobs', '-o', converted])
+    assert len(rows(output)) == 14
+    assert rows(output) == rows(converted)
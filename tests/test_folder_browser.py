@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料夾瀏覽器回歸測試：背景走訪時找到的檔案要分段交給主執行緒，不必等整個資料夾走訪完。
+
+執行方式: python -m pytest tests
+"""
+
+import sys
+import queue
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+import pytest
+
+import folder_browser
+from background_tasks import CancelToken, TaskCancelled
+from batch_extractor import walk_images
+from corpus import generate_corpus
+from folder_browser import FolderBrowser, LIST_CHUNK, summarize_photo
+
+
+@pytest.fixture
+def folder(tmp_path):
+    for i in range(LIST_CHUNK * 2 + 7):
+        sub = tmp_path / f'd{i % 3}'
+        sub.mkdir(exist_ok=True)
+        (sub / f'img_{i:04d}.jpg').write_bytes(b'')
+    return str(tmp_path)
+
+
+def drain(found: queue.SimpleQueue):
+    chunks = []
+    while True:
+        try:
+            chunks.append(found.get_nowait())
+        except queue.Empty:
+            return chunks
+
+
+def test_list_files_streams_chunks(folder):
+    found = queue.SimpleQueue()
+    count = FolderBrowser._list_files(folder, CancelToken(), found)
+    chunks = drain(found)
+    assert len(chunks) >= 3
+    assert max(len(chunk) for chunk in chunks) <= LIST_CHUNK
+    assert count == LIST_CHUNK * 2 + 7
+    assert [path for chunk in chunks for path in chunk] == list(walk_images(folder))
+
+
+def test_first_chunk_available_before_walk_ends(folder, monkeypatch):
+    found = queue.SimpleQueue()
+    seen = []
+
+    def walk(path):
+        for i, file_path in enumerate(walk_images(path)):
+            # 走到一半時，第一段已經交給主執行緒
+            if i == LIST_CHUNK + 1:
+                seen.extend(drain(found))
+            yield file_path
+
+    monkeypatch.setattr(folder_browser, 'walk_images', walk)
+    FolderBrowser._list_files(folder, CancelToken(), found)
+    assert seen and len(seen[0]) == LIST_CHUNK
+
+
+def test_list_files_cancelled(folder):
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(TaskCancelled):
+        FolderBrowser._list_files(folder, token, queue.SimpleQueue())
+
+
+@pytest.mark.parametrize('kind', ['tiff', 'png', 'gps'])
+def test_summarize_reads_sub_ifds(tmp_path, kind):
+    # TIFF 的 ExifIFD 在讀取時才從檔案載入，檔案關閉後再讀會失敗
+    path = generate_corpus(str(tmp_path), per_kind=1, kinds=(kind,))[kind][0]
+    summary = summarize_photo(path)
+    assert summary['camera'] and summary['camera'] != '（無法讀取）'
+    assert summary['date'].count(':') == 4
+    assert summary['gps'] == '有'
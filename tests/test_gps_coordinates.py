@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPS 換算回歸測試：匯入命令列不會匯入 NumPy，第一次整批換算時才匯入；兩種換算結果相同。
+
+執行方式: python -m pytest tests
+"""
+
+import sys
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from PIL.TiffImagePlugin import IFDRational
+
+from gps_coordinates import batch_positions, gps_position
+
+
+def test_cli_import_does_not_import_numpy():
+    code = ("import sys, photo_metadata_cli, gps_coordinates; "
+            "print('numpy' in sys.modules); "
+            "gps_coordinates.batch_positions([{}]); "
+            "print(gps_coordinates.np is sys.modules.get('numpy'))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=str(ROOT), capture_output=True,
+                            text=True, check=True).stdout.split()
+    assert output == ['False', 'True']
+
+
+def test_batch_matches_single_photo():
+    records = [
+        {1: 'N', 2: (IFDRational(25), IFDRational(2), IFDRational(3018, 100)),
+         3: 'E', 4: (IFDRational(121), IFDRational(33), IFDRational(5)), 5: b'\x01', 6: IFDRational(105, 10)},
+        {1: 'S', 2: ((33, 1), (52, 1), (0, 0)), 3: b'W', 4: ((151, 1), (12, 1), (3010, 100))},
+        {},
+    ]
+    assert batch_positions(records) == [gps_position(gps_data) for gps_data in records]
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 後端回歸測試：orjson 後端的 dumps() / dump() 要與 json.dumps 逐位元組相同，
+包括單獨的浮點數與 dump() 逐項編碼的最外層項目（數字之後沒有 , ] } 或換行）。
+
+執行方式: python -m pytest tests
+"""
+
+import io
+import sys
+import json
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from json_backend import HAS_ORJSON, JSONSerializer
+
+pytestmark = pytest.mark.skipif(not HAS_ORJSON, reason='需要 orjson')
+
+# json 寫成指數形式或 orjson 寫法不同的浮點數
+EXPONENT_FLOATS = [1e-05, -1e-05, 2e20, -2e20, 1e16, 1.5e16, 1e-07, -1e-07, 5e-324, 1.7976931348623157e308,
+                   1.234e-10, 0.0001, 1e15, 123456789012345680.0, 0.5, -0.0, 1.0]
+
+
+def expected(value, pretty: bool) -> bytes:
+    if pretty:
+        return json.dumps(value, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumped(serializer: JSONSerializer, value) -> bytes:
+    f = io.BytesIO()
+    serializer.dump(value, f)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize('pretty', [False, True])
+@pytest.mark.parametrize('number', EXPONENT_FLOATS)
+def test_scalar_floats_match_json(number, pretty):
+    serializer = JSONSerializer(pretty=pretty, backend='orjson')
+    for value in (number, [number], {'a': number}, {'a': number, 'b': [number]}, [[number], number]):
+        assert serializer.dumps(value) == expected(value, pretty)
+        assert dumped(serializer, value) == expected(value, pretty)
+
+
+@pytest.mark.parametrize('pretty', [False, True])
+def test_random_floats_match_json(pretty):
+    rng = random.Random(20261017)
+    serializer = JSONSerializer(pretty=pretty, backend='orjson')
+    for _ in range(2000):
+        number = rng.choice((-1, 1)) * rng.random() * 10 ** rng.randint(-30, 30)
+        value = {'a': number, 'b': [number, rng.random()], 'c': 'x'} if rng.random() < 0.5 else number
+        assert serializer.dumps(value) == expected(value, pretty)
+        assert dumped(serializer, value) == expected(value, pretty)
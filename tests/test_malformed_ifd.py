@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+損壞的 IFD 回歸測試：子 IFD 指標或縮圖位置的型別錯誤、位置超出檔案、IFD 被截斷時，
+掃描不可拋出 struct.error，extract_metadata 仍要取得檔案資訊與 EXIF。
+
+執行方式: python -m pytest tests
+"""
+
+import io
+import sys
+import struct
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from PIL import Image
+
+import exif_segment_reader
+from exif_segment_reader import scan_jpeg
+from photo_metadata_cli import PhotoMetadataCLI
+
+MAKE = 0x010F
+EXIF_POINTER = 0x8769
+GPS_POINTER = 0x8825
+THUMBNAIL_OFFSET = 0x0201
+THUMBNAIL_LENGTH = 0x0202
+
+
+def ifd(entries, next_ifd: int = 0) -> bytes:
+    """little-endian IFD：entries 為 (tag, type, count, 4 bytes 的值欄位)"""
+    data = struct.pack('<H', len(entries))
+    for tag, value_type, count, value in entries:
+        data += struct.pack('<HHL', tag, value_type, count) + value
+    return data + struct.pack('<L', next_ifd)
+
+
+def jpeg_with_exif(tiff: bytes) -> bytes:
+    """8x8 的 JPEG，在 SOI 之後插入含 tiff 的 APP1 EXIF 區段"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'JPEG')
+    jpeg = buffer.getvalue()
+    app1 = b'Exif\x00\x00' + tiff
+    return jpeg[:2] + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1 + jpeg[2:]
+
+
+def make_entry() -> tuple:
+    return (MAKE, 2, 4, b'Abc\x00')
+
+
+def write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+MALFORMED = {
+    # GPS 指標的型別是 RATIONAL（8 bytes，值欄位被當成位置）
+    'pointer_type': b'II*\x00' + struct.pack('<L', 8)
+                    + ifd([make_entry(), (GPS_POINTER, 5, 1, struct.pack('<L', 0xFFFFFF))]),
+    # Exif 指標的型別正確，但指向檔案之外
+    'pointer_range': b'II*\x00' + struct.pack('<L', 8)
+                     + ifd([make_entry(), (EXIF_POINTER, 4, 1, struct.pack('<L', 0x7FFFFFF0))]),
+    # IFD 宣稱有 200 個項目，實際只有一個
+    'truncated_ifd': b'II*\x00' + struct.pack('<L', 8)
+                     + ifd([make_entry()])[:-4].replace(b'\x01\x00', b'\xc8\x00', 1),
+    # IFD1 的縮圖位置與長度型別錯誤
+    'thumbnail_type': b'II*\x00' + struct.pack('<L', 8)
+                      + ifd([make_entry()], next_ifd=26)
+                      + ifd([(THUMBNAIL_OFFSET, 5, 1, struct.pack('<L', 0xFFFFFF)),
+                             (THUMBNAIL_LENGTH, 10, 1, struct.pack('<L', 0xFFFFFF))]),
+}
+
+
+@pytest.mark.parametrize('kind', sorted(MALFORMED))
+def test_scan_skips_malformed_pointers(tmp_path, kind):
+    path = write(tmp_path, f'{kind}.jpg', jpeg_with_exif(MALFORMED[kind]))
+    scan = scan_jpeg(path)
+    assert scan.scan_error is None
+    assert scan.usable
+    assert 'GPS' not in scan.ifd_offsets and 'Exif' not in scan.ifd_offsets
+
+
+@pytest.mark.parametrize('kind', sorted(MALFORMED))
+def test_extract_keeps_basic_info_and_exif(tmp_path, kind):
+    path = write(tmp_path, f'{kind}.jpg', jpeg_with_exif(MALFORMED[kind]))
+    metadata = PhotoMetadataCLI().extract_metadata(path, ['basic', 'exif', 'gps'])
+    assert metadata['basic_info']['檔案名稱'] == f'{kind}.jpg'
+    assert metadata['basic_info']['圖片尺寸'] == '8 x 8'
+    if kind != 'truncated_ifd':
+        assert metadata['exif_data'].get('Make') == 'Abc'
+
+
+def test_scan_error_falls_back_to_pil(tmp_path, monkeypatch):
+    path = write(tmp_path, 'fallback.jpg', jpeg_with_exif(MALFORMED['pointer_type']))
+
+    def broken_scan(mf):
+        raise struct.error('unpack_from requires a buffer of at least 16777231 bytes')
+
+    monkeypatch.setattr(exif_segment_reader, 'scan_mapped', broken_scan)
+    scan = scan_jpeg(path)
+    assert scan.stat is not None and not scan.usable
+    assert 'unpack_from' in scan.scan_error
+
+    metadata = PhotoMetadataCLI().extract_metadata(path, ['basic', 'exif'])
+    assert 'error' not in metadata
+    assert metadata['basic_info']['檔案大小'].startswith(f"{Path(path).stat().st_size:,} bytes")
+    assert metadata['basic_info']['圖片格式'] == 'JPEG'
+    assert metadata['exif_data'].get('Make') == 'Abc'
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化快取回歸測試：每個檔案只計一次命中或未命中（包括只提取部分區段時），
+命中時的存取時間與不使用快取時相同。
+
+執行方式: python -m pytest tests
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from PIL import Image
+
+from batch_extractor import iter_extract
+from metadata_cache import MetadataCache
+from photo_metadata_cli import PhotoMetadataCLI
+
+FILE_COUNT = 21
+
+
+@pytest.fixture
+def photos(tmp_path):
+    folder = tmp_path / 'photos'
+    folder.mkdir()
+    paths = []
+    for i in range(FILE_COUNT):
+        path = folder / f'img_{i:02d}.jpg'
+        Image.new('RGB', (16, 16), (i * 10, 0, 0)).save(path, 'JPEG')
+        paths.append(str(path))
+    return paths
+
+
+def run(paths, db_path, workers, sections=None):
+    cache = MetadataCache(db_path)
+    try:
+        results = list(iter_extract(paths, workers, 4, cache, sections))
+        return len(results), cache.stats()
+    finally:
+        cache.close()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cold_cache_gps_only_counts_each_miss_once(photos, tmp_path, workers):
+    count, stats = run(photos, str(tmp_path / 'c.db'), workers, ['gps'])
+    assert count == FILE_COUNT
+    assert (stats['hits'], stats['misses']) == (0, FILE_COUNT)
+
+    # 部分區段的結果不寫入快取，再執行一次仍然全部未命中
+    count, stats = run(photos, str(tmp_path / 'c.db'), workers, ['gps'])
+    assert (stats['hits'], stats['misses']) == (0, FILE_COUNT)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_warm_cache_gps_only_hits(photos, tmp_path, workers):
+    db_path = str(tmp_path / 'c.db')
+    _, stats = run(photos, db_path, workers)
+    assert (stats['hits'], stats['misses']) == (0, FILE_COUNT)
+
+    _, stats = run(photos + [str(tmp_path / 'missing.jpg')], db_path, workers, ['gps'])
+    assert (stats['hits'], stats['misses']) == (FILE_COUNT, 1)
+
+
+def test_hit_renders_current_access_time(photos, tmp_path):
+    path = photos[0]
+    cli = PhotoMetadataCLI()
+    cache = MetadataCache(str(tmp_path / 'c.db'))
+    try:
+        cache.get_or_extract(path, cli.extract_metadata)
+        # 只改存取時間：修改時間與檔案身分不變，仍然命中
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns - 86400 * 10 ** 9 * 30, stat.st_mtime_ns))
+        metadata = cache.get_or_extract(path, cli.extract_metadata)
+        assert cache.hits == 1
+    finally:
+        cache.close()
+    assert metadata['basic_info'] == cli.extract_metadata(path)['basic_info']
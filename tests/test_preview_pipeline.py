@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+預覽流程回歸測試：內嵌縮圖的結構損壞時要改用 draft / 完整解碼，解碼後不可留下開啟的檔案。
+
+執行方式: python -m pytest tests
+"""
+
+import os
+import sys
+import struct
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from PIL import Image
+
+import preview_pipeline
+from preview_pipeline import PreviewPipeline, SOURCE_DRAFT, SOURCE_FULL
+
+
+def open_handles(path: str) -> int:
+    """目前行程開啟 path 的檔案描述元數（Linux 的 /proc）"""
+    target = os.path.realpath(path)
+    count = 0
+    for fd in os.listdir('/proc/self/fd'):
+        try:
+            count += os.readlink(f'/proc/self/fd/{fd}') == target
+        except OSError:
+            pass
+    return count
+
+
+def test_corrupt_thumbnail_falls_back_to_draft(tmp_path, monkeypatch):
+    path = tmp_path / 'photo.jpg'
+    Image.new('RGB', (1200, 900), 'blue').save(path, 'JPEG')
+
+    def broken_scan(mf):
+        raise struct.error('unpack_from requires a buffer of at least 16777231 bytes')
+
+    monkeypatch.setattr(preview_pipeline, 'scan_mapped', broken_scan)
+    preview = PreviewPipeline().render(str(path))
+    assert preview.source == SOURCE_DRAFT
+    assert max(preview.image.size) <= 300
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='需要 /proc/self/fd')
+@pytest.mark.parametrize('name, size, source', [
+    ('large.jpg', (1200, 900), SOURCE_DRAFT),
+    ('small.jpg', (100, 80), SOURCE_FULL),
+    ('image.png', (640, 480), SOURCE_FULL),
+])
+def test_decode_closes_file(tmp_path, name, size, source):
+    path = str(tmp_path / name)
+    Image.new('RGB', size, 'green').save(path)
+    pipeline = PreviewPipeline(use_exif_thumbnail=False)
+    for _ in range(3):
+        preview = pipeline._decode(path)
+    assert preview.source == source
+    assert open_handles(path) == 0
+    # 關閉檔案後預覽仍可使用
+    assert preview.image.getpixel((0, 0))[1] > 100
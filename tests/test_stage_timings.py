@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+階段計時回歸測試：stat 階段計入實際的 os.stat()，開檔後沿用同一份檔案資訊而不再 fstat。
+
+執行方式: python -m pytest tests
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+import pytest
+from PIL import Image
+
+import mmap_scanner
+from corpus import generate_corpus
+from exif_segment_reader import load_piexif, scan_jpeg
+from photo_metadata_cli import PhotoMetadataCLI
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / 'photo.jpg'
+    Image.new('RGB', (64, 48), 'white').save(path, 'JPEG')
+    return str(path)
+
+
+def test_scan_reuses_given_stat(photo, monkeypatch):
+    stat = os.stat(photo)
+
+    def no_fstat(fd):
+        raise AssertionError('已經有 stat 結果時不應再 fstat')
+
+    monkeypatch.setattr(mmap_scanner.os, 'fstat', no_fstat)
+    scan = scan_jpeg(photo, stat)
+    assert scan.stat is stat
+    assert (scan.width, scan.height) == (64, 48)
+
+
+def test_stat_stage_times_os_stat(photo, monkeypatch):
+    cli = PhotoMetadataCLI()
+    cli.timings = True
+    calls = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, 'stat', lambda path, *args, **kwargs: calls.append(path) or real_stat(path, *args, **kwargs))
+
+    metadata = cli.extract_metadata(photo)
+    assert calls == [photo]
+    assert {'stat', 'open'} <= set(metadata['diagnostic_info']['timings_ms'])
+    assert metadata['basic_info']['檔案大小'].startswith(f"{real_stat(photo).st_size:,} bytes")
+
+
+def test_missing_file_error(tmp_path):
+    path = str(tmp_path / 'missing.jpg')
+    assert PhotoMetadataCLI().extract_metadata(path)['error'] == f"檔案不存在: {path}"
+    assert PhotoMetadataCLI().extract_record(path).error == f"檔案不存在: {path}"
+
+
+def test_tiff_piexif_reports_bytes_read(tmp_path):
+    path = generate_corpus(str(tmp_path), per_kind=1, kinds=('tiff',))['tiff'][0]
+    size = os.path.getsize(path)
+    read = []
+    exif_dict = load_piexif(path, read.append)
+    assert exif_dict['GPS']
+    assert read == [size]
+
+    cli = PhotoMetadataCLI()
+    cli.timings = True
+    metadata = cli.extract_metadata(path)
+    assert 'piexif' in metadata['diagnostic_info']['timings_ms']
+    assert metadata['diagnostic_info']['bytes_read'] >= size